@@ -0,0 +1,47 @@
+"""
+1,000 single add_task calls against one add_tasks call, through an
+in-process fastmcp.Client.
+
+    uv run python benchmarks/bench_bulk.py
+"""
+
+import asyncio
+
+from common import db, drop_temp_db, timed, use_temp_db
+from fastmcp import Client
+
+TASKS = 1000
+
+
+async def run(mcp) -> None:
+    async with Client(mcp) as client:
+
+        async def single_calls() -> None:
+            for i in range(TASKS):
+                await client.call_tool("add_task", {"title": f"task {i}"})
+
+        async def batch_call() -> None:
+            items = [{"title": f"task {i}"} for i in range(TASKS)]
+            await client.call_tool("add_tasks", {"tasks": items})
+
+        await db.clear_tasks()
+        single = await timed("add_task x1000", TASKS, single_calls)
+        await db.clear_tasks()
+        batch = await timed("add_tasks (1 call, 1000 items)", TASKS, batch_call)
+
+    print(f"speedup: {batch / single:.1f}x")
+
+
+def main() -> None:
+    path = use_temp_db()
+    try:
+        # Imported here so the server initialises the temporary database
+        from task_server import mcp
+
+        asyncio.run(run(mcp))
+    finally:
+        drop_temp_db(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Load test of the streamable-HTTP mode: the same client load against 1, 2, 4...
+worker processes sharing one tasks.db, to show throughput scaling with cores.
+
+Each run starts ``server/task_server.py`` with TASKS_TRANSPORT=http in a
+temporary directory and drives it from several client processes, so the
+client side is not the bottleneck. Calls are mostly reads (stats://tasks,
+list_tasks, search_tasks) with a share of add_task writes.
+
+    uv run python benchmarks/bench_http.py
+    uv run python benchmarks/bench_http.py --workers 1 2 4 8 --clients 8 --duration 10
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from common import SERVER_DIR
+from fastmcp import Client
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, port: int, directory: str) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, str(SERVER_DIR / "task_server.py")],
+        cwd=directory,
+        env={
+            **os.environ,
+            "TASKS_TRANSPORT": "http",
+            "TASKS_HTTP_PORT": str(port),
+            "TASKS_HTTP_WORKERS": str(workers),
+        },
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/ready").status_code == 200:
+                return server
+        except httpx.TransportError:
+            pass
+        time.sleep(0.1)
+    stop_server(server)
+    raise RuntimeError(f"server with {workers} workers never became ready")
+
+
+def stop_server(server: subprocess.Popen) -> None:
+    server.send_signal(signal.SIGINT)
+    server.wait(timeout=60)
+
+
+async def drive(url: str, concurrency: int, duration: float, write_share: float):
+    """One client process: ``concurrency`` loops calling the server until time out."""
+    calls = errors = 0
+    rng = random.Random()
+
+    async with Client(url) as client:
+        deadline = time.perf_counter() + duration
+
+        reads = (
+            lambda: client.read_resource("stats://tasks"),
+            lambda: client.call_tool("list_tasks", {"limit": 20}),
+            lambda: client.call_tool("search_tasks", {"query": "seed", "limit": 20}),
+        )
+
+        async def loop():
+            nonlocal calls, errors
+            while time.perf_counter() < deadline:
+                try:
+                    if rng.random() < write_share:
+                        await client.call_tool("add_task", {"title": "load test"})
+                    else:
+                        await rng.choice(reads)()
+                    calls += 1
+                except Exception:
+                    errors += 1
+
+        await asyncio.gather(*(loop() for _ in range(concurrency)))
+    return calls, errors
+
+
+def client_process(args: tuple) -> tuple[int, int]:
+    return asyncio.run(drive(*args))
+
+
+async def seed(url: str, count: int) -> None:
+    async with Client(url) as client:
+        for start in range(0, count, 500):
+            batch = [{"title": f"seed {i}"} for i in range(start, start + 500)]
+            await client.call_tool("add_tasks", {"tasks": batch})
+
+
+def run(workers: int, args) -> float:
+    with tempfile.TemporaryDirectory(prefix="bench-http-") as directory:
+        port = free_port()
+        server = start_server(workers, port, directory)
+        url = f"http://127.0.0.1:{port}/mcp"
+        try:
+            asyncio.run(seed(url, args.seed))
+            job = (url, args.concurrency, args.duration, args.write_share)
+            start = time.perf_counter()
+            with multiprocessing.Pool(args.clients) as pool:
+                results = pool.map(client_process, [job] * args.clients)
+            elapsed = time.perf_counter() - start
+        finally:
+            stop_server(server)
+
+    calls = sum(c for c, _ in results)
+    errors = sum(e for _, e in results)
+    rate = calls / elapsed
+    print(f"{workers:>7} {calls:>9} {errors:>7} {rate:>10.0f}", end="")
+    return rate
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--write-share", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=1000)
+    args = parser.parse_args()
+
+    print(
+        f"{os.cpu_count()} cores, {args.clients} client processes"
+        f" x {args.concurrency} concurrent calls, {args.duration:g}s per run\n"
+    )
+    print(f"{'workers':>7} {'calls':>9} {'errors':>7} {'calls/s':>10}  speedup")
+    baseline = None
+    for workers in args.workers:
+        rate = run(workers, args)
+        baseline = baseline or rate
+        print(f"  {rate / baseline:6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
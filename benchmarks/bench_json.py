@@ -0,0 +1,63 @@
+"""
+Time of rendering 100k tasks as tasks://all text against the compact JSON
+that SQLite builds (tasks://all.json), and against json.dumps over the Tasks.
+The resource cache is cleared before every read.
+
+    uv run python benchmarks/bench_json.py
+"""
+
+import asyncio
+import json
+import time
+
+from common import db, drop_temp_db, seed_tasks, use_temp_db
+
+TASKS = 100_000
+ROUNDS = 5
+
+
+async def dumps_tasks() -> str:
+    tasks = await db.fetch_all_tasks()
+    return json.dumps(
+        {
+            "fields": list(db.TASK_FIELDS),
+            "tasks": [list(task.to_dict().values()) for task in tasks],
+        },
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+
+
+async def measure(label: str, fn) -> None:
+    from resources.cache import resource_cache
+
+    resource_cache.clear()
+    size = len((await fn()).encode())
+    best = float("inf")
+    for _ in range(ROUNDS):
+        resource_cache.clear()
+        start = time.perf_counter()
+        await fn()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<30} {best * 1000:8.1f} ms  {size / 2**20:6.1f} MiB")
+
+
+async def main() -> None:
+    from resources.resources import get_all_tasks, get_all_tasks_json
+
+    path = use_temp_db()
+    try:
+        await db.init_db()
+        await db.open_pool()
+        await seed_tasks(TASKS)
+
+        await measure("tasks://all (text)", get_all_tasks)
+        await measure("tasks://all.json", get_all_tasks_json)
+        await measure("json.dumps over Tasks", dumps_tasks)
+    finally:
+        await db.close_pool()
+        drop_temp_db(path)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,43 @@
+"""
+Cost of metrics.instrument per call: an instrumented no-op coroutine against
+the bare one, best of five rounds of 100k awaits each.
+
+    uv run python benchmarks/bench_metrics.py
+"""
+
+import asyncio
+import time
+
+import common  # noqa: F401  puts server/ on sys.path
+import metrics
+
+CALLS = 100_000
+ROUNDS = 5
+
+
+async def noop():
+    return None
+
+
+async def per_call(fn) -> float:
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        for _ in range(CALLS):
+            await fn()
+        best = min(best, (time.perf_counter() - start) / CALLS)
+    return best
+
+
+async def main() -> None:
+    wrapped = metrics.instrument("tool", "overhead", noop)
+
+    bare = await per_call(noop)
+    instrumented = await per_call(wrapped)
+    print(f"{'bare coroutine':<20} {bare * 1e6:6.2f} µs/call")
+    print(f"{'instrumented':<20} {instrumented * 1e6:6.2f} µs/call")
+    print(f"{'overhead':<20} {(instrumented - bare) * 1e6:6.2f} µs/call")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
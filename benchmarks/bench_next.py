@@ -0,0 +1,82 @@
+"""
+Latency of next_tasks and the overdue listing as the number of pending tasks
+grows to 100k: the per-priority index range scans against one ORDER BY over
+every pending task and against the in-memory backend's heap.
+
+    uv run python benchmarks/bench_next.py
+"""
+
+import asyncio
+import random
+
+from common import db, drop_temp_db, sample_latencies, use_temp_db
+from memory_db import MemoryDatabase
+
+SIZES = (1_000, 10_000, 100_000)
+K = 10
+NOW = "2026-06-01T00:00:00.000000"
+# The same order as SELECT_NEXT_TASKS, left for SQLite to plan on its own
+SORTED_SCAN = (
+    f"{db.SELECT_TASKS} WHERE status = 'pending'"
+    " ORDER BY priority DESC, due_at IS NULL, due_at, id LIMIT ?"
+)
+
+
+def scheduled_items(count: int, start: int, seed: int = 7) -> list[tuple]:
+    """Tasks with a random priority; 70% have a due date within 2026."""
+    rng = random.Random(seed + start)
+    items = []
+    for i in range(start, start + count):
+        due = None
+        if rng.random() < 0.7:
+            due = db.timestamp(
+                f"2026-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+            )
+        items.append((f"task {i}", "", rng.randrange(len(db.PRIORITIES)), due))
+    return items
+
+
+async def sorted_scan() -> list:
+    async with db._connection() as conn:
+        async with conn.execute(SORTED_SCAN, (K,)) as cur:
+            return await cur.fetchall()
+
+
+def report(label: str, stats: dict) -> None:
+    print(
+        f"  {label:<36} p50 {stats['p50_ms']:8.3f} ms"
+        f"  p99 {stats['p99_ms']:8.3f} ms  {stats['throughput']:9.0f} calls/s"
+    )
+
+
+async def main() -> None:
+    path = use_temp_db()
+    memory = MemoryDatabase()
+    try:
+        await db.init_db()
+        await db.open_pool()
+        seeded = 0
+        for size in SIZES:
+            items = scheduled_items(size - seeded, seeded)
+            for chunk in range(0, len(items), 10_000):
+                await db.insert_tasks(items[chunk : chunk + 10_000], db.timestamp())
+            await memory.insert_tasks(items, db.timestamp())
+            seeded = size
+
+            print(f"{size} pending tasks, top {K}")
+            cases = {
+                "next_tasks (index, per level)": lambda: db.fetch_next_tasks(K),
+                "next_tasks (one ORDER BY)": sorted_scan,
+                "next_tasks (memory heap)": lambda: memory.fetch_next_tasks(K),
+                "overdue (index, per level)": lambda: db.fetch_overdue_tasks(NOW, K),
+                "overdue (memory heap)": lambda: memory.fetch_overdue_tasks(NOW, K),
+            }
+            for label, fn in cases.items():
+                report(label, await sample_latencies(fn, max_iterations=500))
+    finally:
+        await db.close_pool()
+        drop_temp_db(path)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,61 @@
+"""
+Response time and peak memory of tasks://all against its keyset-paginated
+variant, at 100k tasks.
+
+    uv run python benchmarks/bench_pagination.py
+"""
+
+import asyncio
+import time
+import tracemalloc
+
+from common import db, drop_temp_db, seed_tasks, use_temp_db
+from resources.resources import PAGE_SIZE, get_all_tasks, get_tasks_page
+
+TASKS = 100_000
+
+
+async def measure(label: str, fn) -> None:
+    tracemalloc.start()
+    start = time.perf_counter()
+    text = await fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(
+        f"{label:<32} {elapsed * 1000:9.1f} ms  peak {peak / 2**20:7.1f} MiB"
+        f"  response {len(text) / 2**10:9.1f} KiB"
+    )
+
+
+async def walk_pages() -> str:
+    cursor, pages = 0, 0
+    while True:
+        text = await get_tasks_page(cursor, PAGE_SIZE)
+        pages += 1
+        marker = text.rfind("Next cursor: ")
+        if marker == -1:
+            return f"{pages} pages"
+        cursor = int(text[marker + len("Next cursor: ") :])
+
+
+async def main() -> None:
+    path = use_temp_db()
+    try:
+        await db.init_db()
+        await db.open_pool()
+        await seed_tasks(TASKS)
+
+        await measure("tasks://all", get_all_tasks)
+        await measure(f"first page (limit {PAGE_SIZE})", get_tasks_page)
+        await measure(
+            f"page at cursor {TASKS // 2}", lambda: get_tasks_page(TASKS // 2)
+        )
+        await measure("walk every page", walk_pages)
+    finally:
+        await db.close_pool()
+        drop_temp_db(path)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,58 @@
+"""
+Calls per second of the db layer with and without the connection pool,
+and with the pool plus the group-commit writer.
+
+    uv run python benchmarks/bench_pool.py
+"""
+
+import asyncio
+from datetime import datetime
+
+from common import db, drop_temp_db, timed, use_temp_db
+
+CALLS = 2000
+CONCURRENCY = 16
+
+
+async def workload() -> None:
+    now = datetime.now().isoformat()
+
+    async def worker(n: int) -> None:
+        for i in range(n):
+            task = await db.insert_task(f"task {i}", "", now)
+            await db.update_task_status(task.id, "completed", now)
+
+    per_worker = CALLS // CONCURRENCY // 2
+    await asyncio.gather(*(worker(per_worker) for _ in range(CONCURRENCY)))
+
+
+async def main() -> None:
+    path = use_temp_db()
+    try:
+        await db.init_db()
+
+        await db.clear_tasks()
+        without = await timed("without pool (connect per call)", CALLS, workload)
+
+        await db.clear_tasks()
+        await db.open_pool()
+        try:
+            with_pool = await timed(f"with pool (size {db.POOL_SIZE})", CALLS, workload)
+
+            await db.clear_tasks()
+            await db.start_writer()
+            try:
+                grouped = await timed("with pool + group writer", CALLS, workload)
+            finally:
+                await db.stop_writer()
+        finally:
+            await db.close_pool()
+
+        print(f"pool speedup: {with_pool / without:.1f}x")
+        print(f"group writer speedup: {grouped / without:.1f}x")
+    finally:
+        drop_temp_db(path)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+"""
+Write throughput of several processes adding tasks to one shared database
+against each writing to its own project database, and the cost of listing
+tasks across every project in parallel against one project after another.
+
+    uv run python benchmarks/bench_projects.py
+    uv run python benchmarks/bench_projects.py --writers 8 --writes 500
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import shutil
+import tempfile
+import time
+
+from common import db, seed_tasks
+
+
+async def write(directory: str, project: str | None, writes: int) -> None:
+    db.DB_PATH = f"{directory}/tasks.db"
+    db.PROJECTS_DIR = f"{directory}/projects"
+    with db.use_project(project):
+        await db.init_db()
+        for i in range(writes):
+            await db.insert_task(f"task {i}", "", db.timestamp())
+    await db.close_shards()
+
+
+def writer_process(args: tuple) -> None:
+    asyncio.run(write(*args))
+
+
+def run_writers(label: str, jobs: list[tuple]) -> None:
+    start = time.perf_counter()
+    with multiprocessing.Pool(len(jobs)) as pool:
+        pool.map(writer_process, jobs)
+    elapsed = time.perf_counter() - start
+    writes = sum(job[2] for job in jobs)
+    print(f"{label:<32} {writes:>7} writes  {elapsed:7.2f}s  {writes / elapsed:8.0f}/s")
+
+
+async def listing(directory: str, projects: int, tasks: int) -> None:
+    db.DB_PATH = f"{directory}/tasks.db"
+    db.PROJECTS_DIR = f"{directory}/projects"
+    db._shards = db.ShardCache(capacity=projects + 1)
+    names = [f"p{i}" for i in range(projects)]
+    for name in names:
+        with db.use_project(name):
+            await seed_tasks(tasks)
+
+    async def sequential():
+        for name in names:
+            with db.use_project(name):
+                await db.query_tasks(title_prefix="task 1", limit=1000)
+
+    async def parallel():
+        await db.query_projects(names, title_prefix="task 1", limit=1000)
+
+    for label, fn in (("one project at a time", sequential), ("parallel", parallel)):
+        await fn()
+        start = time.perf_counter()
+        for _ in range(5):
+            await fn()
+        elapsed = (time.perf_counter() - start) / 5
+        print(f"list {projects} projects, {label:<24} {elapsed * 1000:8.1f} ms")
+    await db.close_shards()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--writes", type=int, default=300)
+    parser.add_argument("--projects", type=int, default=8)
+    parser.add_argument("--tasks", type=int, default=20_000)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="bench-projects-")
+    try:
+        asyncio.run(write(directory, None, 0))
+        # Both sides in WAL, as the HTTP server runs tasks.db, so only the
+        # shared write lock differs
+        asyncio.run(db.enable_wal())
+        run_writers(
+            f"{args.writers} writers, one file",
+            [(directory, None, args.writes)] * args.writers,
+        )
+        run_writers(
+            f"{args.writers} writers, own projects",
+            [(directory, f"w{i}", args.writes) for i in range(args.writers)],
+        )
+        asyncio.run(listing(directory, args.projects, args.tasks))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Time and memory of reading 100k tasks as Task objects (row_factory) against
+the per-row dicts the db layer used to build, plus the cost of turning the
+Tasks into dicts at the MCP boundary.
+
+    uv run python benchmarks/bench_rows.py
+"""
+
+import asyncio
+import time
+import tracemalloc
+
+from common import db, drop_temp_db, seed_tasks, use_temp_db
+
+TASKS = 100_000
+ROUNDS = 5
+
+
+async def fetch_dicts() -> list[dict]:
+    """The previous mapping: column names per query, then one dict per row."""
+    async with db._connection() as conn:
+        async with conn.execute("SELECT * FROM tasks") as cur:
+            rows = await cur.fetchall()
+            cols = [c[0] for c in cur.description]
+            return [dict(zip(cols, r)) for r in rows]
+
+
+async def fetch_tasks_as_dicts() -> list[dict]:
+    return [task.to_dict() for task in await db.fetch_all_tasks()]
+
+
+async def measure(label: str, fn) -> None:
+    await fn()
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        await fn()
+    elapsed = (time.perf_counter() - start) / ROUNDS
+
+    tracemalloc.start()
+    result = await fn()
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    print(
+        f"{label:<30} {elapsed * 1000:8.1f} ms  held {held / 2**20:6.1f} MiB"
+        f"  peak {peak / 2**20:6.1f} MiB"
+    )
+
+
+async def main() -> None:
+    path = use_temp_db()
+    try:
+        await db.init_db()
+        await db.open_pool()
+        await seed_tasks(TASKS)
+
+        await measure("dict per row (before)", fetch_dicts)
+        await measure("Task via row_factory", db.fetch_all_tasks)
+        await measure("Task, then to_dict()", fetch_tasks_as_dicts)
+    finally:
+        await db.close_pool()
+        drop_temp_db(path)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
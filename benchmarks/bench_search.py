@@ -0,0 +1,83 @@
+"""
+search_tasks (FTS5) against finding the same tasks by scanning the full task
+list, at 100k tasks.
+
+    uv run python benchmarks/bench_search.py
+"""
+
+import asyncio
+import random
+import time
+
+from common import db, drop_temp_db, use_temp_db
+
+TASKS = 100_000
+ROUNDS = 10
+COMMON = (
+    "report deploy invoice review meeting client budget release bug fix "
+    "design test backup migrate contract schedule onboarding audit refactor "
+    "customer roadmap security license payroll hiring"
+).split()
+# Project and customer names: each one shows up in a few dozen tasks
+RARE = [f"{a}{b}" for a in ("acme", "orion", "zephyr", "nimbus") for b in range(500)]
+# (label, query): how many tasks match decides how much there is to rank
+QUERIES = (
+    ("rare word", "orion42"),
+    ("rare word + common word", "zephyr7 invoice"),
+    ("common word", "invoice"),
+    ("two common words", "client budget"),
+)
+
+
+async def seed(count: int, chunk: int = 10_000) -> None:
+    rng = random.Random(0)
+    now = "2026-01-01T00:00:00"
+    for start in range(0, count, chunk):
+        items = [
+            (
+                f"{' '.join(rng.sample(COMMON, 2))} {rng.choice(RARE)}",
+                " ".join(rng.choices(COMMON, k=10) + rng.choices(RARE, k=2)),
+            )
+            for _ in range(start, min(start + chunk, count))
+        ]
+        await db.insert_tasks(items, now)
+
+
+async def scan(text: str, limit: int) -> list[dict]:
+    """What an agent does today: read every task and keep the ones that match."""
+    words = text.lower().split()
+    return [
+        task
+        for task in await db.fetch_all_tasks()
+        if all(word in f"{task.title} {task.description}".lower() for word in words)
+    ][:limit]
+
+
+async def measure(label: str, query: str) -> None:
+    for name, fn in (("full-list scan", scan), ("search_tasks", db.search_tasks)):
+        start = time.perf_counter()
+        for _ in range(ROUNDS):
+            results = await fn(query, 20)
+        elapsed = (time.perf_counter() - start) / ROUNDS
+        print(
+            f"{label:<26} {name:<16} {elapsed * 1000:9.2f} ms/query"
+            f"  ({len(results)} results)"
+        )
+
+
+async def main() -> None:
+    path = use_temp_db()
+    try:
+        await db.init_db()
+        await db.open_pool()
+        await seed(TASKS)
+
+        for label, query in QUERIES:
+            await measure(label, query)
+    finally:
+        await db.close_pool()
+        drop_temp_db(path)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
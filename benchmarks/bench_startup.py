@@ -0,0 +1,66 @@
+"""
+Startup cost of the server: cold import of task_server, then the first tool
+call through an in-process client (which runs the lifespan and the schema
+migrations). Each run is a fresh interpreter in an empty directory.
+
+    uv run python benchmarks/bench_startup.py
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from common import SERVER_DIR
+
+RUNS = 10
+
+PROBE = """
+import asyncio, json, sys, time
+sys.path.insert(0, {server!r})
+start = time.perf_counter()
+from task_server import mcp
+imported = time.perf_counter()
+
+async def first_call():
+    from fastmcp import Client
+    async with Client(mcp) as client:
+        await client.call_tool("add_task", {{"title": "first"}})
+
+asyncio.run(first_call())
+called = time.perf_counter()
+print(json.dumps({{"import": imported - start, "first_call": called - imported}}))
+"""
+
+
+def probe() -> dict:
+    with tempfile.TemporaryDirectory() as cwd:
+        output = subprocess.run(
+            [
+                sys.executable,
+                "-W",
+                "ignore",
+                "-c",
+                PROBE.format(server=str(SERVER_DIR)),
+            ],
+            cwd=cwd,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    runs = [probe() for _ in range(RUNS)]
+    for phase in ("import", "first_call"):
+        samples = [run[phase] * 1000 for run in runs]
+        print(
+            f"{phase:<12} median {statistics.median(samples):8.1f} ms"
+            f"  min {min(samples):8.1f} ms  max {max(samples):8.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Rows per second of the NDJSON export and import at 100k tasks, with the
+export's peak memory. Import runs into an empty project (one transaction,
+stats and search rebuilt at the end) and into one that already holds a task
+(per-batch transactions, triggers on) at several batch sizes, next to its two
+halves: parsing and checking the lines, and inserting already parsed rows
+(insert_tasks, new ids). A bare executemany into a table with no index or
+trigger gives the ceiling on this machine.
+
+    uv run python benchmarks/bench_transfer.py
+"""
+
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+from common import db, drop_temp_db, use_temp_db
+
+TASKS = 100_000
+BATCH_SIZES = (1_000, 5_000, 20_000)
+
+
+def report(label: str, elapsed: float, extra: str = "") -> None:
+    print(f"{label:<40} {elapsed:7.3f}s  {TASKS / elapsed:9.0f} rows/s  {extra}")
+
+
+async def seed() -> None:
+    for start in range(0, TASKS, 10_000):
+        items = [
+            (f"task {i}", f"description {i}", i % len(db.PRIORITIES), None)
+            for i in range(start, start + 10_000)
+        ]
+        tasks = await db.insert_tasks(items, db.timestamp())
+        await db.update_tasks_status(
+            [t.id for t in tasks[::3]], "completed", db.timestamp()
+        )
+
+
+async def export(path: str) -> None:
+    tracemalloc.start()
+    start = time.perf_counter()
+    with open(path, "w", encoding="utf-8") as out:
+        async for chunk in db.export_tasks():
+            out.write(chunk)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    size = os.path.getsize(path) / 2**20
+    report("export_tasks", elapsed, f"peak {peak / 2**20:.1f} MiB, file {size:.1f} MiB")
+
+
+async def import_file(path: str, batch_size: int, empty: bool) -> None:
+    await db.clear_tasks()
+    if not empty:
+        # Takes id 1, so that line is skipped
+        await db.insert_task("existing", "", db.timestamp())
+    start = time.perf_counter()
+    with open(path, encoding="utf-8") as lines:
+        result = await db.import_tasks(lines, batch_size)
+    elapsed = time.perf_counter() - start
+    assert result["imported"] + result["skipped"] == TASKS
+    assert sum((await db.fetch_task_stats())["by_status"].values()) == TASKS
+    into = "empty" if empty else "non-empty"
+    report(f"import_tasks ({into}, batch {batch_size})", elapsed)
+
+
+async def insert_rows(path: str) -> None:
+    await db.clear_tasks()
+    with open(path, encoding="utf-8") as lines:
+        start = time.perf_counter()
+        rows = [db.import_row(line) for line in lines]
+        report("import_row (parse and check)", time.perf_counter() - start)
+    start = time.perf_counter()
+    for chunk in range(0, TASKS, 5_000):
+        items = [row[1:3] + row[6:] for row in rows[chunk : chunk + 5_000]]
+        await db.insert_tasks(items, db.timestamp())
+    report("insert_tasks (parsed rows)", time.perf_counter() - start)
+
+
+def bare_insert(path: str) -> None:
+    with open(path, encoding="utf-8") as lines:
+        rows = [db.import_row(line) for line in lines]
+    with tempfile.TemporaryDirectory() as directory:
+        conn = sqlite3.connect(os.path.join(directory, "bare.db"))
+        conn.execute(f"CREATE TABLE tasks ({', '.join(db.TASK_FIELDS)})")
+        start = time.perf_counter()
+        conn.executemany(
+            f"INSERT INTO tasks VALUES ({', '.join('?' * len(db.TASK_FIELDS))})", rows
+        )
+        conn.commit()
+        report("bare executemany (ceiling)", time.perf_counter() - start)
+        conn.close()
+
+
+async def main() -> None:
+    path = use_temp_db()
+    fd, ndjson = tempfile.mkstemp(suffix=".ndjson", prefix="bench-")
+    os.close(fd)
+    try:
+        await db.init_db()
+        await db.open_pool()
+        await seed()
+
+        await export(ndjson)
+        for batch_size in BATCH_SIZES:
+            await import_file(ndjson, batch_size, empty=True)
+        for batch_size in BATCH_SIZES:
+            await import_file(ndjson, batch_size, empty=False)
+        await insert_rows(ndjson)
+        bare_insert(ndjson)
+    finally:
+        await db.close_pool()
+        drop_temp_db(path)
+        os.remove(ndjson)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Benchmarks run against a throwaway SQLite file so they never touch tasks.db.
+"""
+
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SERVER_DIR = Path(__file__).parent.parent / "server"
+sys.path.insert(0, str(SERVER_DIR))
+
+import db  # noqa: E402
+
+
+def use_temp_db() -> str:
+    """Points the db layer at a fresh temporary database file."""
+    fd, path = tempfile.mkstemp(suffix=".db", prefix="bench-")
+    os.close(fd)
+    os.remove(path)
+    db.DB_PATH = path
+    return path
+
+
+def drop_temp_db(path: str) -> None:
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+async def timed(label: str, calls: int, fn) -> float:
+    """Awaits ``fn()`` and prints the resulting calls per second."""
+    start = time.perf_counter()
+    await fn()
+    elapsed = time.perf_counter() - start
+    rate = calls / elapsed
+    print(f"{label:<40} {calls:>7} calls  {elapsed:8.3f}s  {rate:10.0f} calls/s")
+    return rate
+
+
+async def seed_tasks(count: int, chunk: int = 10_000) -> None:
+    """Bulk-inserts ``count`` pending tasks."""
+    now = "2026-01-01T00:00:00"
+    for start in range(0, count, chunk):
+        items = [
+            (f"task {i}", f"description {i}")
+            for i in range(start, min(start + chunk, count))
+        ]
+        await db.insert_tasks(items, now)
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of already sorted samples."""
+    index = max(0, min(len(samples) - 1, round(pct / 100 * len(samples)) - 1))
+    return samples[index]
+
+
+async def sample_latencies(
+    fn, min_iterations: int = 5, max_iterations: int = 1000, budget: float = 2.0
+) -> dict:
+    """
+    Awaits ``fn()`` repeatedly until ``max_iterations`` or the time budget runs
+    out (but at least ``min_iterations`` times) and summarises the latencies.
+    """
+    latencies = []
+    started = time.perf_counter()
+    while len(latencies) < max_iterations:
+        start = time.perf_counter()
+        await fn()
+        end = time.perf_counter()
+        latencies.append(end - start)
+        if len(latencies) >= min_iterations and end - started > budget:
+            break
+    latencies.sort()
+    return {
+        "iterations": len(latencies),
+        "throughput": len(latencies) / sum(latencies),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
@@ -0,0 +1,202 @@
+"""
+Offline microbenchmark suite for the db, tool/resource and MCP layers.
+
+Every case runs at each table size and reports throughput and p50/p95/p99
+latency; results are written to JSON so runs can be compared across commits.
+
+    uv run python benchmarks/suite.py --output before.json
+    uv run python benchmarks/suite.py --output after.json --compare before.json
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import platform
+import sqlite3
+import subprocess
+import time
+from datetime import datetime
+
+from common import (
+    SERVER_DIR,
+    db,
+    drop_temp_db,
+    sample_latencies,
+    seed_tasks,
+    use_temp_db,
+)
+
+SIZES = (0, 1_000, 100_000)
+LEVELS = ("db", "direct", "mcp")
+
+
+def db_cases(size: int) -> dict:
+    counter = itertools.count(1)
+
+    async def update():
+        await db.update_task_status(
+            next(counter) % max(size, 1) + 1, "completed", db.timestamp()
+        )
+
+    return {
+        "insert_task": lambda: db.insert_task("bench", "", db.timestamp()),
+        "update_task_status": update,
+        "fetch_tasks_page": lambda: db.fetch_tasks_page(size // 2, 100),
+        "query_tasks(pending, 100)": lambda: db.query_tasks(
+            status="pending", limit=100
+        ),
+        "fetch_all_tasks": db.fetch_all_tasks,
+    }
+
+
+def direct_cases(size: int) -> dict:
+    from resources.cache import resource_cache
+    from resources.resources import get_all_tasks, get_pending_tasks, get_tasks_page
+    from tools.tools import add_tool, complete_task, list_tasks
+
+    counter = itertools.count(1)
+
+    async def uncached(read):
+        resource_cache.clear()
+        return await read()
+
+    return {
+        "add_tool": lambda: add_tool("bench"),
+        "complete_task": lambda: complete_task(next(counter) % max(size, 1) + 1),
+        "list_tasks(pending)": lambda: list_tasks(status="pending"),
+        "get_tasks_page": lambda: get_tasks_page(size // 2),
+        "get_all_tasks (cached)": get_all_tasks,
+        "get_all_tasks (uncached)": lambda: uncached(get_all_tasks),
+        "get_pending_tasks (uncached)": lambda: uncached(get_pending_tasks),
+    }
+
+
+def mcp_cases(client, size: int) -> dict:
+    return {
+        "call add_task": lambda: client.call_tool("add_task", {"title": "bench"}),
+        "call list_tasks(pending)": lambda: client.call_tool(
+            "list_tasks", {"status": "pending"}
+        ),
+        "read tasks://all/page": lambda: client.read_resource(
+            f"tasks://all/page?cursor={size // 2}"
+        ),
+        "read tasks://all": lambda: client.read_resource("tasks://all"),
+    }
+
+
+async def run_cases(level: str, size: int, cases: dict, args) -> list[dict]:
+    results = []
+    for name, fn in cases.items():
+        stats = await sample_latencies(
+            fn, max_iterations=args.iterations, budget=args.budget
+        )
+        results.append({"level": level, "case": name, "size": size, **stats})
+        print(
+            f"{level:<7} {name:<30} {size:>7}  {stats['throughput']:10.0f} ops/s"
+            f"  p50 {stats['p50_ms']:8.3f}  p95 {stats['p95_ms']:8.3f}"
+            f"  p99 {stats['p99_ms']:8.3f} ms"
+        )
+    return results
+
+
+async def prepare(size: int) -> None:
+    await db.init_db()
+    await db.clear_tasks()
+    await seed_tasks(size)
+
+
+async def run(args) -> list[dict]:
+    from fastmcp import Client
+    from task_server import mcp
+
+    results = []
+    for size in args.sizes:
+        await db.open_pool()
+        try:
+            await prepare(size)
+            if "db" in args.levels:
+                results += await run_cases("db", size, db_cases(size), args)
+            if "direct" in args.levels:
+                await prepare(size)
+                results += await run_cases("direct", size, direct_cases(size), args)
+        finally:
+            await db.close_pool()
+
+        if "mcp" in args.levels:
+            await prepare(size)
+            # The client runs the server lifespan, which opens its own pool
+            async with Client(mcp) as client:
+                results += await run_cases("mcp", size, mcp_cases(client, size), args)
+    return results
+
+
+def git_commit() -> str | None:
+    try:
+        done = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=SERVER_DIR,
+            capture_output=True,
+            text=True,
+        )
+    except OSError:
+        return None
+    return done.stdout.strip() if done.returncode == 0 else None
+
+
+def compare(results: list[dict], baseline_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = {
+            (r["level"], r["case"], r["size"]): r for r in json.load(f)["results"]
+        }
+    print(f"\nthroughput vs {baseline_path}:")
+    for r in results:
+        before = baseline.get((r["level"], r["case"], r["size"]))
+        if before is None:
+            continue
+        ratio = r["throughput"] / before["throughput"]
+        flag = "  REGRESSION" if ratio < 0.9 else ""
+        print(f"{r['level']:<7} {r['case']:<30} {r['size']:>7}  {ratio:6.2f}x{flag}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--levels", nargs="+", choices=LEVELS, default=list(LEVELS))
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument(
+        "--budget", type=float, default=2.0, help="seconds per case (soft limit)"
+    )
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", metavar="BASELINE_JSON")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    path = use_temp_db()
+    try:
+        started = time.perf_counter()
+        results = asyncio.run(run(args))
+    finally:
+        drop_temp_db(path)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "duration_s": round(time.perf_counter() - started, 1),
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nwrote {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,528 @@
+"""
+Load generator for the task server. Opens N concurrent MCP client sessions
+(in-process, one stdio server process each, or over HTTP) and sends them a
+weighted mix of tool calls and resource reads at a target rate, or replays
+recorded traffic from a JSONL file. Reports throughput, latency percentiles
+and errors per operation, and with --ramp the rate where throughput saturates.
+
+    uv run python client/loadgen.py --sessions 8 --rate 200 --duration 10
+    uv run python client/loadgen.py --mix add_task=1,stats://tasks=4 --rate 0
+    uv run python client/loadgen.py --transport stdio --ramp 50,100,200,400
+    uv run python client/loadgen.py --transport http \\
+        --url http://127.0.0.1:8000/mcp --ramp 200,400,800,1600
+    uv run python client/loadgen.py --record traffic.jsonl --duration 30
+    uv run python client/loadgen.py --replay traffic.jsonl --speed 2
+
+A replay file holds one call per line, either
+{"tool": "add_task", "arguments": {"title": "..."}} or
+{"resource": "stats://tasks"}, each with an optional "at": seconds from the
+start of the run. Without "at" (or with --rate) calls go out at --rate, and
+with --rate 0 each session sends its next call as soon as the last returns.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import AsyncExitStack, contextmanager, nullcontext
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from fastmcp import Client
+from fastmcp.client.transports import PythonStdioTransport
+
+SERVER_DIR = Path(__file__).parent.parent / "server"
+SERVER_PATH = SERVER_DIR / "task_server.py"
+
+TRANSPORTS = ("inprocess", "stdio", "http")
+# A ramp step saturates once it serves less than this share of its target rate
+SATURATION_SHARE = 0.95
+
+
+@dataclass(slots=True, frozen=True)
+class Call:
+    kind: str  # "tool" or "resource"
+    name: str  # tool name or resource URI
+    arguments: dict = field(default_factory=dict)
+    at: float | None = None
+
+    @property
+    def label(self) -> str:
+        # Resource reads are grouped by URI without their query string
+        return self.name.split("?")[0]
+
+    def to_dict(self) -> dict:
+        line = (
+            {"tool": self.name, "arguments": self.arguments}
+            if self.kind == "tool"
+            else {"resource": self.name}
+        )
+        if self.at is not None:
+            line["at"] = round(self.at, 6)
+        return line
+
+
+# Operations a mix can name; each builds one call from the RNG and the number
+# of tasks the server is believed to hold
+OPERATIONS: dict[str, Callable[[random.Random, int], Call]] = {
+    "add_task": lambda rng, tasks: Call(
+        "tool", "add_task", {"title": f"load {tasks}", "description": "loadgen"}
+    ),
+    "complete_task": lambda rng, tasks: Call(
+        "tool", "complete_task", {"task_id": rng.randint(1, tasks)}
+    ),
+    "list_tasks": lambda rng, tasks: Call(
+        "tool", "list_tasks", {"status": "pending", "limit": 20}
+    ),
+    "search_tasks": lambda rng, tasks: Call(
+        "tool", "search_tasks", {"query": "load", "limit": 20}
+    ),
+    "tasks://all/page": lambda rng, tasks: Call(
+        "resource", f"tasks://all/page?cursor={rng.randint(0, tasks)}&limit=50"
+    ),
+    "tasks://all": lambda rng, tasks: Call("resource", "tasks://all"),
+    "task://pending": lambda rng, tasks: Call("resource", "task://pending"),
+    "stats://tasks": lambda rng, tasks: Call("resource", "stats://tasks"),
+}
+
+DEFAULT_MIX = (
+    "add_task=2,complete_task=1,list_tasks=3,search_tasks=1,"
+    "tasks://all/page=2,task://pending=1,stats://tasks=2"
+)
+
+
+def parse_mix(text: str) -> dict[str, float]:
+    """
+    Parses "name=weight,..." into operation weights
+    """
+    mix = {}
+    for item in filter(None, (part.strip() for part in text.split(","))):
+        name, _, weight = item.rpartition("=")
+        if not name or name not in OPERATIONS:
+            raise ValueError(
+                f"Unknown operation {item!r}; choose from {', '.join(OPERATIONS)}"
+            )
+        try:
+            mix[name] = float(weight)
+        except ValueError:
+            raise ValueError(f"Weight of {name} is not a number: {weight!r}") from None
+        if mix[name] < 0:
+            raise ValueError(f"Weight of {name} is negative")
+    if not any(mix.values()):
+        raise ValueError("The mix has no operation with a positive weight")
+    return mix
+
+
+def generate(mix: dict[str, float], tasks: int = 0, seed: int | None = None):
+    """
+    Endless stream of calls drawn from ``mix``
+    """
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    while True:
+        name = rng.choices(names, weights)[0]
+        if name == "add_task":
+            tasks += 1
+        yield OPERATIONS[name](rng, max(tasks, 1))
+
+
+def load_replay(path: str | Path) -> list[Call]:
+    """
+    Reads recorded calls from a JSONL file
+    """
+    calls = []
+    with open(path, encoding="utf-8") as file:
+        for number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+                at = entry.get("at")
+                if "tool" in entry:
+                    call = Call("tool", entry["tool"], entry.get("arguments", {}), at)
+                elif "resource" in entry:
+                    call = Call("resource", entry["resource"], at=at)
+                else:
+                    raise ValueError("expected a tool or a resource")
+            except (ValueError, AttributeError) as exc:
+                raise ValueError(f"{path}:{number}: {exc}") from None
+            calls.append(call)
+    return calls
+
+
+def schedule(
+    calls: Iterable[Call], rate: float, speed: float = 1.0
+) -> Iterator[tuple[Call, float | None]]:
+    """
+    Pairs each call with its send time in seconds from the start: the
+    recorded one (divided by ``speed``) unless ``rate`` is set, then one every
+    1/rate seconds, or None to send it as soon as a session is free
+    """
+    for i, call in enumerate(calls):
+        if rate > 0:
+            yield call, i / rate
+        elif call.at is not None:
+            yield call, call.at / speed
+        else:
+            yield call, None
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    # Nearest rank, on sorted samples
+    index = max(0, min(len(samples) - 1, round(pct / 100 * len(samples)) - 1))
+    return samples[index]
+
+
+def _summary(latencies: list[float], errors: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    calls = len(latencies)
+    summary = {
+        "calls": calls,
+        "errors": errors,
+        "error_rate": errors / calls if calls else 0.0,
+        "throughput": calls / elapsed if elapsed else 0.0,
+    }
+    for pct in (50, 90, 99):
+        summary[f"p{pct}_ms"] = (
+            _percentile(latencies, pct) * 1000 if latencies else None
+        )
+    summary["max_ms"] = latencies[-1] * 1000 if latencies else None
+    return summary
+
+
+class Recorder:
+    """
+    Latencies and errors of one run, by operation
+    """
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: Counter[str] = Counter()
+        self.error_kinds: Counter[str] = Counter()
+
+    def record(self, label: str, latency: float, error: str | None) -> None:
+        self.latencies[label].append(latency)
+        if error is not None:
+            self.errors[label] += 1
+            self.error_kinds[error] += 1
+
+    def report(self, elapsed: float, **extra) -> dict:
+        every = [x for latencies in self.latencies.values() for x in latencies]
+        return {
+            **extra,
+            "elapsed_s": elapsed,
+            **_summary(every, self.errors.total(), elapsed),
+            "operations": {
+                label: _summary(latencies, self.errors[label], elapsed)
+                for label, latencies in sorted(self.latencies.items())
+            },
+            "error_kinds": dict(self.error_kinds.most_common()),
+        }
+
+
+async def execute(client: Client, call: Call) -> str | None:
+    """
+    Sends one call and returns what went wrong, or None. A tool that
+    answers with an error dict counts as an error too.
+    """
+    try:
+        if call.kind == "resource":
+            await client.read_resource(call.name)
+            return None
+        result = await client.call_tool(call.name, call.arguments, raise_on_error=False)
+    except Exception as exc:
+        return type(exc).__name__
+    content = result.structured_content
+    if result.is_error:
+        return "tool error"
+    if isinstance(content, dict) and "error" in content:
+        return "error result"
+    return None
+
+
+async def run(
+    clients: list[Client],
+    calls: Iterable[tuple[Call, float | None]],
+    duration: float | None = None,
+    record: list[Call] | None = None,
+) -> dict:
+    """
+    Sends ``calls`` (from ``schedule``) through the open ``clients`` until
+    they run out or ``duration`` seconds pass. Latency counts from each
+    call's send time, so time spent queued behind a busy server counts too.
+    Calls still queued at the deadline are reported as backlog, not sent.
+    """
+    recorder = Recorder()
+    # Timed calls queue up without limit; untimed ones wait for a free session
+    queue: asyncio.Queue = asyncio.Queue()
+    free = asyncio.Semaphore(len(clients))
+    start = time.perf_counter()
+    deadline = start + duration if duration is not None else float("inf")
+    sent = 0
+
+    async def produce():
+        nonlocal sent
+        for call, offset in calls:
+            if offset is None:
+                await free.acquire()
+                when = time.perf_counter()
+            else:
+                when = start + offset
+                delay = when - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            if when >= deadline:
+                break
+            if record is not None:
+                record.append(Call(call.kind, call.name, call.arguments, when - start))
+            queue.put_nowait((call, when, offset is None))
+            sent += 1
+        for _ in clients:
+            queue.put_nowait(None)
+
+    async def work(client: Client):
+        while (item := await queue.get()) is not None:
+            call, when, untimed = item
+            if time.perf_counter() >= deadline:
+                if untimed:
+                    free.release()
+                continue
+            error = await execute(client, call)
+            recorder.record(call.label, time.perf_counter() - when, error)
+            if untimed:
+                free.release()
+
+    await asyncio.gather(produce(), *(work(client) for client in clients))
+    elapsed = min(time.perf_counter(), deadline) - start
+    completed = sum(map(len, recorder.latencies.values()))
+    return recorder.report(
+        elapsed, sessions=len(clients), sent=sent, backlog=sent - completed
+    )
+
+
+def saturation(steps: list[dict]) -> dict:
+    """
+    From ramp steps (each a report with its target rate), the highest rate
+    served in full and the first one that was not
+    """
+    sustained = None
+    for step in steps:
+        if step["throughput"] < step["target_rate"] * SATURATION_SHARE:
+            return {
+                "sustained_rate": sustained,
+                "saturated_at": step["target_rate"],
+                "max_throughput": max(s["throughput"] for s in steps),
+            }
+        sustained = step["target_rate"]
+    return {
+        "sustained_rate": sustained,
+        "saturated_at": None,
+        "max_throughput": max((s["throughput"] for s in steps), default=0.0),
+    }
+
+
+@contextmanager
+def in_directory(directory: str):
+    """
+    Points the in-process server at the databases in ``directory``
+    """
+    import db
+
+    saved = db.DB_PATH, db.PROJECTS_DIR
+    db.DB_PATH = str(Path(directory) / "tasks.db")
+    db.PROJECTS_DIR = str(Path(directory) / "projects")
+    try:
+        yield
+    finally:
+        db.DB_PATH, db.PROJECTS_DIR = saved
+
+
+def make_client(transport: str, directory: str, url: str | None = None) -> Client:
+    if transport == "inprocess":
+        from task_server import mcp
+
+        return Client(mcp)
+    if transport == "stdio":
+        return Client(
+            PythonStdioTransport(SERVER_PATH, cwd=directory, keep_alive=False)
+        )
+    if transport == "http":
+        if not url:
+            raise ValueError("HTTP transport needs a server URL")
+        return Client(url)
+    raise ValueError(f"Unknown transport {transport!r}")
+
+
+async def open_sessions(
+    stack: AsyncExitStack, sessions: int, transport: str, directory: str, url=None
+) -> list[Client]:
+    """
+    Connects ``sessions`` clients. The first connects alone, so a single
+    server lifespan (in process) or process (stdio) migrates the database.
+    """
+    first = await stack.enter_async_context(make_client(transport, directory, url))
+    rest = [make_client(transport, directory, url) for _ in range(sessions - 1)]
+    await asyncio.gather(*(client.__aenter__() for client in rest))
+    for client in rest:
+        stack.push_async_exit(client)
+    return [first, *rest]
+
+
+async def seed(client: Client, count: int, batch: int = 500) -> None:
+    for start in range(0, count, batch):
+        tasks = [
+            {"title": f"load seed {i}", "description": "loadgen"}
+            for i in range(start, min(start + batch, count))
+        ]
+        await client.call_tool("add_tasks", {"tasks": tasks})
+
+
+def print_report(report: dict) -> None:
+    def ms(value):
+        return f"{value:9.2f}" if value is not None else f"{'-':>9}"
+
+    print(
+        f"{report['sessions']} sessions, {report['calls']} calls in"
+        f" {report['elapsed_s']:.2f}s: {report['throughput']:.0f} calls/s,"
+        f" {report['error_rate']:.2%} errors, {report['backlog']} left queued"
+    )
+    header = f"{'operation':<20} {'calls':>7} {'errors':>7} {'calls/s':>9}"
+    print(
+        header + "".join(f" {p:>9}" for p in ("p50 ms", "p90 ms", "p99 ms", "max ms"))
+    )
+    rows = [*report["operations"].items(), ("all", report)]
+    for label, stats in rows:
+        print(
+            f"{label:<20} {stats['calls']:>7} {stats['errors']:>7}"
+            f" {stats['throughput']:>9.0f} {ms(stats['p50_ms'])} {ms(stats['p90_ms'])}"
+            f" {ms(stats['p99_ms'])} {ms(stats['max_ms'])}"
+        )
+    for kind, count in report["error_kinds"].items():
+        print(f"  {count} x {kind}")
+
+
+async def main_async(args) -> dict:
+    directory = args.directory or tempfile.mkdtemp(prefix="loadgen-")
+    if args.replay:
+        calls = load_replay(args.replay)
+    else:
+        calls = generate(parse_mix(args.mix), args.seed, args.random_seed)
+
+    with in_directory(directory) if args.transport == "inprocess" else nullcontext():
+        async with AsyncExitStack() as stack:
+            clients = await open_sessions(
+                stack, args.sessions, args.transport, directory, args.url
+            )
+            await seed(clients[0], args.seed)
+            recorded = [] if args.record else None
+
+            if not args.ramp:
+                report = await run(
+                    clients,
+                    schedule(calls, args.rate, args.speed),
+                    args.duration,
+                    recorded,
+                )
+                print_report(report)
+            else:
+                steps = []
+                for rate in args.ramp:
+                    step = await run(
+                        clients, schedule(calls, rate), args.duration, recorded
+                    )
+                    step["target_rate"] = rate
+                    print(f"\ntarget {rate:g} calls/s")
+                    print_report(step)
+                    steps.append(step)
+                report = {"steps": steps, "saturation": saturation(steps)}
+                found = report["saturation"]
+                print(
+                    f"\nsustained {found['sustained_rate']} calls/s,"
+                    f" saturated at {found['saturated_at']} calls/s,"
+                    f" peak {found['max_throughput']:.0f} calls/s"
+                )
+
+    if args.record:
+        with open(args.record, "w", encoding="utf-8") as file:
+            file.writelines(json.dumps(call.to_dict()) + "\n" for call in recorded)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2))
+    return report
+
+
+def parse_args(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--transport", choices=TRANSPORTS, default="inprocess")
+    parser.add_argument("--url", help="server URL for --transport http")
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument(
+        "--rate",
+        type=float,
+        help="calls/s in total (default 100, or the recorded times when"
+        " replaying); 0 = unthrottled",
+    )
+    parser.add_argument(
+        "--duration", type=float, default=None, help="seconds per run or ramp step"
+    )
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--replay", help="JSONL file of calls to send instead")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay time scale")
+    parser.add_argument("--record", help="write the calls sent to this JSONL file")
+    parser.add_argument(
+        "--ramp",
+        type=lambda text: [float(rate) for rate in text.split(",")],
+        help="comma-separated target rates to find where throughput saturates",
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        metavar="N",
+        help="add N tasks before the run (default 1000 on a temporary database,"
+        " 0 with --url or --directory)",
+    )
+    parser.add_argument("--random-seed", type=int, default=None)
+    parser.add_argument(
+        "--directory", help="where the server keeps its databases (default: temp)"
+    )
+    parser.add_argument("--output", help="also write the report as JSON here")
+    args = parser.parse_args(argv)
+
+    if args.transport == "http" and not args.url:
+        parser.error("--transport http needs --url")
+    if args.sessions < 1:
+        parser.error("--sessions must be at least 1")
+    if args.seed is None:
+        # Never write into a database the caller pointed us at unless asked
+        args.seed = 0 if args.url or args.directory else 1000
+    elif args.seed < 0:
+        parser.error("--seed must not be negative")
+    if not args.replay:
+        try:
+            parse_mix(args.mix)
+        except ValueError as exc:
+            parser.error(str(exc))
+        if args.duration is None:
+            args.duration = 10.0
+    if args.ramp and any(rate <= 0 for rate in args.ramp):
+        parser.error("--ramp rates must be positive")
+    if args.ramp and (args.replay or args.record):
+        parser.error("--ramp cannot be combined with --replay or --record")
+    if args.rate is None:
+        args.rate = 0.0 if args.replay else 100.0
+    return args
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    if args.transport == "inprocess":
+        sys.path.insert(0, str(SERVER_DIR))
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
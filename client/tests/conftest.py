@@ -0,0 +1,13 @@
+import asyncio
+
+import db
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def reset_state():
+    """Initialises the DB and clears all tasks around each test."""
+    asyncio.run(db.init_db())
+    asyncio.run(db.clear_tasks())
+    yield
+    asyncio.run(db.clear_tasks())
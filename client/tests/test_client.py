@@ -1,10 +1,34 @@
 import asyncio
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
 
 import db
+import httpx
 import pytest
+import storage
+import task_server
 from fastmcp import Client, FastMCP
-from resources.resources import get_all_tasks, get_pending_tasks
-from tools.tools import add_tool, complete_task, delete_task
+from fastmcp.client.messages import MessageHandler
+from mcp.shared.exceptions import McpError
+from notifications import notifier
+from pydantic import AnyUrl
+from resources.resources import get_all_tasks, get_pending_tasks, get_tasks_page
+from tools.tools import (
+    add_tasks,
+    add_tool,
+    archived_tasks,
+    complete_task,
+    complete_tasks,
+    delete_task,
+    delete_tasks,
+    list_tasks,
+    search_tasks,
+)
 
 
 @pytest.fixture
@@ -14,18 +38,27 @@ def mcp_server():
     mcp.tool(name="add_task")(add_tool)
     mcp.tool()(complete_task)
     mcp.tool()(delete_task)
+    mcp.tool()(add_tasks)
+    mcp.tool()(complete_tasks)
+    mcp.tool()(delete_tasks)
+    mcp.tool()(list_tasks)
+    mcp.tool()(search_tasks)
+    mcp.tool()(archived_tasks)
     mcp.resource("tasks://all")(get_all_tasks)
     mcp.resource("task://pending")(get_pending_tasks)
+    mcp.resource("tasks://all/page{?cursor,limit}")(get_tasks_page)
     return mcp
 
 
-@pytest.fixture(autouse=True)
-def reset_state():
-    """Initialises the DB and clears all tasks before each test."""
-    asyncio.run(db.init_db())
-    asyncio.run(db.clear_tasks())
+@pytest.fixture(autouse=True, params=list(storage.BACKENDS))
+def reset_state(request):
+    """Runs each test on every storage backend, starting with no tasks."""
+    store = storage.use_backend(request.param)
+    asyncio.run(store.init_db())
+    asyncio.run(store.clear_tasks())
     yield
-    asyncio.run(db.clear_tasks())
+    asyncio.run(store.clear_tasks())
+    storage.use_backend(storage.STORAGE)
 
 
 # ---------------------------------------------------------------------------
@@ -42,6 +75,7 @@ class TestListTools:
             assert "add_task" in names
             assert "complete_task" in names
             assert "delete_task" in names
+            assert {"add_tasks", "complete_tasks", "delete_tasks"} <= names
 
 
 # ---------------------------------------------------------------------------
@@ -84,6 +118,51 @@ class TestAddTask:
             assert result.data["status"] == "pending"
 
 
+# ---------------------------------------------------------------------------
+# concurrency
+# ---------------------------------------------------------------------------
+
+
+class TestConcurrency:
+    @pytest.mark.anyio
+    async def test_add_task_paralelo_sem_loops_ou_threads_extras(
+        self, mcp_server, monkeypatch
+    ):
+        await storage.backend().startup()
+        try:
+
+            def no_new_loops():
+                raise AssertionError("tool call created a new event loop")
+
+            monkeypatch.setattr(asyncio.events, "new_event_loop", no_new_loops)
+
+            async with Client(mcp_server) as client:
+                baseline = threading.active_count()
+                peak = baseline
+                done = asyncio.Event()
+
+                async def sample_threads():
+                    nonlocal peak
+                    while not done.is_set():
+                        peak = max(peak, threading.active_count())
+                        await asyncio.sleep(0)
+
+                sampler = asyncio.create_task(sample_threads())
+                results = await asyncio.gather(
+                    *(
+                        client.call_tool("add_task", {"title": f"Tarefa {i}"})
+                        for i in range(100)
+                    )
+                )
+                done.set()
+                await sampler
+
+            assert sorted(r.data["id"] for r in results) == list(range(1, 101))
+            assert peak == baseline
+        finally:
+            await storage.backend().shutdown()
+
+
 # ---------------------------------------------------------------------------
 # complete_task
 # ---------------------------------------------------------------------------
@@ -139,6 +218,94 @@ class TestDeleteTask:
             assert "error" in result.data
 
 
+# ---------------------------------------------------------------------------
+# batch tools
+# ---------------------------------------------------------------------------
+
+
+class TestBatchTools:
+    @pytest.mark.anyio
+    async def test_add_tasks(self, mcp_server):
+        async with Client(mcp_server) as client:
+            result = await client.call_tool(
+                "add_tasks",
+                {"tasks": [{"title": "A"}, {"title": "B", "description": "Desc"}]},
+            )
+            tasks = result.data["tasks"]
+            assert [t["id"] for t in tasks] == [1, 2]
+            assert tasks[1]["description"] == "Desc"
+
+    @pytest.mark.anyio
+    async def test_complete_e_delete_tasks(self, mcp_server):
+        async with Client(mcp_server) as client:
+            await client.call_tool(
+                "add_tasks", {"tasks": [{"title": "A"}, {"title": "B"}]}
+            )
+
+            completed = await client.call_tool("complete_tasks", {"task_ids": [1, 9]})
+            assert completed.data["results"][0]["status"] == "completed"
+            assert "error" in completed.data["results"][1]
+
+            deleted = await client.call_tool("delete_tasks", {"task_ids": [2, 9]})
+            assert deleted.data["results"][0]["success"] is True
+            assert deleted.data["results"][1]["success"] is False
+
+
+# ---------------------------------------------------------------------------
+# list_tasks
+# ---------------------------------------------------------------------------
+
+
+class TestListTasks:
+    @pytest.mark.anyio
+    async def test_filtra_pendentes(self, mcp_server):
+        async with Client(mcp_server) as client:
+            await client.call_tool("add_task", {"title": "Pendente"})
+            done = await client.call_tool("add_task", {"title": "Concluida"})
+            await client.call_tool("complete_task", {"task_id": done.data["id"]})
+
+            result = await client.call_tool("list_tasks", {"status": "pending"})
+            assert [t["title"] for t in result.data["tasks"]] == ["Pendente"]
+
+
+# ---------------------------------------------------------------------------
+# search_tasks
+# ---------------------------------------------------------------------------
+
+
+class TestSearchTasks:
+    @pytest.mark.anyio
+    async def test_busca_com_trecho(self, mcp_server):
+        async with Client(mcp_server) as client:
+            await client.call_tool(
+                "add_task", {"title": "Deploy", "description": "subir a versão nova"}
+            )
+            await client.call_tool("add_task", {"title": "Outra coisa"})
+
+            result = await client.call_tool("search_tasks", {"query": "versão"})
+            tasks = result.data["tasks"]
+            assert [t["title"] for t in tasks] == ["Deploy"]
+            assert "**versão**" in tasks[0]["snippet"]
+
+
+# ---------------------------------------------------------------------------
+# archived_tasks
+# ---------------------------------------------------------------------------
+
+
+class TestArchivedTasks:
+    @pytest.mark.anyio
+    async def test_lista_concluidas_arquivadas(self, mcp_server):
+        async with Client(mcp_server) as client:
+            task = await client.call_tool("add_task", {"title": "Antiga"})
+            await client.call_tool("complete_task", {"task_id": task.data["id"]})
+            await client.call_tool("add_task", {"title": "Pendente"})
+            await storage.backend().archive_tasks(db.timestamp())
+
+            result = await client.call_tool("archived_tasks", {})
+            assert [t["title"] for t in result.data["tasks"]] == ["Antiga"]
+
+
 # ---------------------------------------------------------------------------
 # list_resources
 # ---------------------------------------------------------------------------
@@ -182,6 +349,186 @@ class TestReadAllTasks:
             assert "completed" in result[0].text
 
 
+# ---------------------------------------------------------------------------
+# read_resource tasks://all/page
+# ---------------------------------------------------------------------------
+
+
+class TestReadTasksPage:
+    @pytest.mark.anyio
+    async def test_lista_template(self, mcp_server):
+        async with Client(mcp_server) as client:
+            templates = await client.list_resource_templates()
+            uris = {t.uriTemplate for t in templates}
+            assert "tasks://all/page{?cursor,limit}" in uris
+
+    @pytest.mark.anyio
+    async def test_pagina_com_cursor(self, mcp_server):
+        async with Client(mcp_server) as client:
+            await client.call_tool(
+                "add_tasks", {"tasks": [{"title": f"T{i}"} for i in range(1, 4)]}
+            )
+
+            first = await client.read_resource("tasks://all/page?limit=2")
+            assert "Next cursor: 2" in first[0].text
+
+            rest = await client.read_resource("tasks://all/page?cursor=2&limit=2")
+            assert "T3" in rest[0].text
+            assert "End of list" in rest[0].text
+
+
+# ---------------------------------------------------------------------------
+# metrics://server
+# ---------------------------------------------------------------------------
+
+
+class TestMetrics:
+    @pytest.mark.anyio
+    async def test_registra_tools_e_resources_do_servidor(self):
+        async with Client(task_server.mcp) as client:
+            await client.call_tool("add_task", {"title": "Medida"})
+            await client.read_resource("tasks://all")
+
+            result = await client.read_resource("metrics://server")
+            data = json.loads(result[0].text)
+            assert data["tool"]["add_task"]["calls"] >= 1
+            assert data["resource"]["tasks://all"]["bytes"] > 0
+            assert data["query"]["insert_task"]["calls"] >= 1
+
+            prometheus = await client.read_resource("metrics://server/prometheus")
+            assert "tasktracker_latency_seconds_bucket" in prometheus[0].text
+
+
+# ---------------------------------------------------------------------------
+# Conditional reads
+# ---------------------------------------------------------------------------
+
+
+class TestConditionalReads:
+    @pytest.mark.anyio
+    async def test_since_atual_responde_nao_modificado(self):
+        async with Client(task_server.mcp) as client:
+            await client.call_tool("add_task", {"title": "Tarefa"})
+            first = (await client.read_resource("tasks://all"))[0].text
+            version = int(first.split("\n", 1)[0].removeprefix("Version: "))
+
+            again = await client.read_resource(f"tasks://all?since={version}")
+            stats = await client.read_resource(f"stats://tasks?since={version}")
+
+            assert again[0].text == f"Not modified since version {version}\n"
+            assert stats[0].text == again[0].text
+
+    @pytest.mark.anyio
+    async def test_since_antigo_devolve_a_lista(self):
+        async with Client(task_server.mcp) as client:
+            first = (await client.read_resource("task://pending"))[0].text
+            version = int(first.split("\n", 1)[0].removeprefix("Version: "))
+            await client.call_tool("add_task", {"title": "Nova"})
+
+            result = await client.read_resource(f"task://pending?since={version}")
+
+            assert "Nova" in result[0].text
+
+    @pytest.mark.anyio
+    async def test_templates_condicionais(self):
+        async with Client(task_server.mcp) as client:
+            templates = await client.list_resource_templates()
+            uris = {t.uriTemplate for t in templates}
+            assert {
+                "tasks://all{?since}",
+                "task://pending{?since}",
+                "stats://tasks{?since}",
+                "tasks://all/page{?cursor,limit,since}",
+            } <= uris
+
+
+# ---------------------------------------------------------------------------
+# JSON resources
+# ---------------------------------------------------------------------------
+
+
+class TestJsonResources:
+    @pytest.mark.anyio
+    async def test_le_campos_selecionados(self):
+        async with Client(task_server.mcp) as client:
+            await client.call_tool("add_task", {"title": "Pendente"})
+            done = await client.call_tool("add_task", {"title": "Concluida"})
+            await client.call_tool("complete_task", {"task_id": done.data["id"]})
+
+            everything = await client.read_resource("tasks://all.json?fields=id,title")
+            pending = await client.read_resource("task://pending.json?fields=title")
+
+            assert json.loads(everything[0].text)["tasks"] == [
+                [1, "Pendente"],
+                [2, "Concluida"],
+            ]
+            assert json.loads(pending[0].text)["tasks"] == [["Pendente"]]
+
+    @pytest.mark.anyio
+    async def test_templates_json(self):
+        async with Client(task_server.mcp) as client:
+            templates = await client.list_resource_templates()
+            mime_types = {t.uriTemplate: t.mimeType for t in templates}
+            assert mime_types["tasks://all.json{?fields,since}"] == "application/json"
+            assert (
+                mime_types["task://pending.json{?fields,since}"] == "application/json"
+            )
+
+
+# ---------------------------------------------------------------------------
+# read_resource stats://tasks
+# ---------------------------------------------------------------------------
+
+
+class TestTaskStats:
+    @pytest.mark.anyio
+    async def test_le_estatisticas(self):
+        async with Client(task_server.mcp) as client:
+            done = await client.call_tool("add_task", {"title": "Concluida"})
+            await client.call_tool("add_task", {"title": "Pendente"})
+            await client.call_tool("complete_task", {"task_id": done.data["id"]})
+
+            result = await client.read_resource("stats://tasks")
+            text = result[0].text
+            assert "Pending: 1" in text
+            assert "Completed: 1" in text
+
+    @pytest.mark.anyio
+    async def test_prompt_aponta_para_estatisticas(self):
+        async with Client(task_server.mcp) as client:
+            prompt = await client.get_prompt("task_summary_prompt")
+            assert "stats://tasks" in prompt.messages[0].content.text
+
+
+# ---------------------------------------------------------------------------
+# projects
+# ---------------------------------------------------------------------------
+
+
+class TestProjects:
+    @pytest.mark.anyio
+    async def test_projeto_separado(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(db, "PROJECTS_DIR", str(tmp_path))
+        async with Client(task_server.mcp) as client:
+            await client.call_tool("add_task", {"title": "Deploy", "project": "ops"})
+            await client.call_tool("add_task", {"title": "Outra"})
+
+            ops = await client.read_resource("projects://ops/tasks")
+            every = await client.call_tool("list_tasks", {"project": "*"})
+            assert "Deploy" in ops[0].text and "Outra" not in ops[0].text
+            assert {(t["project"], t["title"]) for t in every.data["tasks"]} == {
+                ("ops", "Deploy"),
+                ("default", "Outra"),
+            }
+
+    @pytest.mark.anyio
+    async def test_lista_templates_de_projeto(self):
+        async with Client(task_server.mcp) as client:
+            templates = await client.list_resource_templates()
+            uris = {t.uriTemplate for t in templates}
+            assert "projects://{project}/stats{?since}" in uris
+
+
 # ---------------------------------------------------------------------------
 # read_resource task://pending
 # ---------------------------------------------------------------------------
@@ -205,3 +552,161 @@ class TestReadPendingTasks:
             text = result[0].text
             assert "Pendente" in text
             assert "Concluida" not in text
+
+
+# ---------------------------------------------------------------------------
+# resource subscriptions
+# ---------------------------------------------------------------------------
+
+
+class UpdateCollector(MessageHandler):
+    def __init__(self):
+        self.updated: list[str] = []
+
+    async def on_resource_updated(self, message) -> None:
+        self.updated.append(str(message.params.uri))
+
+
+class TestResourceSubscriptions:
+    @pytest.fixture(autouse=True)
+    def fast_debounce(self, monkeypatch):
+        monkeypatch.setattr(notifier, "debounce", 0.05)
+        monkeypatch.setattr(notifier, "max_delay", 5.0)
+
+    @pytest.mark.anyio
+    async def test_anuncia_suporte(self):
+        async with Client(task_server.mcp) as client:
+            capabilities = client.initialize_result.capabilities
+            assert capabilities.resources.subscribe is True
+
+    @pytest.mark.anyio
+    async def test_rajada_de_escritas_gera_poucas_notificacoes(self):
+        collector = UpdateCollector()
+        async with Client(task_server.mcp, message_handler=collector) as client:
+            await client.session.subscribe_resource(AnyUrl("tasks://all"))
+            await client.session.subscribe_resource(AnyUrl("task://pending"))
+
+            await asyncio.gather(
+                *(
+                    client.call_tool("add_task", {"title": f"Tarefa {i}"})
+                    for i in range(500)
+                )
+            )
+            await asyncio.sleep(0.3)
+
+        assert 1 <= collector.updated.count("tasks://all") <= 5
+        assert 1 <= collector.updated.count("task://pending") <= 5
+
+    @pytest.mark.anyio
+    async def test_complete_e_delete_notificam(self):
+        collector = UpdateCollector()
+        async with Client(task_server.mcp, message_handler=collector) as client:
+            added = await client.call_tool("add_task", {"title": "Tarefa"})
+            await client.session.subscribe_resource(AnyUrl("task://pending"))
+
+            await client.call_tool("complete_task", {"task_id": added.data["id"]})
+            await asyncio.sleep(0.2)
+            assert collector.updated == ["task://pending"]
+
+            await client.call_tool("delete_task", {"task_id": added.data["id"]})
+            await asyncio.sleep(0.2)
+            assert collector.updated == ["task://pending"] * 2
+
+    @pytest.mark.anyio
+    async def test_escrita_sem_efeito_nao_notifica(self):
+        collector = UpdateCollector()
+        async with Client(task_server.mcp, message_handler=collector) as client:
+            await client.session.subscribe_resource(AnyUrl("tasks://all"))
+
+            await client.call_tool("complete_task", {"task_id": 999})
+            await client.call_tool("delete_task", {"task_id": 999})
+            await asyncio.sleep(0.2)
+
+        assert collector.updated == []
+
+    @pytest.mark.anyio
+    async def test_cancelar_assinatura(self):
+        collector = UpdateCollector()
+        async with Client(task_server.mcp, message_handler=collector) as client:
+            await client.session.subscribe_resource(AnyUrl("tasks://all"))
+            await client.session.unsubscribe_resource(AnyUrl("tasks://all"))
+
+            await client.call_tool("add_task", {"title": "Tarefa"})
+            await asyncio.sleep(0.2)
+
+        assert collector.updated == []
+
+    @pytest.mark.anyio
+    async def test_recurso_sem_suporte(self):
+        async with Client(task_server.mcp) as client:
+            with pytest.raises(McpError, match="does not support subscriptions"):
+                await client.session.subscribe_resource(AnyUrl("metrics://server"))
+
+
+# ---------------------------------------------------------------------------
+# HTTP transport
+# ---------------------------------------------------------------------------
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class TestHttpTransport:
+    @pytest.mark.anyio
+    async def test_ready_apenas_durante_o_lifespan(self):
+        transport = httpx.ASGITransport(app=task_server.http_app())
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as http:
+            assert (await http.get("/ready")).status_code == 503
+            async with task_server.lifespan(task_server.mcp):
+                response = await http.get("/ready")
+                assert response.status_code == 200
+                assert response.json()["status"] == "ready"
+            assert (await http.get("/ready")).status_code == 503
+
+    @pytest.mark.anyio
+    async def test_workers_compartilham_o_banco(self, tmp_path):
+        if storage.backend() is not db:
+            pytest.skip("the workers share tasks.db")
+        port = free_port()
+        server = subprocess.Popen(
+            [sys.executable, os.path.abspath(task_server.__file__)],
+            cwd=tmp_path,
+            env={
+                **os.environ,
+                "TASKS_TRANSPORT": "http",
+                "TASKS_HTTP_PORT": str(port),
+                "TASKS_HTTP_WORKERS": "2",
+            },
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            async with httpx.AsyncClient() as http:
+                for _ in range(200):
+                    try:
+                        ready = await http.get(f"http://127.0.0.1:{port}/ready")
+                        if ready.status_code == 200:
+                            break
+                    except httpx.TransportError:
+                        pass
+                    await asyncio.sleep(0.1)
+                else:
+                    pytest.fail("HTTP server never became ready")
+
+            async with Client(f"http://127.0.0.1:{port}/mcp") as client:
+                results = await asyncio.gather(
+                    *(
+                        client.call_tool("add_task", {"title": f"Tarefa {i}"})
+                        for i in range(20)
+                    )
+                )
+                listed = await client.call_tool("list_tasks", {})
+
+            assert sorted(r.data["id"] for r in results) == list(range(1, 21))
+            assert len(listed.data["tasks"]) == 20
+        finally:
+            server.send_signal(signal.SIGINT)
+            assert server.wait(timeout=30) == 0
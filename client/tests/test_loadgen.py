@@ -0,0 +1,161 @@
+import itertools
+import json
+
+import loadgen
+import pytest
+from fastmcp import Client, FastMCP
+from resources.resources import get_task_stats
+from tools.tools import add_tool, complete_task, list_tasks
+
+
+@pytest.fixture
+def mcp_server():
+    mcp = FastMCP("TaskTracker")
+    mcp.tool(name="add_task")(add_tool)
+    mcp.tool()(complete_task)
+    mcp.tool()(list_tasks)
+    mcp.resource("stats://tasks")(get_task_stats)
+    return mcp
+
+
+# ---------------------------------------------------------------------------
+# Workload
+# ---------------------------------------------------------------------------
+
+
+class TestParseMix:
+    def test_le_pesos(self):
+        assert loadgen.parse_mix("add_task=1, stats://tasks=2.5") == {
+            "add_task": 1.0,
+            "stats://tasks": 2.5,
+        }
+
+    @pytest.mark.parametrize(
+        "mix", ["rm_rf=1", "add_task=x", "add_task=-1", "add_task=0", "add_task"]
+    )
+    def test_rejeita_mix_invalido(self, mix):
+        with pytest.raises(ValueError):
+            loadgen.parse_mix(mix)
+
+    def test_mix_padrao_e_valido(self):
+        assert set(loadgen.parse_mix(loadgen.DEFAULT_MIX)) <= set(loadgen.OPERATIONS)
+
+    def test_gera_apenas_operacoes_do_mix(self):
+        calls = itertools.islice(loadgen.generate({"list_tasks": 1}, seed=1), 20)
+        assert {call.name for call in calls} == {"list_tasks"}
+
+
+class TestReplay:
+    def test_ida_e_volta(self, tmp_path):
+        calls = [
+            loadgen.Call("tool", "add_task", {"title": "a"}, 0.5),
+            loadgen.Call("resource", "stats://tasks"),
+        ]
+        path = tmp_path / "traffic.jsonl"
+        path.write_text("".join(json.dumps(c.to_dict()) + "\n" for c in calls))
+
+        assert loadgen.load_replay(path) == calls
+
+    def test_linha_invalida_indica_o_numero(self, tmp_path):
+        path = tmp_path / "traffic.jsonl"
+        path.write_text('{"resource": "stats://tasks"}\n\n{"prompt": "x"}\n')
+
+        with pytest.raises(ValueError, match="traffic.jsonl:3"):
+            loadgen.load_replay(path)
+
+    def test_taxa_sobrepoe_tempos_gravados(self):
+        calls = [loadgen.Call("resource", "stats://tasks", at=9.0)] * 3
+
+        assert [t for _, t in loadgen.schedule(calls, rate=10)] == [0, 0.1, 0.2]
+        assert [t for _, t in loadgen.schedule(calls, rate=0, speed=3)] == [3.0] * 3
+
+
+# ---------------------------------------------------------------------------
+# Runs
+# ---------------------------------------------------------------------------
+
+
+class TestRun:
+    @pytest.mark.anyio
+    async def test_conta_chamadas_e_erros(self, mcp_server):
+        calls = [
+            loadgen.Call("tool", "add_task", {"title": "a"}),
+            loadgen.Call("tool", "complete_task", {"task_id": 999}),
+            loadgen.Call("resource", "stats://tasks"),
+            loadgen.Call("tool", "no_such_tool"),
+        ]
+        async with Client(mcp_server) as a, Client(mcp_server) as b:
+            report = await loadgen.run([a, b], loadgen.schedule(calls, rate=0))
+
+        assert report["calls"] == 4
+        assert report["errors"] == 2
+        assert report["operations"]["stats://tasks"]["errors"] == 0
+        assert report["backlog"] == 0
+
+    @pytest.mark.anyio
+    async def test_prazo_encerra_fluxo_infinito(self, mcp_server):
+        calls = loadgen.generate({"list_tasks": 1}, seed=1)
+        async with Client(mcp_server) as client:
+            report = await loadgen.run(
+                [client], loadgen.schedule(calls, rate=50), duration=0.3
+            )
+
+        assert 5 <= report["calls"] <= 16
+        assert report["p99_ms"] is not None
+
+    @pytest.mark.anyio
+    async def test_grava_o_que_enviou(self, mcp_server):
+        calls = [loadgen.Call("resource", "stats://tasks")] * 3
+        recorded = []
+        async with Client(mcp_server) as client:
+            await loadgen.run(
+                [client], loadgen.schedule(calls, rate=100), None, recorded
+            )
+
+        assert [c.name for c in recorded] == ["stats://tasks"] * 3
+        assert all(c.at is not None for c in recorded)
+
+
+class TestSaturation:
+    def test_primeira_taxa_nao_atendida(self):
+        steps = [
+            {"target_rate": 100, "throughput": 99.0},
+            {"target_rate": 200, "throughput": 197.0},
+            {"target_rate": 400, "throughput": 260.0},
+            {"target_rate": 800, "throughput": 255.0},
+        ]
+
+        assert loadgen.saturation(steps) == {
+            "sustained_rate": 200,
+            "saturated_at": 400,
+            "max_throughput": 260.0,
+        }
+
+    def test_sem_saturacao(self):
+        steps = [{"target_rate": 100, "throughput": 100.0}]
+
+        assert loadgen.saturation(steps)["saturated_at"] is None
+
+
+class TestParseArgs:
+    def test_semeia_so_o_banco_temporario(self):
+        assert loadgen.parse_args([]).seed == 1000
+
+    @pytest.mark.parametrize(
+        "argv",
+        [
+            ["--transport", "http", "--url", "http://127.0.0.1:8000/mcp"],
+            ["--directory", "dados"],
+        ],
+    )
+    def test_servidor_existente_nao_e_semeado(self, argv):
+        assert loadgen.parse_args(argv).seed == 0
+
+    def test_semente_explicita(self):
+        argv = ["--transport", "http", "--url", "http://h/mcp", "--seed", "50"]
+
+        assert loadgen.parse_args(argv).seed == 50
+
+    def test_semente_negativa(self):
+        with pytest.raises(SystemExit):
+            loadgen.parse_args(["--seed", "-1"])
@@ -1,77 +1,1729 @@
+import asyncio
+import json
+import os
+import re
+import sqlite3
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Iterable, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, fields
+from datetime import datetime
+from functools import partial
+
 import aiosqlite
+import metrics
 
 DB_PATH = "tasks.db"
+POOL_SIZE = int(os.environ.get("TASKS_DB_POOL_SIZE", "4"))
+# "group" routes every mutation through a single WAL writer (see GroupCommitWriter)
+WRITE_MODE = os.environ.get("TASKS_DB_WRITE_MODE", "direct")
+WRITE_MAX_BATCH = int(os.environ.get("TASKS_DB_WRITE_MAX_BATCH", "64"))
+WRITE_MAX_WAIT_MS = float(os.environ.get("TASKS_DB_WRITE_MAX_WAIT_MS", "2"))
+# Seconds a connection waits for another process's write lock before giving up
+BUSY_TIMEOUT = float(os.environ.get("TASKS_DB_BUSY_TIMEOUT", "5"))
+# Prepared statements each connection keeps, keyed by SQL text
+STATEMENT_CACHE_SIZE = int(os.environ.get("TASKS_DB_STATEMENT_CACHE_SIZE", "256"))
+# Every project but the default one lives in its own PROJECTS_DIR/<name>.db,
+# and at most MAX_OPEN_PROJECTS of those are kept open at once
+DEFAULT_PROJECT = "default"
+PROJECTS_DIR = os.environ.get("TASKS_PROJECTS_DIR", "projects")
+MAX_OPEN_PROJECTS = int(os.environ.get("TASKS_DB_MAX_OPEN_PROJECTS", "16"))
+# Tasks committed per transaction by import_tasks
+IMPORT_BATCH_SIZE = int(os.environ.get("TASKS_IMPORT_BATCH_SIZE", "5000"))
 
+TASK_SORT_COLUMNS = ("id", "title", "created_at", "completed_at", "priority", "due_at")
+# Task priorities, least urgent first; a task's priority is its index here
+PRIORITIES = ("low", "normal", "high", "urgent")
+DEFAULT_PRIORITY = 1
+# BM25 weight of a title hit relative to a description hit in search_tasks
+SEARCH_TITLE_WEIGHT = 5.0
 
-async def init_db():
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(
+
+def timestamp(moment: datetime | str | None = None) -> str:
+    """
+    Fixed-width ISO-8601 text (naive local time), the form every timestamp is
+    stored in, so text order is time order and the indexes can range-scan it
+    """
+    if moment is None:
+        moment = datetime.now()
+    elif isinstance(moment, str):
+        moment = datetime.fromisoformat(moment)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return moment.isoformat(timespec="microseconds")
+
+
+def _connect(path: str) -> aiosqlite.Connection:
+    return aiosqlite.connect(
+        path, timeout=BUSY_TIMEOUT, cached_statements=STATEMENT_CACHE_SIZE
+    )
+
+
+@dataclass(slots=True)
+class Task:
+    """
+    One row of the tasks table. Turned into a dict only at the MCP boundary.
+    """
+
+    id: int
+    title: str
+    description: str
+    status: str
+    created_at: str
+    completed_at: str | None = None
+    priority: int = DEFAULT_PRIORITY
+    due_at: str | None = None
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "title": self.title,
+            "description": self.description,
+            "status": self.status,
+            "created_at": self.created_at,
+            "completed_at": self.completed_at,
+            "priority": self.priority,
+            "due_at": self.due_at,
+        }
+
+
+@dataclass(slots=True)
+class SearchHit:
+    task: Task
+    snippet: str
+    rank: float
+
+    def to_dict(self) -> dict:
+        return {**self.task.to_dict(), "snippet": self.snippet, "rank": self.rank}
+
+
+# Every task query selects exactly these columns, in Task's field order, so a
+# row maps onto a Task positionally without looking at cursor.description
+TASK_FIELDS = tuple(field.name for field in fields(Task))
+SELECT_TASKS = f"SELECT {', '.join(TASK_FIELDS)} FROM tasks"
+
+# Every mutation is one statement returning the rows it touched, as they are
+# after it. The SQL text never varies (batches pass their ids as one JSON
+# array), so each connection prepares it once and reuses it from its cache.
+_RETURNING = f" RETURNING {', '.join(TASK_FIELDS)}"
+_IDS = "(SELECT value FROM json_each(?))"
+INSERT_TASK = (
+    "INSERT INTO tasks (title, description, created_at, priority, due_at)"
+    " VALUES (?,?,?,?,?)" + _RETURNING
+)
+INSERT_TASKS = (
+    "INSERT INTO tasks (title, description, created_at, priority, due_at)"
+    " SELECT value ->> 0, value ->> 1, ?,"
+    f" coalesce(value ->> 2, {DEFAULT_PRIORITY}), value ->> 3"
+    " FROM json_each(?)" + _RETURNING
+)
+UPDATE_STATUS = (
+    "UPDATE tasks SET status = ?, completed_at = ? WHERE id = ?" + _RETURNING
+)
+UPDATE_STATUSES = (
+    f"UPDATE tasks SET status = ?, completed_at = ? WHERE id IN {_IDS}" + _RETURNING
+)
+DELETE_TASK = "DELETE FROM tasks WHERE id = ?" + _RETURNING
+DELETE_TASKS = f"DELETE FROM tasks WHERE id IN {_IDS}" + _RETURNING
+# Rows given in TASK_FIELDS order (see import_tasks). A single INSERT ... SELECT
+# runs the insert triggers per row far more cheaply than executemany, which
+# sets them up again for every row.
+IMPORT_TASKS = (
+    f"INSERT INTO tasks ({', '.join(TASK_FIELDS)})"
+    f" SELECT {', '.join(f'value ->> {i}' for i in range(len(TASK_FIELDS)))}"
+    " FROM json_each(?)"
+    " WHERE NOT EXISTS (SELECT 1 FROM archived_tasks WHERE id = value ->> 0)"
+    " ON CONFLICT (id) DO NOTHING"
+)
+PROJECT_IS_EMPTY = (
+    "SELECT NOT EXISTS (SELECT 1 FROM tasks)"
+    " AND NOT EXISTS (SELECT 1 FROM archived_tasks)"
+)
+STATS_TABLES = ("task_status_counts", "task_daily_completions", "task_duration_buckets")
+
+
+def _most_urgent(branches: list[tuple[str, str]]) -> str:
+    """
+    Up to :limit pending tasks, highest priority first. Each (condition,
+    order) branch is run once per priority level as an equality lookup on
+    idx_tasks_status_priority_due, so it is a range scan that stops after
+    :limit rows, and the final sort only sees those few rows whatever the
+    size of the table.
+    """
+    scans = " UNION ALL ".join(
+        f"SELECT * FROM ({SELECT_TASKS} WHERE status = 'pending'"
+        f" AND priority = {priority} AND {condition} ORDER BY {order} LIMIT :limit)"
+        for priority in reversed(range(len(PRIORITIES)))
+        for condition, order in branches
+    )
+    return (
+        f"SELECT * FROM ({scans})"
+        " ORDER BY priority DESC, due_at IS NULL, due_at, id LIMIT :limit"
+    )
+
+
+# Soonest due first, then the tasks with no due date, oldest first
+SELECT_NEXT_TASKS = _most_urgent(
+    [("due_at IS NOT NULL", "due_at, id"), ("due_at IS NULL", "id")]
+)
+SELECT_OVERDUE_TASKS = _most_urgent([("due_at < :now", "due_at, id")])
+
+
+def _task_from_row(cursor, row: tuple) -> Task:
+    return Task(*row)
+
+
+def _search_hit_from_row(cursor, row: tuple) -> SearchHit:
+    *task, snippet, rank = row
+    return SearchHit(Task(*task), snippet, rank)
+
+
+async def _select_tasks(db, sql: str, params=()) -> list[Task]:
+    """
+    Runs a query selecting (or a mutation returning) TASK_FIELDS and returns
+    its rows as Tasks
+    """
+    async with db.execute(sql, params) as cur:
+        cur.row_factory = _task_from_row
+        return await cur.fetchall()
+
+
+class ConnectionPool:
+    """
+    Fixed-size pool of long-lived aiosqlite connections
+    """
+
+    def __init__(self, path: str = DB_PATH, size: int = POOL_SIZE):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.path = path
+        self.size = size
+        self._idle: asyncio.Queue[aiosqlite.Connection] | None = None
+        # Never used for queries, so its PRAGMA data_version moves on every
+        # commit made by any other connection, in this process or another one
+        self._watch: aiosqlite.Connection | None = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._idle is not None
+
+    async def open(self) -> None:
+        if self._idle is not None:
+            return
+        idle: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+        try:
+            for _ in range(self.size):
+                idle.put_nowait(await _connect(self.path))
+            self._watch = await _connect(self.path)
+        except BaseException:
+            while not idle.empty():
+                await idle.get_nowait().close()
+            raise
+        self._idle = idle
+
+    async def close(self) -> None:
+        """
+        Waits for every borrowed connection to come back, then closes them all
+        """
+        if self._idle is None:
+            return
+        idle, self._idle = self._idle, None
+        watch, self._watch = self._watch, None
+        try:
+            for _ in range(self.size):
+                conn = await idle.get()
+                try:
+                    await conn.close()
+                except Exception:
+                    pass
+        finally:
+            await watch.close()
+
+    async def data_version(self) -> int:
+        """
+        SQLite's data_version as seen by the watch connection
+        """
+        async with self._watch.execute("PRAGMA data_version") as cur:
+            (version,) = await cur.fetchone()
+            return version
+
+    @staticmethod
+    def _is_alive(conn: aiosqlite.Connection) -> bool:
+        return conn._running and conn._connection is not None
+
+    async def _replace(self, conn: aiosqlite.Connection) -> aiosqlite.Connection:
+        try:
+            await conn.close()
+        except Exception:
+            pass
+        return await _connect(self.path)
+
+    @staticmethod
+    async def _ping(conn: aiosqlite.Connection) -> None:
+        async with conn.execute("SELECT 1") as cur:
+            await cur.fetchone()
+
+    async def _recover(self, conn: aiosqlite.Connection) -> aiosqlite.Connection:
+        """
+        The connection a failed call used, rolled back and checked, or a new
+        one if it no longer works
+        """
+        try:
+            if conn.in_transaction:
+                await conn.rollback()
+            await self._ping(conn)
+        except Exception:
+            return await self._replace(conn)
+        return conn
+
+    @asynccontextmanager
+    async def acquire(self):
+        if self._idle is None:
+            raise RuntimeError("Connection pool is not open")
+        idle = self._idle
+        conn = await idle.get()
+        try:
+            if not self._is_alive(conn):
+                conn = await self._replace(conn)
+            yield conn
+        except BaseException:
+            # Never hand a half-finished transaction, or a connection that
+            # failed on I/O, to the next borrower
+            conn = await self._recover(conn)
+            raise
+        finally:
+            idle.put_nowait(conn)
+
+    async def health_check(self) -> int:
+        """
+        Pings every idle connection and replaces the ones that fail.
+        Returns how many connections were replaced.
+        """
+        if self._idle is None:
+            raise RuntimeError("Connection pool is not open")
+        replaced = 0
+        for _ in range(self._idle.qsize()):
+            conn = self._idle.get_nowait()
+            try:
+                await self._ping(conn)
+            except Exception:
+                conn = await self._replace(conn)
+                replaced += 1
+            finally:
+                self._idle.put_nowait(conn)
+        return replaced
+
+
+_pool: ConnectionPool | None = None
+# Bumped by every write made through this module
+_local_version = 0
+
+
+async def open_pool(size: int = POOL_SIZE) -> ConnectionPool:
+    """
+    Opens the shared connection pool used by every db function
+    """
+    global _pool
+    if _pool is None:
+        pool = ConnectionPool(DB_PATH, size)
+        await pool.open()
+        _pool = pool
+    return _pool
+
+
+async def close_pool() -> None:
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None:
+        await pool.close()
+
+
+_PROJECT_NAME = re.compile(r"[A-Za-z0-9][A-Za-z0-9_-]{0,63}")
+# Project the db functions called in the current task work on
+_project: ContextVar[str] = ContextVar("project", default=DEFAULT_PROJECT)
+
+
+def project_path(name: str) -> str:
+    if not _PROJECT_NAME.fullmatch(name):
+        raise ValueError(
+            f"Invalid project name {name!r}: use up to 64 letters, digits,"
+            " '-' and '_', starting with a letter or digit"
+        )
+    if name == DEFAULT_PROJECT:
+        return DB_PATH
+    return os.path.join(PROJECTS_DIR, f"{name}.db")
+
+
+def current_project() -> str:
+    return _project.get()
+
+
+@contextmanager
+def use_project(name: str | None):
+    """
+    Routes the db calls made inside the block to the database of project
+    ``name`` (None is the default project)
+    """
+    name = DEFAULT_PROJECT if name is None else name
+    project_path(name)
+    token = _project.set(name)
+    try:
+        yield name
+    finally:
+        _project.reset(token)
+
+
+def list_projects() -> list[str]:
+    """
+    The default project followed by every project with a database file
+    """
+    names = []
+    if os.path.isdir(PROJECTS_DIR):
+        for entry in os.listdir(PROJECTS_DIR):
+            name, extension = os.path.splitext(entry)
+            if (
+                extension == ".db"
+                and name != DEFAULT_PROJECT
+                and _PROJECT_NAME.fullmatch(name)
+            ):
+                names.append(name)
+    return [DEFAULT_PROJECT, *sorted(names)]
+
+
+class Shard:
+    """
+    The open database of one project: its own pool, and writer if the default
+    project has one
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.pool = ConnectionPool(path, POOL_SIZE)
+        self.writer: GroupCommitWriter | None = None
+        # Calls currently using the shard; only unused shards are evicted
+        self.users = 0
+        self.local_version = 0
+
+    async def open(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        await self.pool.open()
+        try:
+            async with self.pool.acquire() as db:
+                if self.path not in _migrated:
+                    await migrate(db)
+                    _migrated.add(self.path)
+                # Project files are new, so they start out in WAL
+                async with db.execute("PRAGMA journal_mode=WAL") as cur:
+                    await cur.fetchone()
+            if _writer is not None:
+                writer = GroupCommitWriter(
+                    self.path, _writer.max_batch, _writer.max_wait * 1000
+                )
+                await writer.start()
+                self.writer = writer
+        except BaseException:
+            await self.pool.close()
+            raise
+
+    async def close(self) -> None:
+        writer, self.writer = self.writer, None
+        try:
+            if writer is not None:
+                await writer.stop()
+        finally:
+            await self.pool.close()
+
+
+class ShardCache:
+    """
+    Bounded LRU of open project databases. Opening one past ``capacity``
+    closes the least recently used shards that no call is using.
+    """
+
+    def __init__(self, capacity: int = MAX_OPEN_PROJECTS):
+        if capacity < 1:
+            raise ValueError("Shard cache capacity must be at least 1")
+        self.capacity = capacity
+        self.opened = 0
+        self.evicted = 0
+        self._shards: OrderedDict[str, Shard] = OrderedDict()
+        self._opening = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._shards)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._shards
+
+    @asynccontextmanager
+    async def use(self, name: str):
+        shard = self._shards.get(name)
+        if shard is None:
+            async with self._opening:
+                shard = self._shards.get(name)
+                if shard is None:
+                    shard = Shard(project_path(name))
+                    await shard.open()
+                    self._shards[name] = shard
+                    self.opened += 1
+        self._shards.move_to_end(name)
+        shard.users += 1
+        try:
+            await self._evict()
+            yield shard
+        finally:
+            shard.users -= 1
+
+    async def _evict(self) -> None:
+        while len(self._shards) > self.capacity:
+            name = next(
+                (name for name, shard in self._shards.items() if not shard.users),
+                None,
+            )
+            if name is None:
+                # Every open shard is busy; shrink back on a later call
+                return
+            shard = self._shards.pop(name)
+            self.evicted += 1
+            await shard.close()
+
+    async def close(self) -> None:
+        while self._shards:
+            _, shard = self._shards.popitem(last=False)
+            await shard.close()
+
+
+_shards = ShardCache()
+
+
+async def close_shards() -> None:
+    """
+    Closes every open project database (the default one is the pool's)
+    """
+    await _shards.close()
+
+
+@asynccontextmanager
+async def _connection():
+    """
+    Borrows a pooled connection to the current project's database, or opens
+    a one-off one to the default project's when no pool is open
+    """
+    name = _project.get()
+    if name != DEFAULT_PROJECT:
+        async with _shards.use(name) as shard, shard.pool.acquire() as db:
+            yield db
+    elif _pool is not None:
+        async with _pool.acquire() as db:
+            yield db
+    else:
+        async with _connect(DB_PATH) as db:
+            yield db
+
+
+# Seconds (rounded) from creation to completion of a task row (OLD or NEW), and
+# its histogram bucket: digit count * 10 + leading digit, so 37s and 38s share
+# bucket 23 ([30s, 40s)) and bucket order is duration order
+_TASK_SECONDS = (
+    "CAST(round((julianday({row}.completed_at) - julianday({row}.created_at))"
+    " * 86400) AS INTEGER)"
+)
+_DURATION_BUCKET = (
+    "length(CAST({seconds} AS TEXT)) * 10"
+    " + CAST(substr(CAST({seconds} AS TEXT), 1, 1) AS INTEGER)"
+)
+
+
+def _duration(row: str) -> tuple[str, str]:
+    """
+    SQL for the (seconds, bucket) of ``row``, a tasks row or table name
+    """
+    seconds = _TASK_SECONDS.format(row=row)
+    return seconds, _DURATION_BUCKET.format(seconds=seconds)
+
+
+def _stats_add(row: str) -> str:
+    """
+    Trigger statements counting ``row`` into the task_* statistics tables
+    """
+    seconds, bucket = _duration(row)
+    return f"""
+        INSERT INTO task_status_counts (status, count) VALUES ({row}.status, 1)
+            ON CONFLICT (status) DO UPDATE SET count = count + 1;
+        INSERT INTO task_daily_completions (day, count)
+            SELECT date({row}.completed_at), 1
+            WHERE {row}.status = 'completed' AND {row}.completed_at IS NOT NULL
+            ON CONFLICT (day) DO UPDATE SET count = count + 1;
+        INSERT INTO task_duration_buckets (bucket, count)
+            SELECT {bucket}, 1
+            WHERE {row}.status = 'completed' AND {seconds} >= 0
+            ON CONFLICT (bucket) DO UPDATE SET count = count + 1;
+    """
+
+
+def _status_remove(status: str) -> str:
+    return f"UPDATE task_status_counts SET count = count - 1 WHERE status = {status};"
+
+
+def _history_remove(row: str, condition: str = "1") -> str:
+    """
+    Trigger statements taking the completion of ``row`` out of the per-day and
+    duration counters, when ``condition`` holds
+    """
+    seconds, bucket = _duration(row)
+    return f"""
+        UPDATE task_daily_completions SET count = count - 1
+            WHERE {row}.status = 'completed' AND day = date({row}.completed_at)
+            AND {condition};
+        UPDATE task_duration_buckets SET count = count - 1
+            WHERE {row}.status = 'completed' AND {seconds} >= 0
+            AND bucket = {bucket} AND {condition};
+    """
+
+
+def _stats_remove(row: str) -> str:
+    """
+    Trigger statements taking ``row`` back out of the statistics tables
+    """
+    return _status_remove(f"{row}.status") + _history_remove(row)
+
+
+# Fills the empty statistics tables from the tasks stored (migration 3, and
+# import_tasks after a bulk import)
+STATS_BACKFILL = (
+    "INSERT INTO task_status_counts (status, count)"
+    " SELECT status, COUNT(*) FROM tasks GROUP BY status",
+    "INSERT INTO task_daily_completions (day, count)"
+    " SELECT date(completed_at), COUNT(*) FROM tasks"
+    " WHERE status = 'completed' AND completed_at IS NOT NULL"
+    " GROUP BY 1",
+    "INSERT INTO task_duration_buckets (bucket, count)"
+    f" SELECT {_duration('tasks')[1]}, COUNT(*) FROM tasks"
+    f" WHERE status = 'completed' AND {_duration('tasks')[0]} >= 0"
+    " GROUP BY 1",
+)
+
+# A deleted tasks row that was moved to the archive rather than dropped
+_ARCHIVED_OLD = "NOT EXISTS (SELECT 1 FROM archived_tasks WHERE id = OLD.id)"
+
+
+# Ordered schema migrations: (version, statements). Append new ones at the end
+# and never edit one that has shipped.
+MIGRATIONS: list[tuple[int, tuple[str, ...]]] = [
+    (
+        1,
+        (
             """
                 CREATE TABLE IF NOT EXISTS tasks(
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    title TEXT NOT NULL, 
+                    title TEXT NOT NULL,
                     description TEXT DEFAULT '',
                     status TEXT DEFAULT 'pending',
                     created_at TEXT NOT NULL,
                     completed_at TEXT
                 )
+            """,
+        ),
+    ),
+    (
+        2,
+        (
+            "CREATE INDEX IF NOT EXISTS idx_tasks_status_created"
+            " ON tasks(status, created_at)",
+            "CREATE INDEX IF NOT EXISTS idx_tasks_created ON tasks(created_at)",
+            "CREATE INDEX IF NOT EXISTS idx_tasks_completed ON tasks(completed_at)",
+        ),
+    ),
+    (
+        # Statistics kept current by triggers, so reading them never scans tasks
+        3,
+        (
+            "CREATE TABLE task_status_counts"
+            "(status TEXT PRIMARY KEY, count INTEGER NOT NULL)",
+            "CREATE TABLE task_daily_completions"
+            "(day TEXT PRIMARY KEY, count INTEGER NOT NULL)",
+            "CREATE TABLE task_duration_buckets"
+            "(bucket INTEGER PRIMARY KEY, count INTEGER NOT NULL)",
+            f"CREATE TRIGGER tasks_stats_insert AFTER INSERT ON tasks BEGIN"
+            f" {_stats_add('NEW')} END",
+            f"CREATE TRIGGER tasks_stats_update"
+            f" AFTER UPDATE OF status, created_at, completed_at ON tasks BEGIN"
+            f" {_stats_remove('OLD')} {_stats_add('NEW')} END",
+            f"CREATE TRIGGER tasks_stats_delete AFTER DELETE ON tasks BEGIN"
+            f" {_stats_remove('OLD')} END",
+            # Backfill from the tasks already stored
+            *STATS_BACKFILL,
+        ),
+    ),
+    (
+        # Full-text index over title and description, stored in tasks itself
+        # (external content) and kept in sync by triggers
+        4,
+        (
+            "CREATE VIRTUAL TABLE tasks_fts USING fts5("
+            "title, description, content='tasks', content_rowid='id',"
+            " tokenize='unicode61 remove_diacritics 2')",
+            "CREATE TRIGGER tasks_fts_insert AFTER INSERT ON tasks BEGIN"
+            " INSERT INTO tasks_fts (rowid, title, description)"
+            " VALUES (NEW.id, NEW.title, NEW.description); END",
+            "CREATE TRIGGER tasks_fts_delete AFTER DELETE ON tasks BEGIN"
+            " INSERT INTO tasks_fts (tasks_fts, rowid, title, description)"
+            " VALUES ('delete', OLD.id, OLD.title, OLD.description); END",
+            "CREATE TRIGGER tasks_fts_update"
+            " AFTER UPDATE OF title, description ON tasks BEGIN"
+            " INSERT INTO tasks_fts (tasks_fts, rowid, title, description)"
+            " VALUES ('delete', OLD.id, OLD.title, OLD.description);"
+            " INSERT INTO tasks_fts (rowid, title, description)"
+            " VALUES (NEW.id, NEW.title, NEW.description); END",
+            "INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')",
+        ),
+    ),
+    (
+        # Completed tasks past the retention age move here (see archive_tasks).
+        # Archived tasks count as "archived" in the stats and keep their
+        # completion history; deleting them from the archive drops it.
+        5,
+        (
             """
-        )
-        await db.commit()
+                CREATE TABLE archived_tasks(
+                    id INTEGER PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    description TEXT DEFAULT '',
+                    status TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    completed_at TEXT,
+                    archived_at TEXT NOT NULL
+                )
+            """,
+            "CREATE INDEX idx_archived_completed ON archived_tasks(completed_at)",
+            "CREATE TRIGGER archived_stats_insert AFTER INSERT ON archived_tasks"
+            " BEGIN INSERT INTO task_status_counts (status, count)"
+            " VALUES ('archived', 1)"
+            " ON CONFLICT (status) DO UPDATE SET count = count + 1; END",
+            "CREATE TRIGGER archived_stats_delete AFTER DELETE ON archived_tasks BEGIN "
+            + _status_remove("'archived'")
+            + _history_remove("OLD")
+            + " END",
+            "DROP TRIGGER tasks_stats_delete",
+            "CREATE TRIGGER tasks_stats_delete AFTER DELETE ON tasks BEGIN"
+            f" {_status_remove('OLD.status')}"
+            f" {_history_remove('OLD', _ARCHIVED_OLD)} END",
+        ),
+    ),
+    (
+        # One row counting the writes that changed anything (see _write); its
+        # value is the version token of every task resource
+        6,
+        (
+            "CREATE TABLE change_counter"
+            "(id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)",
+            "INSERT INTO change_counter (id, version) VALUES (1, 0)",
+        ),
+    ),
+    (
+        # Priority (an index into PRIORITIES) and due date, indexed for the
+        # most urgent pending tasks (see _most_urgent)
+        7,
+        (
+            "ALTER TABLE tasks ADD COLUMN priority INTEGER NOT NULL"
+            f" DEFAULT {DEFAULT_PRIORITY}",
+            "ALTER TABLE tasks ADD COLUMN due_at TEXT",
+            "ALTER TABLE archived_tasks ADD COLUMN priority INTEGER NOT NULL"
+            f" DEFAULT {DEFAULT_PRIORITY}",
+            "ALTER TABLE archived_tasks ADD COLUMN due_at TEXT",
+            "CREATE INDEX idx_tasks_status_priority_due"
+            " ON tasks(status, priority, due_at)",
+        ),
+    ),
+]
+
+# Database files already migrated by this process
+_migrated: set[str] = set()
+
+
+async def schema_version(db) -> int:
+    async with db.execute("SELECT version FROM schema_version") as cur:
+        row = await cur.fetchone()
+        return row[0] if row else 0
+
+
+async def migrate(db) -> int:
+    """
+    Applies every pending migration, each in its own transaction.
+    Returns the resulting schema version.
+    """
+    # Only takes effect on a new, empty file, which then hands pages back with
+    # incremental_vacuum and never needs a full VACUUM (see vacuum)
+    await db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    await db.execute("CREATE TABLE IF NOT EXISTS schema_version(version INTEGER)")
+    await db.commit()
+    version = 0
+    for target, statements in MIGRATIONS:
+        # IMMEDIATE takes the write lock first, so concurrent processes
+        # apply each migration exactly once
+        await db.execute("BEGIN IMMEDIATE")
+        try:
+            version = await schema_version(db)
+            if version < target:
+                for statement in statements:
+                    await db.execute(statement)
+                await db.execute("DELETE FROM schema_version")
+                await db.execute(
+                    "INSERT INTO schema_version (version) VALUES (?)", (target,)
+                )
+                version = target
+            await db.commit()
+        except BaseException:
+            await db.rollback()
+            raise
+    return version
+
+
+async def init_db() -> None:
+    """
+    Brings the schema up to date, once per process and database file
+    """
+    if _project.get() != DEFAULT_PROJECT:
+        # Project databases are migrated when their shard opens
+        async with _connection():
+            return
+    if DB_PATH in _migrated:
+        return
+    async with _connection() as db:
+        await migrate(db)
+    _migrated.add(DB_PATH)
+
+
+async def enable_wal() -> None:
+    """
+    Switches the database file to WAL journaling, so readers in any process
+    keep going while one of them writes. The mode sticks to the file.
+    """
+    async with _connect(DB_PATH) as db:
+        async with db.execute("PRAGMA journal_mode=WAL") as cur:
+            await cur.fetchone()
+
+
+async def wal_enabled() -> bool:
+    """
+    Whether the current project's database journals in WAL mode, where a long
+    read such as export_tasks never blocks writers
+    """
+    async with _connection() as db:
+        async with db.execute("PRAGMA journal_mode") as cur:
+            ((mode,),) = await cur.fetchall()
+    return mode == "wal"
+
+
+class GroupCommitWriter:
+    """
+    Single writer coroutine that commits queued mutations in groups.
+
+    Each mutation is an ``async def op(db)`` run inside its own savepoint, so a
+    failing op only rolls back itself; the whole group shares one transaction
+    and one fsync. Callers get their op's result once the group is committed.
+    """
+
+    def __init__(
+        self,
+        path: str = DB_PATH,
+        max_batch: int = WRITE_MAX_BATCH,
+        max_wait_ms: float = WRITE_MAX_WAIT_MS,
+    ):
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self.path = path
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.commits = 0
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._conn: aiosqlite.Connection | None = None
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        self._conn = await _connect(self.path)
+        async with self._conn.execute("PRAGMA journal_mode=WAL") as cur:
+            await cur.fetchone()
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Commits everything already queued, then closes the writer connection
+        """
+        if self._task is None:
+            return
+        self._queue.put_nowait(None)
+        await self._task
+        await self._conn.close()
+        self._task = self._queue = self._conn = None
+
+    async def submit(self, op):
+        if self._queue is None:
+            raise RuntimeError("Writer is not running")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((op, future))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except TimeoutError:
+                        break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._commit(batch)
+
+    async def _commit(self, batch: list) -> None:
+        done = []
+        try:
+            await self._conn.execute("BEGIN IMMEDIATE")
+            for op, future in batch:
+                await self._conn.execute("SAVEPOINT op")
+                try:
+                    result = await op(self._conn)
+                except Exception as exc:
+                    await self._conn.execute("ROLLBACK TO op")
+                    await self._conn.execute("RELEASE op")
+                    if not future.done():
+                        future.set_exception(exc)
+                else:
+                    await self._conn.execute("RELEASE op")
+                    done.append((future, result))
+            await self._conn.commit()
+            self.commits += 1
+        except Exception as exc:
+            if self._conn.in_transaction:
+                await self._conn.rollback()
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for future, result in done:
+            if not future.done():
+                future.set_result(result)
+
+
+_writer: GroupCommitWriter | None = None
+
 
+async def start_writer(
+    max_batch: int = WRITE_MAX_BATCH, max_wait_ms: float = WRITE_MAX_WAIT_MS
+) -> GroupCommitWriter:
+    """
+    Switches the database to WAL and routes every mutation through one writer
+    """
+    global _writer
+    if _writer is None:
+        writer = GroupCommitWriter(DB_PATH, max_batch, max_wait_ms)
+        await writer.start()
+        _writer = writer
+    return _writer
 
-async def insert_task(title: str, description: str, created_at: str) -> dict:
-    async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute(
-            "INSERT INTO tasks (title, description, created_at) VALUES (?,?,?)",
-            (title, description, created_at),
+
+async def stop_writer() -> None:
+    global _writer
+    writer, _writer = _writer, None
+    if writer is not None:
+        await writer.stop()
+
+
+async def startup() -> None:
+    """
+    Opens the pool, brings the schema up to date and, in group write mode,
+    starts the writer
+    """
+    await open_pool()
+    await init_db()
+    if WRITE_MODE == "group":
+        await start_writer()
+
+
+async def shutdown() -> None:
+    """
+    Closes the project databases, the writer and the pool
+    """
+    try:
+        await close_shards()
+        await stop_writer()
+    finally:
+        await close_pool()
+
+
+# Called with no arguments after every committed write to the default project
+# that changed rows
+_write_listeners: list = []
+
+
+def on_write(listener) -> None:
+    """
+    Registers ``listener()`` to run after each committed write to the default
+    project that changed at least one row (writes from other processes are
+    not seen)
+    """
+    _write_listeners.append(listener)
+
+
+def notify_write() -> None:
+    """
+    Runs the on_write listeners; every storage backend calls it after a write
+    to the default project that changed rows
+    """
+    for listener in _write_listeners:
+        listener()
+
+
+async def _write(op):
+    """
+    Runs a mutation ``op(db)`` on the current project's database and commits
+    it, through that database's group writer if active
+    """
+    global _local_version
+
+    async def tracked(db):
+        before = db.total_changes
+        result = await op(db)
+        changed = db.total_changes != before
+        if changed:
+            # Same transaction, so the count moves exactly when the rows do
+            await db.execute("UPDATE change_counter SET version = version + 1")
+        return result, changed
+
+    async def commit(writer, connection):
+        if writer is not None:
+            return await writer.submit(tracked)
+        async with connection() as db:
+            outcome = await tracked(db)
+            await db.commit()
+            return outcome
+
+    name = _project.get()
+    if name != DEFAULT_PROJECT:
+        async with _shards.use(name) as shard:
+            try:
+                result, _ = await commit(shard.writer, shard.pool.acquire)
+            finally:
+                shard.local_version += 1
+        return result
+
+    try:
+        result, changed = await commit(_writer, _connection)
+    finally:
+        _local_version += 1
+    if changed:
+        notify_write()
+    return result
+
+
+async def change_version() -> int:
+    """
+    How many writes have changed the current project's tasks: one row read,
+    persisted with the data, so it only grows and every process sees it
+    """
+    async with _connection() as db:
+        async with db.execute("SELECT version FROM change_counter") as cur:
+            (version,) = await cur.fetchone()
+            return version
+
+
+async def data_version() -> tuple[int, int] | None:
+    """
+    Token that changes whenever the current project's tasks may have changed,
+    whether the write came from this process or another one using the same
+    file. None when no pool is open, as there is nothing to track changes with.
+    """
+    name = _project.get()
+    if name != DEFAULT_PROJECT:
+        async with _shards.use(name) as shard:
+            local = shard.local_version
+            return local, await shard.pool.data_version()
+    if _pool is None:
+        return None
+    local = _local_version
+    return local, await _pool.data_version()
+
+
+@metrics.query
+async def insert_task(
+    title: str,
+    description: str,
+    created_at: str,
+    priority: int = DEFAULT_PRIORITY,
+    due_at: str | None = None,
+) -> Task:
+    async def op(db):
+        (task,) = await _select_tasks(
+            db, INSERT_TASK, (title, description, created_at, priority, due_at)
         )
-        await db.commit()
-        return {
-            "id": cursor.lastrowid,
-            "title": title,
-            "description": description,
-            "status": "pending",
-            "created_at": created_at,
-        }
+        return task
 
+    return await _write(op)
 
+
+@metrics.query
 async def update_task_status(
     task_id: int, status: str, completed_at: str | None = None
-) -> dict | None:
-    async with aiosqlite.connect(DB_PATH) as db:
+) -> Task | None:
+    async def op(db):
+        tasks = await _select_tasks(db, UPDATE_STATUS, (status, completed_at, task_id))
+        return tasks[0] if tasks else None
+
+    return await _write(op)
+
+
+@metrics.query
+async def remove_task(task_id: int) -> Task | None:
+    async def op(db):
+        tasks = await _select_tasks(db, DELETE_TASK, (task_id,))
+        return tasks[0] if tasks else None
+
+    return await _write(op)
+
+
+@metrics.query
+async def insert_tasks(items: list[tuple], created_at: str) -> list[Task]:
+    """
+    Inserts every (title, description) or (title, description, priority,
+    due_at) item in one transaction
+    """
+
+    async def op(db):
+        # RETURNING order is unspecified; rows are inserted in item order
+        tasks = await _select_tasks(db, INSERT_TASKS, (created_at, json.dumps(items)))
+        return sorted(tasks, key=lambda task: task.id)
+
+    if not items:
+        return []
+    return await _write(op)
+
+
+async def _write_by_ids(db, sql: str, params: tuple, task_ids) -> dict[int, Task]:
+    tasks = await _select_tasks(db, sql, (*params, json.dumps(task_ids)))
+    return {task.id: task for task in tasks}
+
+
+@metrics.query
+async def update_tasks_status(
+    task_ids: list[int], status: str, completed_at: str | None = None
+) -> list[Task | None]:
+    """
+    Updates several tasks in one transaction; None marks ids that do not exist
+    """
+
+    async def op(db):
+        found = await _write_by_ids(
+            db, UPDATE_STATUSES, (status, completed_at), task_ids
+        )
+        return [found.get(task_id) for task_id in task_ids]
+
+    if not task_ids:
+        return []
+    return await _write(op)
+
+
+@metrics.query
+async def remove_tasks(task_ids: list[int]) -> list[Task | None]:
+    """
+    Deletes several tasks in one transaction; None marks ids that do not exist
+    """
+
+    async def op(db):
+        found = await _write_by_ids(db, DELETE_TASKS, (), task_ids)
+        # A repeated id is only deleted once
+        return [found.pop(task_id, None) for task_id in task_ids]
+
+    if not task_ids:
+        return []
+    return await _write(op)
+
+
+@metrics.query
+async def fetch_all_tasks() -> list[Task]:
+    async with _connection() as db:
+        return await _select_tasks(db, SELECT_TASKS)
+
+
+@metrics.query
+async def fetch_tasks_page(after_id: int = 0, limit: int = 100) -> list[Task]:
+    """
+    Keyset page: up to ``limit`` tasks with id greater than ``after_id``
+    """
+    async with _connection() as db:
+        return await _select_tasks(
+            db, f"{SELECT_TASKS} WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit)
+        )
+
+
+@metrics.query
+async def fetch_next_tasks(limit: int = 10) -> list[Task]:
+    """
+    The ``limit`` pending tasks to work on next: highest priority first, then
+    soonest due, with tasks that have no due date last
+    """
+    async with _connection() as db:
+        return await _select_tasks(db, SELECT_NEXT_TASKS, {"limit": limit})
+
+
+@metrics.query
+async def fetch_overdue_tasks(now: str, limit: int = 100) -> list[Task]:
+    """
+    Up to ``limit`` pending tasks due before ``now``, highest priority first,
+    then the longest overdue
+    """
+    async with _connection() as db:
+        return await _select_tasks(
+            db, SELECT_OVERDUE_TASKS, {"now": now, "limit": limit}
+        )
+
+
+def _build_task_query(
+    status: str | None = None,
+    created_range: tuple[str | None, str | None] = (None, None),
+    completed_range: tuple[str | None, str | None] = (None, None),
+    title_prefix: str | None = None,
+    order_by: str = "id",
+    descending: bool = False,
+    limit: int | None = None,
+    table: str = "tasks",
+) -> tuple[str, list]:
+    if order_by not in TASK_SORT_COLUMNS:
+        raise ValueError(f"Cannot order by {order_by!r}")
+    where, params = [], []
+    if status is not None:
+        where.append("status = ?")
+        params.append(status)
+    for column, (start, end) in (
+        ("created_at", created_range),
+        ("completed_at", completed_range),
+    ):
+        if start is not None:
+            where.append(f"{column} >= ?")
+            params.append(timestamp(start))
+        if end is not None:
+            where.append(f"{column} < ?")
+            params.append(timestamp(end))
+    if title_prefix:
+        escaped = (
+            title_prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        )
+        where.append("title LIKE ? ESCAPE '\\'")
+        params.append(escaped + "%")
+
+    sql = f"SELECT {', '.join(TASK_FIELDS)} FROM {table}"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {order_by} {'DESC' if descending else 'ASC'}"
+    if order_by != "id":
+        sql += ", id"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(limit)
+    return sql, params
+
+
+@metrics.query
+async def query_tasks(**filters) -> list[Task]:
+    """
+    Filtered, sorted task listing; every filter is pushed into SQL
+    (see ``_build_task_query`` for the accepted filters)
+    """
+    sql, params = _build_task_query(**filters)
+    async with _connection() as db:
+        return await _select_tasks(db, sql, params)
+
+
+async def query_projects(
+    projects: list[str] | None = None, **filters
+) -> list[tuple[str, Task]]:
+    """
+    ``query_tasks`` run on several projects' databases in parallel (every
+    project by default), merged into one listing of (project, task) pairs
+    sorted and limited like a single project's
+    """
+    names = list_projects() if projects is None else list(dict.fromkeys(projects))
+
+    async def query(name: str) -> list[Task]:
+        with use_project(name):
+            return await query_tasks(**filters)
+
+    results = await asyncio.gather(*map(query, names))
+    return merge_projects(dict(zip(names, results)), **filters)
+
+
+def sort_value(value) -> tuple:
+    """
+    Sort key putting None first, as SQLite sorts NULL before any value
+    """
+    return value is not None, value
+
+
+def merge_projects(
+    results: dict[str, list[Task]],
+    order_by: str = "id",
+    descending: bool = False,
+    limit: int | None = None,
+    **filters,
+) -> list[tuple[str, Task]]:
+    """
+    Merges the query_tasks results of several projects into one listing of
+    (project, task) pairs, ordered by ``order_by`` then id
+    """
+    rows = [(name, task) for name, tasks in results.items() for task in tasks]
+    rows.sort(key=lambda row: (row[1].id, row[0]))
+    rows.sort(key=lambda row: sort_value(getattr(row[1], order_by)), reverse=descending)
+    return rows if limit is None else rows[:limit]
+
+
+def check_priority(priority: int) -> None:
+    if type(priority) is not int or not 0 <= priority < len(PRIORITIES):
+        levels = ", ".join(f"{i} ({name})" for i, name in enumerate(PRIORITIES))
+        raise ValueError(f"Priority must be one of {levels}")
+
+
+def check_task_fields(fields: tuple[str, ...]) -> None:
+    if not fields:
+        raise ValueError("Select at least one field")
+    unknown = [name for name in fields if name not in TASK_FIELDS]
+    if unknown:
+        raise ValueError(
+            f"Unknown task fields {unknown}; choose from {', '.join(TASK_FIELDS)}"
+        )
+
+
+@metrics.query
+async def fetch_tasks_json(
+    fields: tuple[str, ...] = TASK_FIELDS, status: str | None = None
+) -> str:
+    """
+    Tasks ordered by id as compact JSON, ``{"fields": [...], "tasks": [[...]]}``
+    with one array of ``fields`` values per task. SQLite writes the JSON
+    straight from the rows, so no Python object is built per task.
+    """
+    check_task_fields(fields)
+    columns = ", ".join(fields)
+    sql = f"SELECT {columns} FROM tasks"
+    params: list = []
+    if status is not None:
+        sql += " WHERE status = ?"
+        params.append(status)
+    sql += " ORDER BY id"
+    names = ", ".join(f"'{name}'" for name in fields)
+    async with _connection() as db:
+        async with db.execute(
+            f"SELECT json_object('fields', json_array({names}),"
+            f" 'tasks', json_group_array(json_array({columns}))) FROM ({sql})",
+            params,
+        ) as cur:
+            (document,) = await cur.fetchone()
+            return document
+
+
+def duration_bucket(seconds: int) -> int:
+    """
+    The task_duration_buckets key of ``seconds`` (>= 0), as _DURATION_BUCKET
+    computes it: ten times its number of digits plus its leading digit
+    """
+    text = str(seconds)
+    return len(text) * 10 + int(text[0])
+
+
+def _bucket_bounds(bucket: int) -> tuple[int, int]:
+    digits, leading = divmod(bucket, 10)
+    scale = 10 ** (digits - 1)
+    return leading * scale, (leading + 1) * scale
+
+
+def median_seconds(buckets: list[tuple[int, int]]) -> float | None:
+    """
+    Median of a duration histogram, as sorted (bucket, count) pairs,
+    interpolated inside its bucket. Both backends estimate it this way, so
+    the same tasks give the same stats whichever stores them.
+    """
+    total = sum(count for _, count in buckets)
+    if not total:
+        return None
+    middle = total / 2
+    seen = 0
+    for bucket, count in buckets:
+        if seen + count >= middle:
+            low, high = _bucket_bounds(bucket)
+            return low + (high - low) * (middle - seen) / count
+        seen += count
+    return None
+
+
+@metrics.query
+async def fetch_task_stats(days: int = 30) -> dict:
+    """
+    Task counts by status, completions for the ``days`` most recent days with
+    any, and the approximate median seconds from creation to completion.
+    Reads only the trigger-maintained statistics tables.
+    """
+    async with _connection() as db:
+        async with db.execute(
+            "SELECT status, count FROM task_status_counts"
+            " WHERE count > 0 ORDER BY status"
+        ) as cur:
+            by_status = dict(await cur.fetchall())
+        async with db.execute(
+            "SELECT day, count FROM task_daily_completions"
+            " WHERE count > 0 ORDER BY day DESC LIMIT ?",
+            (days,),
+        ) as cur:
+            per_day = dict(reversed(await cur.fetchall()))
+        async with db.execute(
+            "SELECT bucket, count FROM task_duration_buckets"
+            " WHERE count > 0 ORDER BY bucket"
+        ) as cur:
+            buckets = await cur.fetchall()
+    return {
+        "total": sum(by_status.values()),
+        "by_status": by_status,
+        "completions_per_day": per_day,
+        "median_seconds_to_complete": median_seconds(buckets),
+    }
+
+
+def _match_expression(text: str) -> str:
+    """
+    Turns free text into an FTS5 query matching every word, so quotes and
+    operators in it are searched for rather than parsed. A trailing ``*``
+    keeps a word a prefix match.
+    """
+    terms = []
+    for word in text.split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*").replace('"', '""')
+        if word:
+            terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+@metrics.query
+async def search_tasks(
+    text: str,
+    limit: int = 20,
+    status: str | None = None,
+    highlight: tuple[str, str] = ("**", "**"),
+) -> list[SearchHit]:
+    """
+    Tasks matching every word of ``text`` in their title or description, best
+    match first (BM25, title weighted over description), each with a
+    ``snippet`` of its best matching column with the hits wrapped in
+    ``highlight`` and its ``rank`` (lower is better).
+    """
+    query = _match_expression(text)
+    if not query:
+        return []
+    columns = ", ".join(f"t.{name}" for name in TASK_FIELDS)
+    sql = (
+        f"SELECT {columns}, snippet(tasks_fts, -1, ?, ?, '…', 12),"
+        f" bm25(tasks_fts, {SEARCH_TITLE_WEIGHT}, 1.0) AS rank"
+        " FROM tasks_fts JOIN tasks t ON t.id = tasks_fts.rowid"
+        " WHERE tasks_fts MATCH ?"
+    )
+    params: list = [*highlight, query]
+    if status is not None:
+        sql += " AND t.status = ?"
+        params.append(status)
+    sql += " ORDER BY rank LIMIT ?"
+    params.append(limit)
+    async with _connection() as db:
+        async with db.execute(sql, params) as cur:
+            cur.row_factory = _search_hit_from_row
+            return await cur.fetchall()
+
+
+@metrics.query
+async def archive_tasks(completed_before: str, batch_size: int = 500) -> int:
+    """
+    Moves completed tasks finished before ``completed_before`` to
+    archived_tasks, ``batch_size`` rows per transaction so other writes
+    interleave. Returns how many tasks were archived.
+    """
+    cutoff = timestamp(completed_before)
+
+    async def op(db):
+        async with db.execute(
+            "SELECT id FROM tasks WHERE status = 'completed' AND completed_at < ?"
+            " ORDER BY completed_at LIMIT ?",
+            (cutoff, batch_size),
+        ) as cur:
+            ids = [row[0] for row in await cur.fetchall()]
+        if not ids:
+            return 0
+        # Insert first: the delete trigger keeps the history of archived rows
         await db.execute(
-            "UPDATE tasks SET status = ?, completed_at = ? WHERE id = ?",
-            (status, completed_at, task_id),
+            f"INSERT INTO archived_tasks ({', '.join(TASK_FIELDS)}, archived_at)"
+            f" SELECT {', '.join(TASK_FIELDS)}, ? FROM tasks WHERE id IN {_IDS}",
+            (timestamp(), json.dumps(ids)),
         )
-        await db.commit()
-        async with db.execute("SELECT * FROM tasks WHERE id = ?", (task_id,)) as cur:
-            row = await cur.fetchone()
-            return dict(zip([c[0] for c in cur.description], row)) if row else None
-
-
-async def remove_task(task_id: int) -> dict | None:
-    async with aiosqlite.connect(DB_PATH) as db:
-        async with db.execute("SELECT * FROM tasks WHERE id = ?", (task_id,)) as cur:
-            row = await cur.fetchone()
-            if not row:
-                return None
-            task = dict(zip([c[0] for c in cur.description], row))
-        await db.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
-        await db.commit()
-        return task
+        await db.execute(f"DELETE FROM tasks WHERE id IN {_IDS}", (json.dumps(ids),))
+        return len(ids)
+
+    archived = 0
+    while True:
+        moved = await _write(op)
+        archived += moved
+        if moved < batch_size:
+            return archived
+
+
+@metrics.query
+async def query_archived_tasks(**filters) -> list[Task]:
+    """
+    Filtered, sorted listing of archived tasks (same filters as query_tasks)
+    """
+    sql, params = _build_task_query(table="archived_tasks", **filters)
+    async with _connection() as db:
+        return await _select_tasks(db, sql, params)
+
+
+# One NDJSON line per task, written by SQLite
+_EXPORT_LINE = (
+    "json_object(" + ", ".join(f"'{name}', {name}" for name in TASK_FIELDS) + ")"
+)
+
+
+async def export_tasks(batch_size: int = 1000) -> AsyncIterator[str]:
+    """
+    Every task ordered by id as NDJSON, one JSON object per line, yielded
+    ``batch_size`` lines at a time. The lines come straight from one cursor,
+    so the table is never held in memory, and being one statement the export
+    reads a single snapshot.
+    """
+    async with _connection() as db:
+        async with db.execute(f"SELECT {_EXPORT_LINE} FROM tasks ORDER BY id") as cur:
+            while rows := await cur.fetchmany(batch_size):
+                yield "".join(f"{line}\n" for (line,) in rows)
+
+
+# The text timestamp() writes, which is what export_tasks produces
+_STORED_TIMESTAMP = re.compile(r"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\.\d{6}", re.ASCII)
+
+
+def _import_time(task: dict, name: str, required: bool = False) -> str | None:
+    value = task.get(name)
+    if value is None and not required:
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"{name} must be a string" + ("" if required else " or null"))
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO date or timestamp") from None
+    # Already in stored form: parsing checked the date, and skipping the
+    # reformat takes about a third off import_row
+    if _STORED_TIMESTAMP.fullmatch(value):
+        return value
+    return timestamp(moment)
+
+
+def import_row(line: str) -> tuple:
+    """
+    The tasks row, in TASK_FIELDS order, of one line written by export_tasks.
+    Only id, title and created_at are required. Timestamps are stored in the
+    fixed-width form of timestamp(), like every other write.
+    """
+    try:
+        task = json.loads(line)
+    except json.JSONDecodeError as exc:
+        raise ValueError(f"Invalid JSON: {exc}") from None
+    if not isinstance(task, dict):
+        raise ValueError("Expected a JSON object")
+    task_id = task.get("id")
+    if type(task_id) is not int or not 0 < task_id < 2**63:
+        raise ValueError("id must be a positive integer")
+    title = task.get("title")
+    description = task.get("description", "")
+    status = task.get("status", "pending")
+    for name, value in (("title", title), ("description", description)):
+        if not isinstance(value, str):
+            raise ValueError(f"{name} must be a string")
+    if status not in ("pending", "completed"):
+        raise ValueError("status must be 'pending' or 'completed'")
+    created_at = _import_time(task, "created_at", required=True)
+    completed_at = _import_time(task, "completed_at")
+    if (status == "completed") != (completed_at is not None):
+        raise ValueError("completed_at must be set exactly when status is completed")
+    priority = task.get("priority", DEFAULT_PRIORITY)
+    check_priority(priority)
+    due_at = _import_time(task, "due_at")
+    return (
+        task_id,
+        title,
+        description,
+        status,
+        created_at,
+        completed_at,
+        priority,
+        due_at,
+    )
+
 
+def import_batches(lines: Iterable[str], batch_size: int) -> Iterator[list[tuple]]:
+    """
+    Rows of the non-blank NDJSON ``lines``, ``batch_size`` at a time. A bad
+    line raises ValueError naming its line number.
+    """
+    if batch_size < 1:
+        raise ValueError("Batch size must be at least 1")
+    batch = []
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            batch.append(import_row(line))
+        except ValueError as exc:
+            raise ValueError(f"Line {number}: {exc}") from None
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
 
-async def fetch_all_tasks() -> list[dict]:
-    async with aiosqlite.connect(DB_PATH) as db:
-        async with db.execute("SELECT * FROM tasks") as cur:
-            rows = await cur.fetchall()
-            cols = [c[0] for c in cur.description]
-            return [dict(zip(cols, r)) for r in rows]
 
+async def _import_rows(db, rows: list[tuple]) -> int:
+    async with db.execute(IMPORT_TASKS, (json.dumps(rows),)) as cur:
+        return cur.rowcount
 
+
+async def _insert_batches(insert, batch, batches) -> dict[str, int]:
+    """
+    Awaits ``insert(rows)``, which returns how many rows it added, for
+    ``batch`` and then every batch left in ``batches``
+    """
+    imported = skipped = 0
+    while batch is not None:
+        write = asyncio.ensure_future(insert(batch))
+        try:
+            # The next batch is parsed in a thread, off the event loop, while
+            # SQLite inserts this one in the connection's thread
+            following = await asyncio.to_thread(next, batches, None)
+        finally:
+            # Even when a later line is bad, this insert finishes first
+            added = await write
+        imported += added
+        skipped += len(batch) - added
+        batch = following
+    return {"imported": imported, "skipped": skipped}
+
+
+async def _set_triggers(db, enabled: bool) -> None:
+    # A per-connection switch, unlike dropping the triggers: a schema change
+    # makes the next statement of every other open connection fail once
+    await db._execute(
+        db._connection.setconfig, sqlite3.SQLITE_DBCONFIG_ENABLE_TRIGGER, enabled
+    )
+
+
+async def _bulk_import(db, batch, batches) -> dict[str, int] | None:
+    """
+    Imports ``batch`` and the rest of ``batches`` in one transaction if the
+    project holds no task, live or archived; otherwise returns None. The
+    stats and search triggers cost more than the inserts they follow, so they
+    are off for the inserts, and both are rebuilt once from the whole table
+    at the end. Everything rolls back together: a bad line or a crash leaves
+    the project empty.
+    """
+    if not db.in_transaction:
+        # sqlite3 opens no transaction before a SELECT: the check and the
+        # inserts must see the same, still empty, project
+        await db.execute("BEGIN IMMEDIATE")
+    async with db.execute(PROJECT_IS_EMPTY) as cur:
+        ((empty,),) = await cur.fetchall()
+    if not empty:
+        return None
+
+    await _set_triggers(db, False)
+    try:
+        result = await _insert_batches(partial(_import_rows, db), batch, batches)
+    finally:
+        await _set_triggers(db, True)
+    await db.execute("INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')")
+    for table in STATS_TABLES:
+        await db.execute(f"DELETE FROM {table}")
+    for statement in STATS_BACKFILL:
+        await db.execute(statement)
+    return result
+
+
+@metrics.query
+async def import_tasks(
+    lines: Iterable[str], batch_size: int = IMPORT_BATCH_SIZE
+) -> dict[str, int]:
+    """
+    Inserts the tasks of NDJSON ``lines`` written by export_tasks, keeping
+    their ids and timestamps, one transaction per ``batch_size`` tasks. Ids
+    already taken (by a live or an archived task) are skipped, so an
+    interrupted import can simply run again. A bad line stops the import; the
+    batches before it stay committed. Into an empty project the whole import
+    is a single, faster transaction instead (see _bulk_import).
+    """
+    batches = import_batches(lines, batch_size)
+    batch = await asyncio.to_thread(next, batches, None)
+    if batch is None:
+        return {"imported": 0, "skipped": 0}
+    result = await _write(partial(_bulk_import, batch=batch, batches=batches))
+    if result is not None:
+        return result
+    return await _insert_batches(
+        lambda rows: _write(partial(_import_rows, rows=rows)), batch, batches
+    )
+
+
+async def vacuum(pages: int = 1000, full: bool = False) -> int:
+    """
+    Returns up to ``pages`` free pages to the file system with an incremental
+    vacuum, and the number of pages freed. Files created before migrate() set
+    incremental mode are left alone unless ``full``, which switches them with
+    one full VACUUM: that holds the write lock for as long as it rewrites the
+    whole file, so it is for the maintenance command, not a serving process.
+    """
+
+    async def pragma(db, statement: str) -> list:
+        async with db.execute(statement) as cur:
+            return await cur.fetchall()
+
+    async with _connection() as db:
+        (before,) = (await pragma(db, "PRAGMA freelist_count"))[0]
+        ((mode,),) = await pragma(db, "PRAGMA auto_vacuum")
+        if mode != 2:
+            if not full:
+                return 0
+            await pragma(db, "PRAGMA auto_vacuum = INCREMENTAL")
+            await pragma(db, "VACUUM")
+        else:
+            await pragma(db, f"PRAGMA incremental_vacuum({int(pages)})")
+        (after,) = (await pragma(db, "PRAGMA freelist_count"))[0]
+    return before - after
+
+
+@metrics.query
 async def clear_tasks() -> None:
-    async with aiosqlite.connect(DB_PATH) as db:
+    async def op(db):
         await db.execute("DELETE FROM tasks")
+        await db.execute("DELETE FROM archived_tasks")
         await db.execute("DELETE FROM sqlite_sequence WHERE name='tasks'")
-        await db.commit()
+
+    await _write(op)
@@ -0,0 +1,548 @@
+import asyncio
+import bisect
+import heapq
+import itertools
+import json
+import operator
+import re
+import time
+import unicodedata
+from collections import Counter
+from collections.abc import AsyncIterator, Iterable
+from dataclasses import replace
+from datetime import datetime
+
+import db
+import metrics
+from db import (
+    DEFAULT_PRIORITY,
+    DEFAULT_PROJECT,
+    SEARCH_TITLE_WEIGHT,
+    TASK_SORT_COLUMNS,
+    SearchHit,
+    Task,
+)
+
+# Letters and digits, like SQLite's unicode61 tokenizer
+_TOKEN = re.compile(r"[^\W_]+")
+# Tokens around the first hit kept in a search snippet
+SNIPPET_TOKENS = 12
+# Shared by every backend instance, so a version is never seen twice in a
+# process and a resource cache entry cannot outlive the backend it came from.
+# Starting from the clock keeps a restarted server from handing out a version
+# token a client saw before the restart.
+_versions = itertools.count(time.time_ns() // 1_000_000)
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+
+def _fold(token: str) -> str:
+    """
+    Lowercase ``token`` without diacritics, so "Reunião" matches "reuniao"
+    """
+    decomposed = unicodedata.normalize("NFKD", token.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def _seconds_to_complete(task: Task) -> int:
+    delta = datetime.fromisoformat(task.completed_at) - datetime.fromisoformat(
+        task.created_at
+    )
+    return round(delta.total_seconds())
+
+
+class _Project:
+    """
+    One project's tasks, indexed by id and by status, its archive, and the
+    counters behind fetch_task_stats, updated on every write
+    """
+
+    def __init__(self):
+        self.version = next(_versions)
+        self.clear()
+
+    def clear(self) -> None:
+        # Ids only grow, so the dict keeps id order
+        self.tasks: dict[int, Task] = {}
+        self.ids: list[int] = []
+        self.by_status: dict[str, dict[int, Task]] = {}
+        self.archived: dict[int, Task] = {}
+        self.completions_per_day: Counter[str] = Counter()
+        # Completed tasks per duration bucket (see db.duration_bucket)
+        self.durations: Counter[int] = Counter()
+        self.next_id = 1
+
+    def _count_history(self, task: Task, delta: int) -> None:
+        if task.status != "completed" or task.completed_at is None:
+            return
+        self.completions_per_day[task.completed_at[:10]] += delta
+        seconds = _seconds_to_complete(task)
+        if seconds >= 0:
+            self.durations[db.duration_bucket(seconds)] += delta
+
+    def _index(self, task: Task) -> None:
+        self.tasks[task.id] = task
+        self.by_status.setdefault(task.status, {})[task.id] = task
+
+    def _unindex(self, task: Task) -> None:
+        del self.by_status[task.status][task.id]
+
+    def insert(
+        self,
+        title: str,
+        description: str,
+        created_at: str,
+        priority: int = DEFAULT_PRIORITY,
+        due_at: str | None = None,
+    ) -> Task:
+        task = Task(
+            self.next_id,
+            title,
+            description,
+            "pending",
+            created_at,
+            priority=priority,
+            due_at=due_at,
+        )
+        self.next_id += 1
+        self.ids.append(task.id)
+        self._index(task)
+        return task
+
+    def restore(self, tasks: list[Task]) -> int:
+        """
+        Adds ``tasks`` under their own ids, skipping ids already taken.
+        Returns how many were added.
+        """
+        highest = self.ids[-1] if self.ids else 0
+        added = 0
+        in_order = True
+        for task in tasks:
+            if task.id in self.tasks or task.id in self.archived:
+                continue
+            self._index(task)
+            self._count_history(task, 1)
+            bisect.insort(self.ids, task.id)
+            in_order = in_order and task.id > highest
+            highest = max(highest, task.id)
+            added += 1
+        self.next_id = max(self.next_id, highest + 1)
+        if not in_order:
+            self.tasks = dict(sorted(self.tasks.items()))
+        return added
+
+    def update(
+        self, task_id: int, status: str, completed_at: str | None
+    ) -> Task | None:
+        old = self.tasks.get(task_id)
+        if old is None:
+            return None
+        # Tasks handed out are never changed in place
+        task = replace(old, status=status, completed_at=completed_at)
+        self._unindex(old)
+        self._count_history(old, -1)
+        self._index(task)
+        self._count_history(task, 1)
+        return task
+
+    def delete(self, task_id: int, keep_history: bool = False) -> Task | None:
+        task = self.tasks.pop(task_id, None)
+        if task is None:
+            return None
+        self._unindex(task)
+        if not keep_history:
+            self._count_history(task, -1)
+        del self.ids[bisect.bisect_left(self.ids, task_id)]
+        return task
+
+
+def _select(
+    tasks,
+    status: str | None = None,
+    created_range: tuple[str | None, str | None] = (None, None),
+    completed_range: tuple[str | None, str | None] = (None, None),
+    title_prefix: str | None = None,
+    order_by: str = "id",
+    descending: bool = False,
+    limit: int | None = None,
+) -> list[Task]:
+    """
+    ``tasks`` (in id order) filtered and sorted like ``db._build_task_query``
+    """
+    if order_by not in TASK_SORT_COLUMNS:
+        raise ValueError(f"Cannot order by {order_by!r}")
+    ranges = [
+        (column, start and db.timestamp(start), end and db.timestamp(end))
+        for column, (start, end) in (
+            ("created_at", created_range),
+            ("completed_at", completed_range),
+        )
+        if (start, end) != (None, None)
+    ]
+    # LIKE only folds ASCII case
+    prefix = title_prefix.translate(_ASCII_LOWER) if title_prefix else None
+
+    def keep(task: Task) -> bool:
+        if status is not None and task.status != status:
+            return False
+        for column, start, end in ranges:
+            value = getattr(task, column)
+            if value is None or (start and value < start) or (end and value >= end):
+                return False
+        return prefix is None or task.title.translate(_ASCII_LOWER).startswith(prefix)
+
+    rows = [task for task in tasks if keep(task)]
+    if order_by != "id":
+        rows.sort(
+            key=lambda task: db.sort_value(getattr(task, order_by)), reverse=descending
+        )
+    elif descending:
+        rows.reverse()
+    return rows if limit is None else rows[:limit]
+
+
+def _terms(text: str) -> list[tuple[str, bool]]:
+    """
+    (token, is_prefix) for every word of ``text``; a trailing ``*`` makes the
+    word's last token a prefix
+    """
+    terms = []
+    for word in text.split():
+        prefix = word.endswith("*")
+        tokens = [_fold(token) for token in _TOKEN.findall(word)]
+        terms.extend((token, False) for token in tokens[:-1])
+        if tokens:
+            terms.append((tokens[-1], prefix))
+    return terms
+
+
+def _matches(token: str, term: str, prefix: bool) -> bool:
+    return token == term or (prefix and token.startswith(term))
+
+
+def _hits(tokens: list[str], terms: list[tuple[str, bool]]) -> list[bool]:
+    return [any(_matches(token, *term) for term in terms) for token in tokens]
+
+
+def _snippet(text: str, hits: list[bool], highlight: tuple[str, str]) -> str:
+    """
+    Up to SNIPPET_TOKENS tokens of ``text`` from around its first hit, with
+    the hits wrapped in ``highlight``
+    """
+    spans = [match.span() for match in _TOKEN.finditer(text)]
+    first = hits.index(True) if True in hits else 0
+    start = max(0, min(first - 1, len(spans) - SNIPPET_TOKENS))
+    end = min(len(spans), start + SNIPPET_TOKENS)
+    parts = ["…" if start else ""]
+    position = spans[start][0] if spans else 0
+    for (token_start, token_end), hit in zip(spans[start:end], hits[start:end]):
+        parts.append(text[position:token_start])
+        token = text[token_start:token_end]
+        parts.append(f"{highlight[0]}{token}{highlight[1]}" if hit else token)
+        position = token_end
+    parts.append(text[position:] if end == len(spans) else "…")
+    return "".join(parts)
+
+
+class MemoryDatabase:
+    """
+    Storage backend keeping every project's tasks in process memory, in dicts
+    indexed by id and by status. Nothing outlives the process: meant for
+    throwaway sandboxes and tests.
+    """
+
+    def __init__(self):
+        self._projects: dict[str, _Project] = {}
+
+    def _project(self) -> _Project:
+        name = db.current_project()
+        project = self._projects.get(name)
+        if project is None:
+            project = self._projects[name] = _Project()
+        return project
+
+    def _wrote(self, project: _Project, changed: bool) -> None:
+        if not changed:
+            return
+        project.version = next(_versions)
+        if db.current_project() == DEFAULT_PROJECT:
+            db.notify_write()
+
+    async def startup(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def init_db(self) -> None:
+        self._project()
+
+    async def clear_tasks(self) -> None:
+        project = self._project()
+        project.clear()
+        self._wrote(project, True)
+
+    async def data_version(self) -> int:
+        return self._project().version
+
+    async def change_version(self) -> int:
+        return self._project().version
+
+    def list_projects(self) -> list[str]:
+        names = sorted(name for name in self._projects if name != DEFAULT_PROJECT)
+        return [DEFAULT_PROJECT, *names]
+
+    @metrics.query
+    async def insert_task(
+        self,
+        title: str,
+        description: str,
+        created_at: str,
+        priority: int = DEFAULT_PRIORITY,
+        due_at: str | None = None,
+    ) -> Task:
+        project = self._project()
+        task = project.insert(title, description, created_at, priority, due_at)
+        self._wrote(project, True)
+        return task
+
+    @metrics.query
+    async def update_task_status(
+        self, task_id: int, status: str, completed_at: str | None = None
+    ) -> Task | None:
+        project = self._project()
+        task = project.update(task_id, status, completed_at)
+        self._wrote(project, task is not None)
+        return task
+
+    @metrics.query
+    async def remove_task(self, task_id: int) -> Task | None:
+        project = self._project()
+        task = project.delete(task_id)
+        self._wrote(project, task is not None)
+        return task
+
+    @metrics.query
+    async def insert_tasks(self, items: list[tuple], created_at: str) -> list[Task]:
+        if not items:
+            return []
+        project = self._project()
+        tasks = [
+            project.insert(title, description, created_at, *rest)
+            for title, description, *rest in items
+        ]
+        self._wrote(project, True)
+        return tasks
+
+    @metrics.query
+    async def update_tasks_status(
+        self, task_ids: list[int], status: str, completed_at: str | None = None
+    ) -> list[Task | None]:
+        if not task_ids:
+            return []
+        project = self._project()
+        for task_id in dict.fromkeys(task_ids):
+            project.update(task_id, status, completed_at)
+        results = [project.tasks.get(task_id) for task_id in task_ids]
+        self._wrote(project, any(results))
+        return results
+
+    @metrics.query
+    async def remove_tasks(self, task_ids: list[int]) -> list[Task | None]:
+        if not task_ids:
+            return []
+        project = self._project()
+        found = {
+            task_id: project.delete(task_id) for task_id in dict.fromkeys(task_ids)
+        }
+        self._wrote(project, any(found.values()))
+        # A repeated id is only deleted once
+        return [found.pop(task_id, None) for task_id in task_ids]
+
+    @metrics.query
+    async def fetch_all_tasks(self) -> list[Task]:
+        return list(self._project().tasks.values())
+
+    @metrics.query
+    async def fetch_tasks_page(self, after_id: int = 0, limit: int = 100) -> list[Task]:
+        project = self._project()
+        start = bisect.bisect_right(project.ids, after_id)
+        return [
+            project.tasks[task_id] for task_id in project.ids[start : start + limit]
+        ]
+
+    @metrics.query
+    async def fetch_next_tasks(self, limit: int = 10) -> list[Task]:
+        """
+        Picks the top ``limit`` with a heap over the pending tasks, in the
+        order of db.fetch_next_tasks
+        """
+        pending = self._project().by_status.get("pending", {}).values()
+        return heapq.nsmallest(limit, pending, key=_urgency)
+
+    @metrics.query
+    async def fetch_overdue_tasks(self, now: str, limit: int = 100) -> list[Task]:
+        pending = self._project().by_status.get("pending", {}).values()
+        overdue = (task for task in pending if task.due_at and task.due_at < now)
+        return heapq.nsmallest(limit, overdue, key=_urgency)
+
+    @metrics.query
+    async def query_tasks(self, **filters) -> list[Task]:
+        project = self._project()
+        status = filters.get("status")
+        if status is None:
+            tasks = project.tasks.values()
+        else:
+            # A status change moves a task to the end of its status bucket
+            tasks = sorted(project.by_status.get(status, {}).values(), key=_task_id)
+        return _select(tasks, **filters)
+
+    async def query_projects(
+        self, projects: list[str] | None = None, **filters
+    ) -> list[tuple[str, Task]]:
+        names = (
+            self.list_projects() if projects is None else list(dict.fromkeys(projects))
+        )
+
+        async def query(name: str) -> list[Task]:
+            with db.use_project(name):
+                return await self.query_tasks(**filters)
+
+        results = await asyncio.gather(*map(query, names))
+        return db.merge_projects(dict(zip(names, results)), **filters)
+
+    @metrics.query
+    async def fetch_tasks_json(
+        self, fields: tuple[str, ...] = db.TASK_FIELDS, status: str | None = None
+    ) -> str:
+        db.check_task_fields(fields)
+        project = self._project()
+        if status is None:
+            tasks = project.tasks.values()
+        else:
+            tasks = sorted(project.by_status.get(status, {}).values(), key=_task_id)
+        values = operator.attrgetter(*fields)
+        if len(fields) == 1:
+            rows = [[values(task)] for task in tasks]
+        else:
+            rows = list(map(values, tasks))
+        return json.dumps(
+            {"fields": list(fields), "tasks": rows},
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+
+    @metrics.query
+    async def fetch_task_stats(self, days: int = 30) -> dict:
+        project = self._project()
+        by_status = {
+            status: len(tasks) for status, tasks in project.by_status.items() if tasks
+        }
+        if project.archived:
+            by_status["archived"] = len(project.archived)
+        per_day = sorted(
+            (day, count) for day, count in project.completions_per_day.items() if count
+        )
+        return {
+            "total": sum(by_status.values()),
+            "by_status": dict(sorted(by_status.items())),
+            "completions_per_day": dict(per_day[-days:] if days > 0 else []),
+            "median_seconds_to_complete": db.median_seconds(
+                sorted(item for item in project.durations.items() if item[1])
+            ),
+        }
+
+    @metrics.query
+    async def search_tasks(
+        self,
+        text: str,
+        limit: int = 20,
+        status: str | None = None,
+        highlight: tuple[str, str] = ("**", "**"),
+    ) -> list[SearchHit]:
+        """
+        Scans every task; ranks title hits SEARCH_TITLE_WEIGHT times above
+        description hits, per token, rather than by BM25
+        """
+        terms = _terms(text)
+        if not terms:
+            return []
+        scored = []
+        for task in self._project().tasks.values():
+            if status is not None and task.status != status:
+                continue
+            title = [_fold(token) for token in _TOKEN.findall(task.title)]
+            description = [_fold(token) for token in _TOKEN.findall(task.description)]
+            tokens = title + description
+            if not all(any(_matches(t, *term) for t in tokens) for term in terms):
+                continue
+            title_hits = _hits(title, terms)
+            description_hits = _hits(description, terms)
+            score = SEARCH_TITLE_WEIGHT * sum(title_hits) + sum(description_hits)
+            if sum(title_hits) >= sum(description_hits):
+                snippet = _snippet(task.title, title_hits, highlight)
+            else:
+                snippet = _snippet(task.description, description_hits, highlight)
+            # Shorter tasks rank higher for the same hits
+            scored.append(SearchHit(task, snippet, -score / len(tokens) ** 0.5))
+        scored.sort(key=lambda hit: (hit.rank, hit.task.id))
+        return scored[:limit]
+
+    @metrics.query
+    async def archive_tasks(self, completed_before: str, batch_size: int = 500) -> int:
+        """
+        Moves completed tasks finished before ``completed_before`` to the
+        archive, all at once
+        """
+        cutoff = db.timestamp(completed_before)
+        project = self._project()
+        old = [
+            task
+            for task in project.by_status.get("completed", {}).values()
+            if task.completed_at is not None and task.completed_at < cutoff
+        ]
+        for task in sorted(old, key=lambda task: task.completed_at):
+            project.archived[task.id] = project.delete(task.id, keep_history=True)
+        self._wrote(project, bool(old))
+        return len(old)
+
+    @metrics.query
+    async def query_archived_tasks(self, **filters) -> list[Task]:
+        archived = self._project().archived.values()
+        return _select(sorted(archived, key=_task_id), **filters)
+
+    async def export_tasks(self, batch_size: int = 1000) -> AsyncIterator[str]:
+        tasks = list(self._project().tasks.values())
+        for start in range(0, len(tasks), batch_size):
+            yield "".join(
+                json.dumps(task.to_dict(), ensure_ascii=False, separators=(",", ":"))
+                + "\n"
+                for task in tasks[start : start + batch_size]
+            )
+
+    @metrics.query
+    async def import_tasks(
+        self, lines: Iterable[str], batch_size: int = db.IMPORT_BATCH_SIZE
+    ) -> dict[str, int]:
+        project = self._project()
+        batches = db.import_batches(lines, batch_size)
+        if not project.tasks and not project.archived:
+            # All or nothing into an empty project, like db.import_tasks
+            batches = [[row for batch in batches for row in batch]]
+        imported = skipped = 0
+        for batch in batches:
+            added = project.restore([Task(*row) for row in batch])
+            self._wrote(project, bool(added))
+            imported += added
+            skipped += len(batch) - added
+        return {"imported": imported, "skipped": skipped}
+
+    async def vacuum(self, pages: int = 1000, full: bool = False) -> int:
+        return 0
+
+
+def _task_id(task: Task) -> int:
+    return task.id
+
+
+def _urgency(task: Task) -> tuple:
+    return (-task.priority, task.due_at is None, task.due_at or "", task.id)
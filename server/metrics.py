@@ -0,0 +1,205 @@
+import functools
+import inspect
+from bisect import bisect_left
+from time import perf_counter
+
+# Upper bounds of the latency buckets, in seconds (the last one catches the rest)
+LATENCY_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    float("inf"),
+)
+
+
+class CallStats:
+    """
+    Counters and latency histogram for one instrumented function
+    """
+
+    __slots__ = ("calls", "errors", "rows", "bytes", "seconds", "buckets")
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+
+    def observe(self, seconds: float, rows: int = 0, nbytes: int = 0) -> None:
+        self.calls += 1
+        self.seconds += seconds
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.rows += rows
+        self.bytes += nbytes
+
+    def snapshot(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "seconds": self.seconds,
+            "latency_buckets": {
+                str(bound): count
+                for bound, count in zip(LATENCY_BUCKETS, self.buckets)
+                if count
+            },
+        }
+
+
+class MetricsRegistry:
+    """
+    In-process metrics, keyed by (kind, name): kind is "tool", "resource",
+    "prompt" or "query"
+    """
+
+    def __init__(self):
+        self._stats: dict[tuple[str, str], CallStats] = {}
+
+    def stats(self, kind: str, name: str) -> CallStats:
+        key = (kind, name)
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = CallStats()
+        return stats
+
+    def reset(self) -> None:
+        # Wrappers hold on to their CallStats, so zero them rather than drop them
+        for stats in self._stats.values():
+            stats.reset()
+
+    def snapshot(self) -> dict:
+        result: dict[str, dict] = {}
+        for (kind, name), stats in sorted(self._stats.items()):
+            result.setdefault(kind, {})[name] = stats.snapshot()
+        return result
+
+    def to_prometheus(self) -> str:
+        lines = [
+            "# TYPE tasktracker_calls_total counter",
+            "# TYPE tasktracker_errors_total counter",
+            "# TYPE tasktracker_rows_total counter",
+            "# TYPE tasktracker_response_bytes_total counter",
+            "# TYPE tasktracker_latency_seconds histogram",
+        ]
+        for (kind, name), stats in sorted(self._stats.items()):
+            labels = f'kind="{kind}",name="{_escape(name)}"'
+            lines.append(f"tasktracker_calls_total{{{labels}}} {stats.calls}")
+            lines.append(f"tasktracker_errors_total{{{labels}}} {stats.errors}")
+            lines.append(f"tasktracker_rows_total{{{labels}}} {stats.rows}")
+            lines.append(f"tasktracker_response_bytes_total{{{labels}}} {stats.bytes}")
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(
+                    f'tasktracker_latency_seconds_bucket{{{labels},le="{le}"}}'
+                    f" {cumulative}"
+                )
+            lines.append(f"tasktracker_latency_seconds_sum{{{labels}}} {stats.seconds}")
+            lines.append(f"tasktracker_latency_seconds_count{{{labels}}} {stats.calls}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _rows(result) -> int:
+    if isinstance(result, list):
+        return len(result)
+    return 0 if result is None else 1
+
+
+def _bytes(result) -> int:
+    return len(result.encode()) if isinstance(result, str) else 0
+
+
+registry = MetricsRegistry()
+# Instrumented calls running right now and started so far; profiling uses them
+# to tell whether other calls overlapped a profiled one
+in_flight = 0
+started = 0
+
+
+def instrument(kind: str, name: str, fn):
+    """
+    Wraps a tool, resource or prompt function so each call is recorded under
+    (kind, name), with the size of text responses in bytes
+    """
+    stats = registry.stats(kind, name)
+
+    if inspect.iscoroutinefunction(fn):
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            global in_flight, started
+            in_flight += 1
+            started += 1
+            start = perf_counter()
+            try:
+                result = await fn(*args, **kwargs)
+            except BaseException:
+                stats.errors += 1
+                stats.observe(perf_counter() - start)
+                raise
+            finally:
+                in_flight -= 1
+            stats.observe(perf_counter() - start, nbytes=_bytes(result))
+            return result
+
+    else:
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            global started
+            started += 1
+            start = perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                stats.errors += 1
+                stats.observe(perf_counter() - start)
+                raise
+            stats.observe(perf_counter() - start, nbytes=_bytes(result))
+            return result
+
+    return wrapper
+
+
+def query(fn):
+    """
+    Decorator for db functions: records latency and rows returned per query
+    """
+    stats = registry.stats("query", fn.__name__)
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        start = perf_counter()
+        try:
+            result = await fn(*args, **kwargs)
+        except BaseException:
+            stats.errors += 1
+            stats.observe(perf_counter() - start)
+            raise
+        stats.observe(perf_counter() - start, rows=_rows(result))
+        return result
+
+    return wrapper
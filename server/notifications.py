@@ -0,0 +1,115 @@
+import asyncio
+import os
+import weakref
+
+import db
+from pydantic import AnyUrl
+
+# Resources clients can subscribe to; every task write may change all of them
+SUBSCRIBABLE = ("tasks://all", "task://pending", "stats://tasks")
+# A burst of writes is announced once it has been quiet for DEBOUNCE_MS, and
+# no later than MAX_DELAY_MS after its first write
+DEBOUNCE_MS = float(os.environ.get("TASKS_NOTIFY_DEBOUNCE_MS", "50"))
+MAX_DELAY_MS = float(os.environ.get("TASKS_NOTIFY_MAX_DELAY_MS", "500"))
+
+
+class ResourceNotifier:
+    """
+    Tracks resource subscriptions per session and sends them debounced
+    ``notifications/resources/updated`` after task writes
+    """
+
+    def __init__(
+        self, debounce_ms: float = DEBOUNCE_MS, max_delay_ms: float = MAX_DELAY_MS
+    ):
+        self.debounce = debounce_ms / 1000
+        self.max_delay = max_delay_ms / 1000
+        self.sent = 0
+        # Sessions that go away without unsubscribing simply drop out
+        self._subscribers: dict[str, weakref.WeakSet] = {
+            uri: weakref.WeakSet() for uri in SUBSCRIBABLE
+        }
+        self._first_change: float | None = None
+        self._timer: asyncio.TimerHandle | None = None
+        self._flushing: set[asyncio.Task] = set()
+
+    def subscribe(self, session, uri: str) -> None:
+        if uri not in self._subscribers:
+            raise ValueError(f"Resource {uri} does not support subscriptions")
+        self._subscribers[uri].add(session)
+
+    def unsubscribe(self, session, uri: str) -> None:
+        if uri in self._subscribers:
+            self._subscribers[uri].discard(session)
+
+    def changed(self) -> None:
+        """
+        Marks every subscribable resource as changed and (re)arms the timer
+        """
+        if not any(self._subscribers.values()):
+            return
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if self._first_change is None:
+            self._first_change = now
+        due = min(now + self.debounce, self._first_change + self.max_delay)
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = loop.call_at(due, self._fire)
+
+    def _fire(self) -> None:
+        self._timer = self._first_change = None
+        task = asyncio.create_task(self._flush())
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
+
+    async def _flush(self) -> None:
+        for uri, sessions in self._subscribers.items():
+            for session in list(sessions):
+                try:
+                    await session.send_resource_updated(AnyUrl(uri))
+                except Exception:
+                    # The client is gone; stop notifying it
+                    sessions.discard(session)
+                else:
+                    self.sent += 1
+
+    async def close(self) -> None:
+        """
+        Sends whatever is still pending, then stops
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._fire()
+        if self._flushing:
+            await asyncio.gather(*self._flushing, return_exceptions=True)
+
+
+notifier = ResourceNotifier()
+db.on_write(notifier.changed)
+
+
+def enable_subscriptions(mcp, notifier: ResourceNotifier = notifier) -> None:
+    """
+    Wires resources/subscribe and resources/unsubscribe on a FastMCP server to
+    ``notifier`` and advertises the capability, which FastMCP leaves off
+    """
+    server = mcp._mcp_server
+
+    @server.subscribe_resource()
+    async def subscribe(uri: AnyUrl) -> None:
+        notifier.subscribe(server.request_context.session, str(uri))
+
+    @server.unsubscribe_resource()
+    async def unsubscribe(uri: AnyUrl) -> None:
+        notifier.unsubscribe(server.request_context.session, str(uri))
+
+    get_capabilities = server.get_capabilities
+
+    def get_capabilities_with_subscribe(*args, **kwargs):
+        capabilities = get_capabilities(*args, **kwargs)
+        if capabilities.resources is not None:
+            capabilities.resources.subscribe = True
+        return capabilities
+
+    server.get_capabilities = get_capabilities_with_subscribe
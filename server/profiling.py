@@ -0,0 +1,119 @@
+import asyncio
+import cProfile
+import functools
+import os
+import random
+import re
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import metrics
+
+# Comma-separated tool names / resource URIs to profile, or "*" for all of them.
+# Empty (the default) leaves every function unwrapped, so profiling costs nothing.
+PROFILE = os.environ.get("TASKS_PROFILE", "")
+PROFILE_RATE = float(os.environ.get("TASKS_PROFILE_RATE", "1.0"))
+PROFILE_DIR = os.environ.get("TASKS_PROFILE_DIR", "profiles")
+# Newest profiled calls kept on disk (each one is a .prof and an .alloc.txt)
+PROFILE_KEEP = int(os.environ.get("TASKS_PROFILE_KEEP", "50"))
+TOP_ALLOCATIONS = 25
+
+# cProfile allows one active profiler per thread. It is not per coroutine
+# either: whatever else runs on the event loop during a profiled call lands in
+# its profile. So a call is only profiled when no other instrumented call is
+# in flight, and the report counts the calls that started while it ran
+# (background jobs such as retention are not counted).
+_active = False
+
+
+def is_selected(name: str) -> bool:
+    selected = {part.strip() for part in PROFILE.split(",") if part.strip()}
+    return "*" in selected or name in selected
+
+
+def profiled(kind: str, name: str, fn):
+    """
+    Wraps an async tool or resource function so a PROFILE_RATE share of its
+    calls run under cProfile and tracemalloc, each dumping a .prof file and a
+    report of the allocations made during the call into PROFILE_DIR. Returns
+    ``fn`` itself when profiling is off or ``name`` is not selected.
+    """
+    if not is_selected(name) or PROFILE_RATE <= 0:
+        return fn
+
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        global _active
+        # metrics.instrument wraps this call too, so it counts as one in flight
+        if _active or metrics.in_flight > 1 or random.random() >= PROFILE_RATE:
+            return await fn(*args, **kwargs)
+
+        _active = True
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        # Only what the call allocates is reported, not all the live memory
+        # of a process that was already tracing
+        before = tracemalloc.take_snapshot()
+        started = metrics.started
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            profiler.disable()
+            after = tracemalloc.take_snapshot()
+            if started_tracing:
+                tracemalloc.stop()
+            _active = False
+            overlapping = metrics.started - started
+            await asyncio.to_thread(
+                _dump, kind, name, profiler, before, after, overlapping
+            )
+
+    return wrapper
+
+
+def _dump(
+    kind: str,
+    name: str,
+    profiler: cProfile.Profile,
+    before: tracemalloc.Snapshot,
+    after: tracemalloc.Snapshot,
+    overlapping: int,
+) -> None:
+    directory = Path(PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", name).strip("_")
+    stem = directory / f"{kind}-{slug}-{datetime.now():%Y%m%dT%H%M%S_%f}"
+
+    profiler.dump_stats(f"{stem}.prof")
+    ignore = (tracemalloc.Filter(False, tracemalloc.__file__),)
+    growth = after.filter_traces(ignore).compare_to(
+        before.filter_traces(ignore), "lineno"
+    )
+    with open(f"{stem}.alloc.txt", "w") as report:
+        report.write(f"Top {TOP_ALLOCATIONS} allocations for {kind} {name}\n")
+        if overlapping:
+            report.write(
+                f"Warning: {overlapping} other call(s) started during this one;"
+                " their work on the event loop is included in this report and"
+                f" in {stem.name}.prof\n"
+            )
+        report.write("\n")
+        changed = [stat for stat in growth if stat.size_diff or stat.count_diff]
+        for stat in changed[:TOP_ALLOCATIONS]:
+            report.write(f"{stat}\n")
+
+    _prune(directory)
+
+
+def _prune(directory: Path) -> None:
+    """
+    Keeps only the newest PROFILE_KEEP profiled calls in the directory
+    """
+    profiles = sorted(directory.glob("*.prof"), key=lambda p: p.stat().st_mtime)
+    for old in profiles[: max(0, len(profiles) - PROFILE_KEEP)]:
+        old.unlink(missing_ok=True)
+        old.with_suffix(".alloc.txt").unlink(missing_ok=True)
@@ -0,0 +1,69 @@
+import os
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+
+import db
+from storage import backend
+
+CACHE_SIZE = int(os.environ.get("TASKS_RESOURCE_CACHE_SIZE", "128"))
+
+
+class ResourceCache:
+    """
+    LRU cache of rendered resource text.
+
+    Entries are kept per project. Every entry is tagged with the project's
+    ``data_version()`` from the storage backend at render time and only served
+    while the version is unchanged, so a write from this process or from
+    another one invalidates it on the next read.
+    """
+
+    def __init__(self, maxsize: int = CACHE_SIZE):
+        if maxsize < 1:
+            raise ValueError("Cache size must be at least 1")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[tuple, str]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    async def get_or_render(
+        self, key: Hashable, render: Callable[[], Awaitable[str]]
+    ) -> str:
+        # Each project renders its own text from its own database
+        key = (db.current_project(), key)
+        # Read before rendering: the text is then never older than its tag
+        version = await backend().data_version()
+        if version is None:
+            self.misses += 1
+            return await render()
+
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        text = await render()
+        self._entries[key] = (version, text)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return text
+
+
+resource_cache = ResourceCache()
@@ -1,44 +1,295 @@
-import asyncio
+import json
+from functools import partial
 
 import db
+import metrics
+from storage import backend
 
+from resources.cache import resource_cache
 
-def get_all_tasks() -> str:
-    """
-    Gets all tasks as formatted text
-    """
-    tasks = asyncio.run(db.fetch_all_tasks())
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Days listed under "Completions per day" in stats://tasks
+STATS_DAYS = 30
+
+
+def _render_task(task: db.Task) -> str:
+    status_emoji = "✅" if task.status == "completed" else "⏳"
+    description = f"Description: {task.description}\n" if task.description else ""
+    priority = (
+        f"Priority: {db.PRIORITIES[task.priority]}\n"
+        if task.priority != db.DEFAULT_PRIORITY
+        else ""
+    )
+    due = f"Due: {task.due_at}\n" if task.due_at else ""
+    return (
+        f"{status_emoji} [{task.id}] {task.title} \n"
+        f"{description}"
+        f"Status: {task.status}\n"
+        f"{priority}"
+        f"{due}"
+        f"Created: {task.created_at}\n\n"
+    )
+
+
+def _render_pending_task(task: db.Task) -> str:
+    description = f"   {task.description}\n" if task.description else ""
+    return f"⏳ [{task.id}] {task.title}\n{description}\n"
+
+
+async def _all_tasks_text() -> str:
+    tasks = await backend().fetch_all_tasks()
 
     if not tasks:
         return "No task found"
 
-    result = "Current tasks: \n\n"
-    for task in tasks:
-        status_emoji = "✅" if task["status"] == "completed" else "⏳"
-        result += f"{status_emoji} [{task['id']}] {task['title']} \n"
-        if task["description"]:
-            result += f"Description: {task['description']}\n"
-        result += f"Status: {task['status']}\n"
-        result += f"Created: {task['created_at']}\n\n"
+    return "Current tasks: \n\n" + "".join(map(_render_task, tasks))
+
+
+async def _tasks_page_text(cursor: int, limit: int) -> str:
+    # One extra row tells whether another page follows
+    tasks = await backend().fetch_tasks_page(cursor, limit + 1)
+
+    if not tasks:
+        return "No task found" if cursor == 0 else "No more tasks"
+
+    page = tasks[:limit]
+    footer = f"Next cursor: {page[-1].id}\n" if len(tasks) > limit else "End of list\n"
+    return "".join(("Current tasks: \n\n", *map(_render_task, page), footer))
+
+
+async def _pending_tasks_text() -> str:
+    pending = await backend().query_tasks(status="pending")
+
+    if not pending:
+        return "No pending tasks! All done! Congrats!"
+
+    return "Pending Tasks: \n\n" + "".join(map(_render_pending_task, pending))
+
+
+async def _overdue_tasks_text(limit: int) -> str:
+    overdue = await backend().fetch_overdue_tasks(db.timestamp(), limit)
+
+    if not overdue:
+        return "No overdue tasks"
+
+    return "Overdue tasks: \n\n" + "".join(map(_render_task, overdue))
+
+
+def _not_modified(version: int) -> str:
+    return f"Not modified since version {version}\n"
+
+
+async def _read(key, render, since: int | None) -> str:
+    """
+    Serves ``render()`` from the cache with the current version token on its
+    first line, or a one-line reply when ``since`` is still the current version
+    """
+    store = backend()
+    if since is not None:
+        version = await store.change_version()
+        if version == since:
+            return _not_modified(version)
+
+    async def versioned() -> str:
+        # Read before rendering: the text is then never older than its token
+        version = await store.change_version()
+        return f"Version: {version}\n" + await render()
+
+    return await resource_cache.get_or_render(key, versioned)
+
+
+async def _read_json(key, render, since: int | None) -> str:
+    """
+    Like _read, for JSON objects: the version is their first key
+    """
+    store = backend()
+    if since is not None:
+        version = await store.change_version()
+        if version == since:
+            return f'{{"version":{version},"not_modified":true}}'
+
+    async def versioned() -> str:
+        version = await store.change_version()
+        return f'{{"version":{version},' + (await render())[1:]
+
+    return await resource_cache.get_or_render(key, versioned)
+
+
+def _format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(round(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    if days:
+        return f"{days}d {hours}h"
+    if hours:
+        return f"{hours}h {minutes}m"
+    if minutes:
+        return f"{minutes}m {seconds}s"
+    return f"{seconds}s"
+
+
+async def get_all_tasks() -> str:
+    """
+    Gets all tasks as formatted text, after a "Version: N" line
+    """
+    return await _read("tasks://all", _all_tasks_text, None)
+
+
+async def get_all_tasks_since(since: int | None = None) -> str:
+    """
+    Gets all tasks like tasks://all, or a one-line "Not modified" reply when
+    ``since`` (the version of your last read) is still current
+    """
+    return await _read("tasks://all", _all_tasks_text, since)
+
 
-    return result
+async def get_tasks_page(
+    cursor: int = 0, limit: int = PAGE_SIZE, since: int | None = None
+) -> str:
+    """
+    Gets one page of tasks as formatted text, ordered by id.
+    Pass the returned next cursor back to read the following page.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    return await _read(
+        ("tasks://all/page", cursor, limit),
+        partial(_tasks_page_text, cursor, limit),
+        since,
+    )
 
 
-def get_pending_tasks() -> str:
+async def get_pending_tasks() -> str:
     """
     Returns only pending tasks
     """
-    tasks = asyncio.run(db.fetch_all_tasks())
-    pending = [t for t in tasks if t["status"] == "pending"]
+    return await _read("task://pending", _pending_tasks_text, None)
 
-    if not pending:
-        return "No pending tasks! All done! Congrats!"
 
-    result = "Pending Tasks: \n\n"
-    for task in pending:
-        result += f"⏳ [{task['id']}] {task['title']}\n"
-        if task["description"]:
-            result += f"   {task['description']}\n"
-        result += "\n"
+async def get_pending_tasks_since(since: int | None = None) -> str:
+    """
+    Returns pending tasks like task://pending, unless ``since`` is current
+    """
+    return await _read("task://pending", _pending_tasks_text, since)
+
+
+async def get_overdue_tasks(limit: int = PAGE_SIZE) -> str:
+    """
+    Returns the pending tasks past their due date, highest priority first,
+    then the longest overdue. Neither cached nor versioned: tasks fall overdue
+    as time passes, without any write.
+    """
+    return await _overdue_tasks_text(max(1, min(limit, MAX_PAGE_SIZE)))
+
+
+async def get_project_tasks(project: str, since: int | None = None) -> str:
+    """
+    Gets all tasks of one project as formatted text
+    """
+    with db.use_project(project):
+        return await get_all_tasks_since(since)
+
+
+async def get_project_pending_tasks(project: str, since: int | None = None) -> str:
+    """
+    Returns only the pending tasks of one project
+    """
+    with db.use_project(project):
+        return await get_pending_tasks_since(since)
+
+
+def _selected_fields(fields: str) -> tuple[str, ...]:
+    selected = tuple(name.strip() for name in fields.split(",") if name.strip())
+    return selected or db.TASK_FIELDS
+
+
+async def get_all_tasks_json(fields: str = "", since: int | None = None) -> str:
+    """
+    Gets all tasks as compact JSON: {"version": N, "fields": [...],
+    "tasks": [[...], ...]}, one value array per task. ``fields`` is a
+    comma-separated subset of id, title, description, status, created_at,
+    completed_at, priority, due_at. With ``since`` still current the reply is only
+    {"version": N, "not_modified": true}.
+    """
+    selected = _selected_fields(fields)
+    return await _read_json(
+        ("tasks://all.json", selected),
+        partial(backend().fetch_tasks_json, selected),
+        since,
+    )
+
+
+async def get_pending_tasks_json(fields: str = "", since: int | None = None) -> str:
+    """
+    Returns only pending tasks, as compact JSON like tasks://all.json
+    """
+    selected = _selected_fields(fields)
+    return await _read_json(
+        ("task://pending.json", selected),
+        partial(backend().fetch_tasks_json, selected, status="pending"),
+        since,
+    )
+
+
+async def get_task_stats() -> str:
+    """
+    Returns task totals by status, completions per day and the median time
+    to complete, from counters kept up to date on every write
+    """
+    return await get_task_stats_since()
+
+
+async def get_task_stats_since(since: int | None = None) -> str:
+    """
+    Returns the statistics like stats://tasks, unless ``since`` is current
+    """
+    store = backend()
+    version = await store.change_version()
+    if version == since:
+        return _not_modified(version)
+    stats = await store.fetch_task_stats(STATS_DAYS)
+
+    lines = [f"Total tasks: {stats['total']}"]
+    for status in ("pending", "completed"):
+        lines.append(f"{status.capitalize()}: {stats['by_status'].get(status, 0)}")
+    lines.extend(
+        f"{status.capitalize()}: {count}"
+        for status, count in stats["by_status"].items()
+        if status not in ("pending", "completed")
+    )
+    median = stats["median_seconds_to_complete"]
+    lines.append(
+        "Median time to complete: "
+        + (f"~{_format_duration(median)}" if median is not None else "n/a")
+    )
+    if stats["completions_per_day"]:
+        lines.append(f"\nCompletions per day (last {STATS_DAYS} active days):")
+        lines.extend(
+            f"{day}: {count}" for day, count in stats["completions_per_day"].items()
+        )
+    return f"Version: {version}\nTask statistics: \n\n" + "\n".join(lines) + "\n"
+
+
+async def get_project_stats(project: str, since: int | None = None) -> str:
+    """
+    Returns the statistics of one project, like stats://tasks
+    """
+    with db.use_project(project):
+        return await get_task_stats_since(since)
+
 
-    return result
+async def get_server_metrics() -> str:
+    """
+    Returns call counts, errors, latency histograms, rows and response bytes
+    for every tool, resource, prompt and db query, as JSON
+    """
+    return json.dumps(
+        {**metrics.registry.snapshot(), "resource_cache": resource_cache.stats()}
+    )
+
+
+async def get_server_metrics_prometheus() -> str:
+    """
+    Returns the server metrics in the Prometheus text exposition format
+    """
+    return metrics.registry.to_prometheus()
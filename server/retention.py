@@ -0,0 +1,198 @@
+"""
+Archiving of old completed tasks and incremental vacuum, run in the
+background by the server when TASKS_RETENTION_DAYS is set, or once from the
+command line:
+
+    uv run python server/retention.py --days 90
+    uv run python server/retention.py --full-vacuum
+
+--full-vacuum switches database files created before incremental
+auto-vacuum with one full VACUUM, which locks each file while it is
+rewritten; run it while the server is stopped or idle.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta
+
+import db
+from storage import backend
+
+try:
+    import fcntl
+except ImportError:  # Windows: every process runs the job
+    fcntl = None
+
+# Completed tasks older than this many days move to archived_tasks; 0 disables
+# the background retention job
+RETENTION_DAYS = float(os.environ.get("TASKS_RETENTION_DAYS", "0"))
+# Seconds between two retention runs
+RETENTION_INTERVAL = float(os.environ.get("TASKS_RETENTION_INTERVAL", "3600"))
+ARCHIVE_BATCH = int(os.environ.get("TASKS_ARCHIVE_BATCH", "500"))
+# Free pages handed back to the file system per run
+VACUUM_PAGES = int(os.environ.get("TASKS_VACUUM_PAGES", "1000"))
+# Held by the one process that runs the job for a database: HTTP workers and
+# the stdio servers of separate clients all share tasks.db
+LOCK_SUFFIX = ".retention.lock"
+
+
+async def run_retention(
+    days: float = RETENTION_DAYS,
+    batch_size: int = ARCHIVE_BATCH,
+    vacuum_pages: int = VACUUM_PAGES,
+    full_vacuum: bool = False,
+) -> dict:
+    """
+    Archives completed tasks older than ``days`` (none when ``days`` is 0) in
+    every project, then vacuums each project's database incrementally.
+    ``full_vacuum`` also switches older files to incremental mode (see
+    db.vacuum).
+    """
+    cutoff = db.timestamp(datetime.now() - timedelta(days=days))
+    archived = freed = 0
+    store = backend()
+    for name in store.list_projects():
+        with db.use_project(name):
+            if days > 0:
+                archived += await store.archive_tasks(cutoff, batch_size)
+            freed += await store.vacuum(vacuum_pages, full=full_vacuum)
+    return {"archived": archived, "pages_freed": freed}
+
+
+class RetentionWorker:
+    """
+    Background task running ``run_retention`` every ``interval`` seconds. With
+    a ``lock_path``, only the process holding that file's lock runs it; the
+    others try to take the lock over at every interval.
+    """
+
+    def __init__(
+        self,
+        days: float = RETENTION_DAYS,
+        interval: float = RETENTION_INTERVAL,
+        batch_size: int = ARCHIVE_BATCH,
+        vacuum_pages: int = VACUUM_PAGES,
+        lock_path: str | None = None,
+    ):
+        self.days = days
+        self.interval = interval
+        self.batch_size = batch_size
+        self.vacuum_pages = vacuum_pages
+        self.lock_path = lock_path
+        self.runs = 0
+        self.last_result: dict | None = None
+        self._task: asyncio.Task | None = None
+        self._lock = None
+
+    def _take_lock(self) -> bool:
+        if self._lock is not None or self.lock_path is None or fcntl is None:
+            return True
+        lock = open(self.lock_path, "a")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            return False
+        self._lock = lock
+        return True
+
+    def _release_lock(self) -> None:
+        lock, self._lock = self._lock, None
+        if lock is not None:
+            lock.close()
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._release_lock()
+
+    async def _run(self) -> None:
+        while True:
+            if self._take_lock():
+                try:
+                    self.last_result = await run_retention(
+                        self.days, self.batch_size, self.vacuum_pages
+                    )
+                except Exception as exc:
+                    # A busy database or a failed vacuum is retried next run
+                    self.last_result = {"error": str(exc)}
+                self.runs += 1
+            await asyncio.sleep(self.interval)
+
+
+_worker: RetentionWorker | None = None
+
+
+async def start_retention() -> RetentionWorker:
+    global _worker
+    if _worker is None:
+        # An in-memory store belongs to this process alone
+        shared = backend() is db
+        worker = RetentionWorker(lock_path=db.DB_PATH + LOCK_SUFFIX if shared else None)
+        await worker.start()
+        _worker = worker
+    return _worker
+
+
+async def stop_retention() -> None:
+    global _worker
+    worker, _worker = _worker, None
+    if worker is not None:
+        await worker.stop()
+
+
+async def main_async(args: argparse.Namespace) -> dict:
+    db.DB_PATH = args.db
+    db.PROJECTS_DIR = args.projects_dir
+    await db.startup()
+    try:
+        return await run_retention(
+            args.days, args.batch_size, args.vacuum_pages, args.full_vacuum
+        )
+    finally:
+        await db.shutdown()
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--days",
+        type=float,
+        default=RETENTION_DAYS,
+        help="archive tasks completed more than this many days ago (0: none)",
+    )
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH)
+    parser.add_argument("--vacuum-pages", type=int, default=VACUUM_PAGES)
+    parser.add_argument(
+        "--full-vacuum",
+        action="store_true",
+        help="switch older files to incremental auto-vacuum with a full VACUUM",
+    )
+    parser.add_argument("--db", default=db.DB_PATH, help="default project database")
+    parser.add_argument("--projects-dir", default=db.PROJECTS_DIR)
+    args = parser.parse_args(argv)
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    return args
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    print(json.dumps(asyncio.run(main_async(args))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import os
+from collections.abc import AsyncIterator, Hashable, Iterable
+from typing import Protocol
+
+import db
+import memory_db
+from db import SearchHit, Task
+
+# Backend the server stores tasks in: "sqlite" (db.py, tasks.db and the
+# project databases) or "memory" (memory_db.py, gone when the process exits)
+STORAGE = os.environ.get("TASKS_STORAGE", "sqlite")
+
+
+class Storage(Protocol):
+    """
+    What the tools, resources and background jobs need from a task store.
+    Every call works on the project selected with ``db.use_project``.
+    """
+
+    async def startup(self) -> None: ...
+
+    async def shutdown(self) -> None: ...
+
+    async def init_db(self) -> None: ...
+
+    async def clear_tasks(self) -> None: ...
+
+    async def data_version(self) -> Hashable | None: ...
+
+    async def change_version(self) -> int: ...
+
+    def list_projects(self) -> list[str]: ...
+
+    async def insert_task(
+        self,
+        title: str,
+        description: str,
+        created_at: str,
+        priority: int = db.DEFAULT_PRIORITY,
+        due_at: str | None = None,
+    ) -> Task: ...
+
+    async def update_task_status(
+        self, task_id: int, status: str, completed_at: str | None = None
+    ) -> Task | None: ...
+
+    async def remove_task(self, task_id: int) -> Task | None: ...
+
+    async def insert_tasks(self, items: list[tuple], created_at: str) -> list[Task]: ...
+
+    async def update_tasks_status(
+        self, task_ids: list[int], status: str, completed_at: str | None = None
+    ) -> list[Task | None]: ...
+
+    async def remove_tasks(self, task_ids: list[int]) -> list[Task | None]: ...
+
+    async def fetch_all_tasks(self) -> list[Task]: ...
+
+    async def fetch_tasks_page(
+        self, after_id: int = 0, limit: int = 100
+    ) -> list[Task]: ...
+
+    async def fetch_next_tasks(self, limit: int = 10) -> list[Task]: ...
+
+    async def fetch_overdue_tasks(self, now: str, limit: int = 100) -> list[Task]: ...
+
+    async def query_tasks(self, **filters) -> list[Task]: ...
+
+    async def query_projects(
+        self, projects: list[str] | None = None, **filters
+    ) -> list[tuple[str, Task]]: ...
+
+    async def fetch_tasks_json(
+        self, fields: tuple[str, ...] = db.TASK_FIELDS, status: str | None = None
+    ) -> str: ...
+
+    async def fetch_task_stats(self, days: int = 30) -> dict: ...
+
+    async def search_tasks(
+        self,
+        text: str,
+        limit: int = 20,
+        status: str | None = None,
+        highlight: tuple[str, str] = ("**", "**"),
+    ) -> list[SearchHit]: ...
+
+    async def archive_tasks(
+        self, completed_before: str, batch_size: int = 500
+    ) -> int: ...
+
+    async def query_archived_tasks(self, **filters) -> list[Task]: ...
+
+    def export_tasks(self, batch_size: int = 1000) -> AsyncIterator[str]: ...
+
+    async def import_tasks(
+        self, lines: Iterable[str], batch_size: int = db.IMPORT_BATCH_SIZE
+    ) -> dict[str, int]: ...
+
+    async def vacuum(self, pages: int = 1000, full: bool = False) -> int: ...
+
+
+# The db module is the SQLite backend as it stands; every in-memory backend
+# starts out empty
+BACKENDS = {
+    "sqlite": lambda: db,
+    "memory": memory_db.MemoryDatabase,
+}
+
+_backend: Storage = db
+
+
+def backend() -> Storage:
+    return _backend
+
+
+def use_backend(name: str) -> Storage:
+    """
+    Switches every tool, resource and job to a new backend of kind ``name``
+    """
+    global _backend
+    if name not in BACKENDS:
+        raise ValueError(
+            f"Unknown storage backend {name!r}; choose from {', '.join(BACKENDS)}"
+        )
+    _backend = BACKENDS[name]()
+    return _backend
@@ -1,26 +1,148 @@
 import asyncio
+import os
+from contextlib import asynccontextmanager
+from pathlib import Path
 
-from db import init_db
+import anyio
+import uvicorn
+from db import enable_wal, init_db
 from fastmcp import FastMCP
+from metrics import instrument
+from notifications import enable_subscriptions, notifier
+from profiling import profiled
+from resources.resources import (
+    get_all_tasks,
+    get_all_tasks_json,
+    get_all_tasks_since,
+    get_overdue_tasks,
+    get_pending_tasks,
+    get_pending_tasks_json,
+    get_pending_tasks_since,
+    get_project_pending_tasks,
+    get_project_stats,
+    get_project_tasks,
+    get_server_metrics,
+    get_server_metrics_prometheus,
+    get_task_stats,
+    get_task_stats_since,
+    get_tasks_page,
+)
+from retention import RETENTION_DAYS, start_retention, stop_retention
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from storage import STORAGE, backend, use_backend
+from tools.tools import (
+    add_tasks,
+    add_tool,
+    archived_tasks,
+    complete_task,
+    complete_tasks,
+    delete_task,
+    delete_tasks,
+    export_tasks,
+    import_tasks,
+    list_projects,
+    list_tasks,
+    next_tasks,
+    search_tasks,
+)
 
-mcp = FastMCP("TaskTracker")
+# "stdio" serves one client; "http" serves streamable HTTP on HTTP_PORT with
+# HTTP_WORKERS processes sharing tasks.db
+TRANSPORT = os.environ.get("TASKS_TRANSPORT", "stdio")
+HTTP_HOST = os.environ.get("TASKS_HTTP_HOST", "127.0.0.1")
+HTTP_PORT = int(os.environ.get("TASKS_HTTP_PORT", "8000"))
+HTTP_WORKERS = int(os.environ.get("TASKS_HTTP_WORKERS", "1"))
+# Seconds in-flight requests get to finish once shutdown starts
+HTTP_GRACEFUL_TIMEOUT = float(os.environ.get("TASKS_HTTP_GRACEFUL_TIMEOUT", "10"))
 
-asyncio.run(init_db())
+use_backend(STORAGE)
 
-from resources.resources import get_all_tasks, get_pending_tasks  # noqa: E402
-from tools.tools import add_tool, complete_task, delete_task  # noqa: E402
+# True between the end of startup and the start of shutdown (see /ready)
+_ready = False
+
+
+@asynccontextmanager
+async def lifespan(server: FastMCP):
+    """Opens the storage backend, then keeps it and the retention job running."""
+    global _ready
+    store = backend()
+    try:
+        await store.startup()
+        if RETENTION_DAYS > 0:
+            # Every HTTP worker starts one, but only the worker holding the
+            # database's retention lock archives and vacuums
+            await start_retention()
+        _ready = True
+        yield {}
+    finally:
+        _ready = False
+        # Clients tear the server down by cancelling it; finish closing anyway
+        with anyio.CancelScope(shield=True):
+            await stop_retention()
+            await notifier.close()
+            await store.shutdown()
+
+
+mcp = FastMCP("TaskTracker", lifespan=lifespan)
+enable_subscriptions(mcp)
 
 # Register tools
-mcp.tool(name="add_task")(add_tool)
-mcp.tool()(complete_task)
-mcp.tool()(delete_task)
+for name, tool in (
+    ("add_task", add_tool),
+    ("complete_task", complete_task),
+    ("delete_task", delete_task),
+    ("add_tasks", add_tasks),
+    ("complete_tasks", complete_tasks),
+    ("delete_tasks", delete_tasks),
+    ("list_tasks", list_tasks),
+    ("next_tasks", next_tasks),
+    ("search_tasks", search_tasks),
+    ("archived_tasks", archived_tasks),
+    ("export_tasks", export_tasks),
+    ("import_tasks", import_tasks),
+    ("list_projects", list_projects),
+):
+    mcp.tool(name=name)(instrument("tool", name, profiled("tool", name, tool)))
+
+
+# Register resources. Each task resource but tasks://overdue also takes
+# ?since=<version> for a conditional read.
+for uri, resource in (
+    ("tasks://all", get_all_tasks),
+    ("tasks://all{?since}", get_all_tasks_since),
+    ("task://pending", get_pending_tasks),
+    ("task://pending{?since}", get_pending_tasks_since),
+    ("tasks://all/page{?cursor,limit,since}", get_tasks_page),
+    ("tasks://overdue{?limit}", get_overdue_tasks),
+    ("stats://tasks", get_task_stats),
+    ("stats://tasks{?since}", get_task_stats_since),
+    ("projects://{project}/tasks{?since}", get_project_tasks),
+    ("projects://{project}/pending{?since}", get_project_pending_tasks),
+    ("projects://{project}/stats{?since}", get_project_stats),
+):
+    mcp.resource(uri)(instrument("resource", uri, profiled("resource", uri, resource)))
+
+for uri, resource in (
+    ("tasks://all.json{?fields,since}", get_all_tasks_json),
+    ("task://pending.json{?fields,since}", get_pending_tasks_json),
+):
+    mcp.resource(uri, mime_type="application/json")(
+        instrument("resource", uri, profiled("resource", uri, resource))
+    )
+
+mcp.resource("metrics://server")(get_server_metrics)
+mcp.resource("metrics://server/prometheus")(get_server_metrics_prometheus)
+
 
-# Register resources
-mcp.resource("tasks://all")(get_all_tasks)
-mcp.resource("task://pending")(get_pending_tasks)
+@mcp.custom_route("/ready", methods=["GET"])
+async def ready(request: Request) -> JSONResponse:
+    """Readiness probe: 200 once this worker can serve calls, 503 otherwise."""
+    if not _ready:
+        return JSONResponse({"status": "starting"}, status_code=503)
+    return JSONResponse({"status": "ready", "pid": os.getpid()})
 
 
-@mcp.prompt()
 def task_summary_prompt() -> str:
     """Generate a prompt for summarizing tasks."""
     return """Please analyze the current task list and provide:
@@ -30,8 +152,53 @@ def task_summary_prompt() -> str:
 3. Suggested next actions
 4. Overall progress assessment
 
-Use the tasks://all resource to access the complete task list."""
+Start with the stats://tasks resource: it already has the totals by status,
+completions per day and the median time to complete. tasks://overdue lists the
+pending tasks past their due date and the next_tasks tool returns the most
+urgent ones. Only read tasks://all/page (or call list_tasks with filters) when
+you need to look at other individual tasks."""
+
+
+mcp.prompt()(instrument("prompt", "task_summary_prompt", task_summary_prompt))
+
+
+def http_app():
+    """
+    ASGI app for one HTTP worker. With several workers any of them may get
+    the next request of a session, so sessions are stateless.
+    """
+    return mcp.http_app(stateless_http=HTTP_WORKERS > 1)
+
+
+async def _prepare_database() -> None:
+    await init_db()
+    await enable_wal()
+
+
+def serve_http() -> None:
+    """
+    Migrates tasks.db and switches it to WAL once, then starts HTTP_WORKERS
+    uvicorn worker processes on one port. SIGINT/SIGTERM stop accepting
+    connections, let in-flight requests finish and close every db pool.
+    """
+    if STORAGE == "memory" and HTTP_WORKERS > 1:
+        # Every worker would hold tasks of its own
+        raise SystemExit("TASKS_STORAGE=memory cannot be shared by HTTP workers")
+    if STORAGE == "sqlite":
+        asyncio.run(_prepare_database())
+    uvicorn.run(
+        "task_server:http_app",
+        factory=True,
+        app_dir=str(Path(__file__).parent),
+        host=HTTP_HOST,
+        port=HTTP_PORT,
+        workers=HTTP_WORKERS,
+        timeout_graceful_shutdown=HTTP_GRACEFUL_TIMEOUT,
+    )
 
 
 if __name__ == "__main__":
-    mcp.run()
+    if TRANSPORT == "http":
+        serve_http()
+    else:
+        mcp.run()
@@ -0,0 +1,42 @@
+import asyncio
+
+import db
+import pytest
+import storage
+
+
+@pytest.fixture(autouse=True)
+def reset_state():
+    """Initialises the DB and clears all tasks around each test."""
+    asyncio.run(db.init_db())
+    asyncio.run(db.clear_tasks())
+    yield
+    asyncio.run(db.close_pool())
+    asyncio.run(db.clear_tasks())
+
+
+@pytest.fixture
+def projects_dir(tmp_path, monkeypatch):
+    """Keeps project databases in a temporary directory, at most two open."""
+    directory = tmp_path / "projects"
+    monkeypatch.setattr(db, "PROJECTS_DIR", str(directory))
+    monkeypatch.setattr(db, "_shards", db.ShardCache(capacity=2))
+    yield directory
+    asyncio.run(storage.backend().shutdown())
+
+
+@pytest.fixture
+def insert_completed():
+    """Returns a helper that adds ``count`` tasks completed at ``completed_at``."""
+
+    async def insert(count: int, completed_at: str) -> list[db.Task]:
+        tasks = await db.insert_tasks(
+            [(f"antiga {i}", "") for i in range(count)],
+            db.timestamp("2026-01-01T08:00:00"),
+        )
+        await db.update_tasks_status(
+            [t.id for t in tasks], "completed", db.timestamp(completed_at)
+        )
+        return tasks
+
+    return insert
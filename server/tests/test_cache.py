@@ -0,0 +1,147 @@
+import asyncio
+import sqlite3
+
+import db
+import pytest
+from resources.cache import ResourceCache, resource_cache
+from resources.resources import get_all_tasks, get_pending_tasks, get_tasks_page
+from tools.tools import add_tool, complete_task
+
+
+@pytest.fixture(autouse=True)
+async def reset_state():
+    """Clears all tasks and runs each test with the pool (and cache) active."""
+    await db.init_db()
+    await db.clear_tasks()
+    await db.open_pool(size=2)
+    resource_cache.clear()
+    yield
+    await db.close_pool()
+    await db.clear_tasks()
+
+
+def render_counter():
+    calls = []
+
+    async def render():
+        calls.append(1)
+        return f"render {len(calls)}"
+
+    return calls, render
+
+
+# ---------------------------------------------------------------------------
+# ResourceCache
+# ---------------------------------------------------------------------------
+
+
+class TestResourceCache:
+    @pytest.mark.anyio
+    async def test_segunda_leitura_e_hit(self):
+        cache = ResourceCache()
+        calls, render = render_counter()
+
+        first = await cache.get_or_render("k", render)
+        second = await cache.get_or_render("k", render)
+
+        assert first == second == "render 1"
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    @pytest.mark.anyio
+    async def test_escrita_invalida(self):
+        cache = ResourceCache()
+        calls, render = render_counter()
+
+        await cache.get_or_render("k", render)
+        await add_tool("Nova")
+        result = await cache.get_or_render("k", render)
+
+        assert result == "render 2"
+
+    @pytest.mark.anyio
+    async def test_escrita_de_outro_processo_invalida(self):
+        cache = ResourceCache()
+        calls, render = render_counter()
+        await cache.get_or_render("k", render)
+
+        def external_write():
+            conn = sqlite3.connect(db.DB_PATH)
+            conn.execute("INSERT INTO tasks (title, created_at) VALUES ('x', 'now')")
+            conn.commit()
+            conn.close()
+
+        await asyncio.to_thread(external_write)
+        result = await cache.get_or_render("k", render)
+
+        assert result == "render 2"
+
+    @pytest.mark.anyio
+    async def test_lru_descarta_a_menos_usada(self):
+        cache = ResourceCache(maxsize=2)
+        calls, render = render_counter()
+
+        await cache.get_or_render("a", render)
+        await cache.get_or_render("b", render)
+        await cache.get_or_render("a", render)
+        await cache.get_or_render("c", render)
+
+        assert len(cache) == 2
+        await cache.get_or_render("a", render)
+        assert cache.hits == 2
+        await cache.get_or_render("b", render)
+        assert len(calls) == 4
+
+    @pytest.mark.anyio
+    async def test_sem_pool_nao_guarda(self):
+        await db.close_pool()
+        cache = ResourceCache()
+        calls, render = render_counter()
+
+        await cache.get_or_render("k", render)
+        await cache.get_or_render("k", render)
+
+        assert len(calls) == 2
+        assert len(cache) == 0
+
+    @pytest.mark.anyio
+    async def test_tamanho_invalido(self):
+        with pytest.raises(ValueError):
+            ResourceCache(maxsize=0)
+
+
+# ---------------------------------------------------------------------------
+# cached resources
+# ---------------------------------------------------------------------------
+
+
+class TestCachedResources:
+    @pytest.mark.anyio
+    async def test_leituras_repetidas_vem_do_cache(self):
+        await add_tool("Tarefa")
+
+        first = await get_all_tasks()
+        second = await get_all_tasks()
+
+        assert first == second
+        assert resource_cache.hits == 1
+
+    @pytest.mark.anyio
+    async def test_nunca_serve_lista_desatualizada(self):
+        task = await add_tool("Tarefa")
+        assert "Tarefa" in await get_pending_tasks()
+
+        await complete_task(task["id"])
+
+        assert "No pending tasks" in await get_pending_tasks()
+        assert "✅" in await get_all_tasks()
+
+    @pytest.mark.anyio
+    async def test_paginas_tem_chaves_proprias(self):
+        await add_tool("A")
+        await add_tool("B")
+
+        first = await get_tasks_page(limit=1)
+        second = await get_tasks_page(cursor=1, limit=1)
+
+        assert "A" in first and "B" not in first
+        assert "B" in second
@@ -0,0 +1,1306 @@
+import asyncio
+import sqlite3
+
+import db
+import pytest
+
+# ---------------------------------------------------------------------------
+# ConnectionPool
+# ---------------------------------------------------------------------------
+
+
+class TestConnectionPool:
+    def test_tamanho_invalido(self):
+        with pytest.raises(ValueError):
+            db.ConnectionPool(db.DB_PATH, size=0)
+
+    @pytest.mark.anyio
+    async def test_reutiliza_conexoes(self):
+        pool = db.ConnectionPool(db.DB_PATH, size=1)
+        await pool.open()
+        try:
+            async with pool.acquire() as first:
+                pass
+            async with pool.acquire() as second:
+                pass
+            assert first is second
+        finally:
+            await pool.close()
+
+    @pytest.mark.anyio
+    async def test_acquire_sem_abrir_falha(self):
+        pool = db.ConnectionPool(db.DB_PATH, size=1)
+
+        with pytest.raises(RuntimeError):
+            async with pool.acquire():
+                pass
+
+    @pytest.mark.anyio
+    async def test_substitui_conexao_fechada(self):
+        pool = db.ConnectionPool(db.DB_PATH, size=1)
+        await pool.open()
+        try:
+            async with pool.acquire() as conn:
+                await conn.close()
+            async with pool.acquire() as replacement:
+                async with replacement.execute("SELECT 1") as cur:
+                    assert await cur.fetchone() == (1,)
+            assert replacement is not conn
+        finally:
+            await pool.close()
+
+    @pytest.mark.anyio
+    async def test_health_check_substitui_conexao_quebrada(self):
+        pool = db.ConnectionPool(db.DB_PATH, size=2)
+        await pool.open()
+        try:
+            async with pool.acquire() as conn:
+                await conn._execute(conn._connection.close)
+
+            assert await pool.health_check() == 1
+            assert await pool.health_check() == 0
+        finally:
+            await pool.close()
+
+    @pytest.mark.anyio
+    async def test_conexao_quebrada_em_erro_e_substituida(self):
+        pool = db.ConnectionPool(db.DB_PATH, size=1)
+        await pool.open()
+        try:
+            with pytest.raises(sqlite3.ProgrammingError):
+                async with pool.acquire() as conn:
+                    await conn._execute(conn._connection.close)
+                    await conn.execute("SELECT 1")
+            async with pool.acquire() as replacement:
+                async with replacement.execute("SELECT 1") as cur:
+                    assert await cur.fetchone() == (1,)
+            assert replacement is not conn
+            assert await pool.health_check() == 0
+        finally:
+            await pool.close()
+
+    @pytest.mark.anyio
+    async def test_rollback_em_erro(self):
+        pool = db.ConnectionPool(db.DB_PATH, size=1)
+        await pool.open()
+        try:
+            with pytest.raises(RuntimeError):
+                async with pool.acquire() as conn:
+                    await conn.execute(
+                        "INSERT INTO tasks (title, created_at) VALUES ('x', 'now')"
+                    )
+                    raise RuntimeError("boom")
+            async with pool.acquire() as conn:
+                assert not conn.in_transaction
+        finally:
+            await pool.close()
+        assert await db.fetch_all_tasks() == []
+
+    @pytest.mark.anyio
+    async def test_close_espera_conexoes_emprestadas(self):
+        pool = db.ConnectionPool(db.DB_PATH, size=1)
+        await pool.open()
+        released = asyncio.Event()
+
+        async def borrow():
+            async with pool.acquire():
+                await released.wait()
+
+        borrower = asyncio.create_task(borrow())
+        await asyncio.sleep(0)
+        closing = asyncio.create_task(pool.close())
+        await asyncio.sleep(0.01)
+        assert not closing.done()
+
+        released.set()
+        await borrower
+        await closing
+        assert not pool.is_open
+
+
+# ---------------------------------------------------------------------------
+# db functions through the shared pool
+# ---------------------------------------------------------------------------
+
+
+class TestSharedPool:
+    @pytest.mark.anyio
+    async def test_open_pool_idempotente(self):
+        first = await db.open_pool(size=2)
+        second = await db.open_pool(size=2)
+
+        assert first is second
+
+    @pytest.mark.anyio
+    async def test_funcoes_usam_o_pool(self):
+        await db.open_pool(size=1)
+
+        task = await db.insert_task("Pool", "", "2026-01-01T00:00:00")
+        await db.update_task_status(task.id, "completed", "2026-01-02T00:00:00")
+        tasks = await db.fetch_all_tasks()
+
+        assert [t.status for t in tasks] == ["completed"]
+
+    @pytest.mark.anyio
+    async def test_close_pool_volta_para_conexao_avulsa(self):
+        await db.open_pool(size=1)
+        await db.close_pool()
+
+        task = await db.insert_task("Sem pool", "", "2026-01-01T00:00:00")
+
+        assert task.id == 1
+
+
+# ---------------------------------------------------------------------------
+# GroupCommitWriter
+# ---------------------------------------------------------------------------
+
+
+class TestGroupCommitWriter:
+    @pytest.fixture
+    async def writer(self):
+        await db.open_pool(size=2)
+        writer = await db.start_writer(max_batch=64, max_wait_ms=5)
+        yield writer
+        await db.stop_writer()
+
+    @pytest.mark.anyio
+    async def test_ativa_wal(self, writer):
+        async with db._connection() as conn:
+            async with conn.execute("PRAGMA journal_mode") as cur:
+                assert (await cur.fetchone())[0] == "wal"
+
+    @pytest.mark.anyio
+    async def test_agrupa_escritas_concorrentes(self, writer):
+        tasks = await asyncio.gather(
+            *(db.insert_task(f"T{i}", "", "2026-01-01T00:00:00") for i in range(50))
+        )
+
+        assert sorted(t.id for t in tasks) == list(range(1, 51))
+        assert writer.commits < 50
+        assert len(await db.fetch_all_tasks()) == 50
+
+    @pytest.mark.anyio
+    async def test_respeita_max_batch(self):
+        await db.open_pool(size=1)
+        writer = await db.start_writer(max_batch=10, max_wait_ms=50)
+        try:
+            await asyncio.gather(
+                *(db.insert_task(f"T{i}", "", "2026-01-01T00:00:00") for i in range(30))
+            )
+            assert writer.commits >= 3
+        finally:
+            await db.stop_writer()
+
+    @pytest.mark.anyio
+    async def test_erro_isolado_por_operacao(self, writer):
+        ok, failed, updated = await asyncio.gather(
+            db.insert_task("Boa", "", "2026-01-01T00:00:00"),
+            db.insert_task(None, "", "2026-01-01T00:00:00"),
+            db.update_task_status(999, "completed", "2026-01-02T00:00:00"),
+            return_exceptions=True,
+        )
+
+        assert ok.title == "Boa"
+        assert isinstance(failed, Exception)
+        assert updated is None
+        assert [t.title for t in await db.fetch_all_tasks()] == ["Boa"]
+
+    @pytest.mark.anyio
+    async def test_leitores_nao_esperam_o_writer(self, writer):
+        release = asyncio.Event()
+
+        async def slow_op(conn):
+            await conn.execute(
+                "INSERT INTO tasks (title, created_at) VALUES ('lenta', 'now')"
+            )
+            await release.wait()
+
+        pending = asyncio.create_task(writer.submit(slow_op))
+        await asyncio.sleep(0.02)
+
+        assert await asyncio.wait_for(db.fetch_all_tasks(), timeout=1) == []
+
+        release.set()
+        await pending
+        assert len(await db.fetch_all_tasks()) == 1
+
+    @pytest.mark.anyio
+    async def test_stop_confirma_fila_pendente(self):
+        await db.open_pool(size=1)
+        await db.start_writer(max_batch=4, max_wait_ms=1)
+        inserts = [
+            asyncio.create_task(db.insert_task(f"T{i}", "", "2026-01-01T00:00:00"))
+            for i in range(10)
+        ]
+        await asyncio.sleep(0)
+        await db.stop_writer()
+
+        assert len(await asyncio.gather(*inserts)) == 10
+        assert len(await db.fetch_all_tasks()) == 10
+
+
+# ---------------------------------------------------------------------------
+# Writes: one RETURNING statement each
+# ---------------------------------------------------------------------------
+
+
+class TestWriteReturning:
+    @pytest.fixture(params=["direct", "group"])
+    async def mode(self, request):
+        await db.open_pool(size=4)
+        if request.param == "group":
+            await db.start_writer()
+        yield request.param
+        await db.stop_writer()
+
+    @pytest.mark.anyio
+    async def test_completar_e_remover_ao_mesmo_tempo(self, mode):
+        for _ in range(30):
+            task = await db.insert_task("Corrida", "", db.timestamp())
+
+            completed, deleted = await asyncio.gather(
+                db.update_task_status(task.id, "completed", db.timestamp()),
+                db.remove_task(task.id),
+            )
+
+            # The delete returns the row it removed, completed or not
+            assert deleted is not None
+            if completed is not None:
+                assert deleted.status == "completed"
+                assert deleted.completed_at == completed.completed_at
+
+        stats = await db.fetch_task_stats()
+        assert await db.fetch_all_tasks() == []
+        assert stats["total"] == 0
+
+    @pytest.mark.anyio
+    async def test_remocoes_concorrentes_removem_uma_vez(self, mode):
+        task = await db.insert_task("Disputada", "", db.timestamp())
+
+        results = await asyncio.gather(*(db.remove_task(task.id) for _ in range(5)))
+
+        assert [r.id for r in results if r is not None] == [task.id]
+
+    @pytest.mark.anyio
+    async def test_lote_devolve_na_ordem_dos_itens(self):
+        items = [(f"T{i}", f"d{i}") for i in range(300)]
+
+        tasks = await db.insert_tasks(items, "2026-01-01T00:00:00")
+
+        assert [(t.title, t.description) for t in tasks] == items
+        assert [t.id for t in tasks] == list(range(1, 301))
+        assert tasks == await db.fetch_all_tasks()
+
+    @pytest.mark.anyio
+    async def test_lote_com_ids_repetidos_e_ausentes(self):
+        a, b = await db.insert_tasks([("A", ""), ("B", "")], db.timestamp())
+
+        updated = await db.update_tasks_status([b.id, 99, b.id], "completed")
+        deleted = await db.remove_tasks([a.id, a.id, 99])
+
+        assert [t and t.id for t in updated] == [b.id, None, b.id]
+        assert [t and t.id for t in deleted] == [a.id, None, None]
+
+
+# ---------------------------------------------------------------------------
+# query_tasks: filters are index lookups
+# ---------------------------------------------------------------------------
+
+
+async def query_plan(sql: str, params) -> str:
+    async with db._connection() as conn:
+        async with conn.execute("EXPLAIN QUERY PLAN " + sql, params) as cur:
+            return "\n".join(row[3] for row in await cur.fetchall())
+
+
+class TestQueryPlans:
+    @pytest.mark.anyio
+    async def test_pendentes_usam_indice_de_status(self):
+        plan = await query_plan(*db._build_task_query(status="pending"))
+
+        assert "USING INDEX idx_tasks_status_created (status=?)" in plan
+        assert "SCAN tasks" not in plan
+
+    @pytest.mark.anyio
+    async def test_janela_de_criacao_usa_indice(self):
+        plan = await query_plan(
+            *db._build_task_query(created_range=("2026-01-01", "2026-02-01"))
+        )
+
+        assert "USING INDEX idx_tasks_created (created_at>? AND created_at<?)" in plan
+        assert "SCAN tasks" not in plan
+
+    @pytest.mark.anyio
+    async def test_janela_de_conclusao_usa_indice(self):
+        plan = await query_plan(
+            *db._build_task_query(completed_range=("2026-01-01", "2026-02-01"))
+        )
+
+        assert "USING INDEX idx_tasks_completed" in plan
+        assert "SCAN tasks" not in plan
+
+    @pytest.mark.anyio
+    async def test_status_e_janela_usam_indice_composto(self):
+        plan = await query_plan(
+            *db._build_task_query(
+                status="pending", created_range=("2026-01-01", "2026-02-01")
+            )
+        )
+
+        assert (
+            "idx_tasks_status_created (status=? AND created_at>? AND created_at<?)"
+            in plan
+        )
+
+    @pytest.mark.anyio
+    async def test_pendentes_por_data_dispensam_ordenacao(self):
+        plan = await query_plan(
+            *db._build_task_query(status="pending", order_by="created_at", limit=10)
+        )
+
+        assert "TEMP B-TREE" not in plan
+
+    def test_ordenacao_invalida(self):
+        with pytest.raises(ValueError):
+            db._build_task_query(order_by="title; DROP TABLE tasks")
+
+
+# ---------------------------------------------------------------------------
+# fetch_next_tasks / fetch_overdue_tasks: top-k from the priority index
+# ---------------------------------------------------------------------------
+
+
+async def seed_urgent() -> dict[str, db.Task]:
+    tasks = await db.insert_tasks(
+        [
+            ("sem prazo", "", 3, None),
+            ("urgente amanha", "", 3, "2026-03-02T00:00:00.000000"),
+            ("urgente hoje", "", 3, "2026-03-01T00:00:00.000000"),
+            ("alta", "", 2, "2026-01-01T00:00:00.000000"),
+            ("normal", "", db.DEFAULT_PRIORITY, None),
+            ("feita", "", 3, "2026-01-01T00:00:00.000000"),
+        ],
+        db.timestamp(),
+    )
+    by_title = {task.title: task for task in tasks}
+    await db.update_task_status(by_title["feita"].id, "completed", db.timestamp())
+    return by_title
+
+
+class TestNextTasks:
+    @pytest.mark.anyio
+    async def test_prioridade_depois_prazo_sem_prazo_por_ultimo(self):
+        await seed_urgent()
+
+        tasks = await db.fetch_next_tasks(10)
+
+        assert [t.title for t in tasks] == [
+            "urgente hoje",
+            "urgente amanha",
+            "sem prazo",
+            "alta",
+            "normal",
+        ]
+
+    @pytest.mark.anyio
+    async def test_limite(self):
+        await seed_urgent()
+
+        assert [t.title for t in await db.fetch_next_tasks(2)] == [
+            "urgente hoje",
+            "urgente amanha",
+        ]
+
+    @pytest.mark.anyio
+    async def test_atrasadas(self):
+        await seed_urgent()
+
+        overdue = await db.fetch_overdue_tasks("2026-03-01T12:00:00.000000")
+
+        assert [t.title for t in overdue] == ["urgente hoje", "alta"]
+
+    @pytest.mark.anyio
+    async def test_lote_sem_prioridade_usa_o_padrao(self):
+        (task,) = await db.insert_tasks([("t", "")], db.timestamp())
+
+        assert (task.priority, task.due_at) == (db.DEFAULT_PRIORITY, None)
+
+    @pytest.mark.anyio
+    @pytest.mark.parametrize(
+        "sql, params",
+        [
+            (db.SELECT_NEXT_TASKS, {"limit": 10}),
+            (db.SELECT_OVERDUE_TASKS, {"now": "2026-01-01", "limit": 10}),
+        ],
+    )
+    async def test_cada_nivel_e_uma_busca_no_indice(self, sql, params):
+        plan = await query_plan(sql, params)
+
+        assert "SCAN tasks" not in plan
+        assert (
+            plan.count(
+                "SEARCH tasks USING INDEX idx_tasks_status_priority_due"
+                " (status=? AND priority=?"
+            )
+            == sql.count("UNION ALL") + 1
+        )
+
+    @pytest.mark.parametrize("priority", [-1, 4, "alta", 1.5])
+    def test_prioridade_invalida(self, priority):
+        with pytest.raises(ValueError, match="Priority must be one of"):
+            db.check_priority(priority)
+
+    @pytest.mark.parametrize("priority", [True, False])
+    def test_booleano_nao_e_prioridade(self, priority):
+        with pytest.raises(ValueError, match="Priority must be one of"):
+            db.check_priority(priority)
+
+
+class TestTimestamp:
+    def test_largura_fixa(self):
+        assert db.timestamp("2026-01-01") == "2026-01-01T00:00:00.000000"
+        assert db.timestamp("2026-01-01T10:00:00.5") == "2026-01-01T10:00:00.500000"
+
+    def test_formato_invalido(self):
+        with pytest.raises(ValueError):
+            db.timestamp("ontem")
+
+
+# ---------------------------------------------------------------------------
+# migrations
+# ---------------------------------------------------------------------------
+
+
+@pytest.fixture
+def fresh_db(tmp_path, monkeypatch):
+    path = str(tmp_path / "fresh.db")
+    monkeypatch.setattr(db, "DB_PATH", path)
+    return path
+
+
+class TestMigrations:
+    @pytest.mark.anyio
+    async def test_banco_novo_chega_na_ultima_versao(self, fresh_db):
+        await db.init_db()
+
+        async with db._connection() as conn:
+            assert await db.schema_version(conn) == db.MIGRATIONS[-1][0]
+            async with conn.execute("PRAGMA auto_vacuum") as cur:
+                assert await cur.fetchone() == (2,)
+
+    @pytest.mark.anyio
+    async def test_versoes_em_ordem_crescente(self):
+        versions = [version for version, _ in db.MIGRATIONS]
+
+        assert versions == sorted(set(versions))
+
+    @pytest.mark.anyio
+    async def test_reaplicar_nao_faz_nada(self, fresh_db):
+        async with db._connection() as conn:
+            first = await db.migrate(conn)
+            second = await db.migrate(conn)
+
+        assert first == second
+
+    @pytest.mark.anyio
+    async def test_banco_antigo_mantem_as_linhas(self, fresh_db):
+        legacy = sqlite3.connect(fresh_db)
+        legacy.execute(
+            "CREATE TABLE tasks(id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " title TEXT NOT NULL, description TEXT DEFAULT '',"
+            " status TEXT DEFAULT 'pending', created_at TEXT NOT NULL,"
+            " completed_at TEXT)"
+        )
+        legacy.execute("INSERT INTO tasks (title, created_at) VALUES ('antiga', 'x')")
+        legacy.commit()
+        legacy.close()
+
+        await db.init_db()
+
+        (task,) = await db.fetch_all_tasks()
+        assert (task.title, task.priority, task.due_at) == (
+            "antiga",
+            db.DEFAULT_PRIORITY,
+            None,
+        )
+
+    @pytest.mark.anyio
+    async def test_nova_migracao_altera_sem_recriar(self, fresh_db, monkeypatch):
+        await db.init_db()
+        await db.insert_task("existente", "", "2026-01-01T00:00:00.000000")
+        next_version = db.MIGRATIONS[-1][0] + 1
+        monkeypatch.setattr(
+            db,
+            "MIGRATIONS",
+            [
+                *db.MIGRATIONS,
+                (next_version, ("ALTER TABLE tasks ADD COLUMN notes TEXT",)),
+            ],
+        )
+
+        async with db._connection() as conn:
+            assert await db.migrate(conn) == next_version
+
+        async with db._connection() as conn:
+            async with conn.execute("SELECT title, notes FROM tasks") as cur:
+                assert await cur.fetchall() == [("existente", None)]
+
+    @pytest.mark.anyio
+    async def test_migracao_com_erro_nao_avanca_versao(self, fresh_db, monkeypatch):
+        await db.init_db()
+        current = db.MIGRATIONS[-1][0]
+        monkeypatch.setattr(
+            db,
+            "MIGRATIONS",
+            [
+                *db.MIGRATIONS,
+                (current + 1, ("ALTER TABLE tasks ADD COLUMN ok TEXT", "INVALID SQL")),
+            ],
+        )
+
+        async with db._connection() as conn:
+            with pytest.raises(sqlite3.OperationalError):
+                await db.migrate(conn)
+            assert await db.schema_version(conn) == current
+
+
+# ---------------------------------------------------------------------------
+# change_version: the persisted write counter
+# ---------------------------------------------------------------------------
+
+
+class TestChangeVersion:
+    @pytest.mark.anyio
+    async def test_um_passo_por_escrita(self):
+        before = await db.change_version()
+
+        await db.insert_tasks([(f"T{i}", "") for i in range(100)], db.timestamp())
+        await db.remove_tasks(list(range(1, 51)))
+
+        assert await db.change_version() == before + 2
+
+    @pytest.mark.anyio
+    async def test_escrita_em_grupo_conta_cada_operacao(self):
+        await db.open_pool(size=2)
+        await db.start_writer(max_batch=64, max_wait_ms=5)
+        before = await db.change_version()
+        try:
+            await asyncio.gather(
+                *(db.insert_task(f"T{i}", "", db.timestamp()) for i in range(10))
+            )
+        finally:
+            await db.stop_writer()
+
+        assert await db.change_version() == before + 10
+
+    @pytest.mark.anyio
+    async def test_sobrevive_ao_reabrir_o_banco(self, fresh_db):
+        await db.init_db()
+        await db.insert_task("A", "", db.timestamp())
+        version = await db.change_version()
+        db._migrated.discard(fresh_db)
+
+        await db.init_db()
+
+        assert await db.change_version() == version
+
+
+# ---------------------------------------------------------------------------
+# Task statistics
+# ---------------------------------------------------------------------------
+
+
+async def scan_stats() -> dict:
+    """The statistics recomputed the slow way, from every task row"""
+    tasks = await db.fetch_all_tasks()
+    by_status: dict[str, int] = {}
+    per_day: dict[str, int] = {}
+    for task in tasks:
+        by_status[task.status] = by_status.get(task.status, 0) + 1
+        if task.status == "completed":
+            day = task.completed_at[:10]
+            per_day[day] = per_day.get(day, 0) + 1
+    return {
+        "by_status": by_status,
+        "completions_per_day": dict(sorted(per_day.items())),
+    }
+
+
+class TestTaskStats:
+    @pytest.mark.anyio
+    async def test_vazio(self):
+        stats = await db.fetch_task_stats()
+
+        assert stats == {
+            "total": 0,
+            "by_status": {},
+            "completions_per_day": {},
+            "median_seconds_to_complete": None,
+        }
+
+    @pytest.mark.anyio
+    async def test_contadores_acompanham_inserts_updates_e_deletes(self):
+        created = db.timestamp("2026-03-01T08:00:00")
+        tasks = await db.insert_tasks([(f"t{i}", "") for i in range(6)], created)
+        ids = [t.id for t in tasks]
+        await db.update_tasks_status(
+            ids[:3], "completed", db.timestamp("2026-03-01T08:00:30")
+        )
+        await db.update_task_status(
+            ids[3], "completed", db.timestamp("2026-03-02T09:00:00")
+        )
+        # Reopened and completed again: only the last completion counts
+        await db.update_task_status(ids[0], "pending")
+        await db.update_task_status(
+            ids[0], "completed", db.timestamp("2026-03-03T08:00:00")
+        )
+        await db.remove_tasks([ids[1], ids[4]])
+
+        stats = await db.fetch_task_stats()
+
+        expected = await scan_stats()
+        assert (
+            stats["by_status"]
+            == expected["by_status"]
+            == {
+                "completed": 3,
+                "pending": 1,
+            }
+        )
+        assert stats["completions_per_day"] == expected["completions_per_day"]
+        assert stats["total"] == 4
+
+    @pytest.mark.anyio
+    async def test_mediana_aproximada(self):
+        created = "2026-03-01T00:00:00"
+        for seconds in ("00:00:05", "00:00:37", "02:00:00"):
+            task = await db.insert_task("t", "", db.timestamp(created))
+            await db.update_task_status(
+                task.id, "completed", db.timestamp(f"2026-03-01T{seconds}")
+            )
+
+        stats = await db.fetch_task_stats()
+
+        # 37s falls in the [30s, 40s) bucket
+        assert 30 <= stats["median_seconds_to_complete"] < 40
+
+    @pytest.mark.anyio
+    async def test_limita_dias(self):
+        for day in range(1, 6):
+            task = await db.insert_task("t", "", db.timestamp("2026-03-01T00:00:00"))
+            await db.update_task_status(
+                task.id, "completed", db.timestamp(f"2026-03-0{day}T12:00:00")
+            )
+
+        stats = await db.fetch_task_stats(days=2)
+
+        assert list(stats["completions_per_day"]) == ["2026-03-04", "2026-03-05"]
+
+    @pytest.mark.anyio
+    async def test_clear_zera_contadores(self):
+        task = await db.insert_task("t", "", db.timestamp())
+        await db.update_task_status(task.id, "completed", db.timestamp())
+
+        await db.clear_tasks()
+
+        assert (await db.fetch_task_stats())["total"] == 0
+
+    @pytest.mark.anyio
+    async def test_migracao_preenche_com_linhas_existentes(self, fresh_db):
+        legacy = sqlite3.connect(fresh_db)
+        legacy.execute(
+            "CREATE TABLE tasks(id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " title TEXT NOT NULL, description TEXT DEFAULT '',"
+            " status TEXT DEFAULT 'pending', created_at TEXT NOT NULL,"
+            " completed_at TEXT)"
+        )
+        legacy.executemany(
+            "INSERT INTO tasks (title, status, created_at, completed_at)"
+            " VALUES (?, ?, ?, ?)",
+            [
+                ("a", "pending", "2026-03-01T00:00:00.000000", None),
+                (
+                    "b",
+                    "completed",
+                    "2026-03-01T00:00:00.000000",
+                    "2026-03-01T00:01:00.000000",
+                ),
+            ],
+        )
+        legacy.commit()
+        legacy.close()
+
+        await db.init_db()
+        stats = await db.fetch_task_stats()
+
+        assert stats["by_status"] == {"completed": 1, "pending": 1}
+        assert stats["completions_per_day"] == {"2026-03-01": 1}
+        assert 60 <= stats["median_seconds_to_complete"] < 70
+
+    def test_mediana_do_histograma(self):
+        # Buckets 15 = [5s, 6s), 23 = [30s, 40s), 41 = [1000s, 2000s)
+        assert db.median_seconds([(15, 1), (23, 2), (41, 1)]) == 35.0
+        assert db.median_seconds([(23, 1)]) == 35.0
+        assert db.median_seconds([]) is None
+
+
+# ---------------------------------------------------------------------------
+# Full-text search
+# ---------------------------------------------------------------------------
+
+
+class TestSearchTasks:
+    @pytest.mark.anyio
+    async def test_indice_acompanha_edicao_do_titulo(self):
+        task = await db.insert_task("rascunho", "", db.timestamp())
+        async with db._connection() as conn:
+            await conn.execute(
+                "UPDATE tasks SET title = 'definitivo' WHERE id = ?", (task.id,)
+            )
+            await conn.commit()
+
+        assert await db.search_tasks("rascunho") == []
+        assert [h.task.id for h in await db.search_tasks("definitivo")] == [task.id]
+
+    @pytest.mark.anyio
+    async def test_usa_indice_fts(self):
+        plan = await query_plan(
+            "SELECT t.* FROM tasks_fts"
+            " JOIN tasks t ON t.id = tasks_fts.rowid WHERE tasks_fts MATCH ?",
+            ['"x"'],
+        )
+
+        assert "VIRTUAL TABLE INDEX" in plan
+        assert "SEARCH t USING INTEGER PRIMARY KEY" in plan
+
+    @pytest.mark.anyio
+    async def test_migracao_indexa_linhas_existentes(self, fresh_db):
+        legacy = sqlite3.connect(fresh_db)
+        legacy.execute(
+            "CREATE TABLE tasks(id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " title TEXT NOT NULL, description TEXT DEFAULT '',"
+            " status TEXT DEFAULT 'pending', created_at TEXT NOT NULL,"
+            " completed_at TEXT)"
+        )
+        legacy.execute(
+            "INSERT INTO tasks (title, description, created_at)"
+            " VALUES ('antiga', 'texto legado', 'x')"
+        )
+        legacy.commit()
+        legacy.close()
+
+        await db.init_db()
+
+        assert [h.task.title for h in await db.search_tasks("legado")] == ["antiga"]
+
+    def test_expressao_de_busca(self):
+        assert db._match_expression('foo "bar" ba*') == '"foo" """bar""" "ba"*'
+        assert db._match_expression(" * ") == ""
+
+
+# ---------------------------------------------------------------------------
+# Task model
+# ---------------------------------------------------------------------------
+
+
+class TestTaskModel:
+    def test_sem_dict_por_instancia(self):
+        task = db.Task(1, "t", "", "pending", "2026-01-01T00:00:00.000000")
+
+        assert not hasattr(task, "__dict__")
+
+    def test_colunas_na_ordem_dos_campos(self):
+        assert db.SELECT_TASKS == (
+            "SELECT id, title, description, status, created_at, completed_at,"
+            " priority, due_at FROM tasks"
+        )
+
+    @pytest.mark.anyio
+    async def test_leitura_igual_a_escrita(self):
+        created = await db.insert_task("t", "d", db.timestamp())
+
+        assert await db.fetch_all_tasks() == [created]
+        assert created.to_dict() == {
+            "id": created.id,
+            "title": "t",
+            "description": "d",
+            "status": "pending",
+            "created_at": created.created_at,
+            "completed_at": None,
+            "priority": db.DEFAULT_PRIORITY,
+            "due_at": None,
+        }
+
+    @pytest.mark.anyio
+    async def test_hit_de_busca_achata_em_dict(self):
+        await db.insert_task("relatório", "", db.timestamp())
+
+        (hit,) = await db.search_tasks("relatório")
+
+        data = hit.to_dict()
+        assert data["title"] == "relatório"
+        assert data["snippet"] == "**relatório**"
+        assert "rank" in data
+
+
+# ---------------------------------------------------------------------------
+# archive and vacuum
+# ---------------------------------------------------------------------------
+
+
+class TestArchiveTasks:
+    @pytest.mark.anyio
+    async def test_move_concluidas_antigas_em_lotes(
+        self, insert_completed, monkeypatch
+    ):
+        old = await insert_completed(7, "2026-01-01T09:00:00")
+        recent = await insert_completed(2, "2026-03-01T09:00:00")
+        pending = await db.insert_task("pendente", "", db.timestamp())
+        writes = []
+        write = db._write
+        monkeypatch.setattr(db, "_write", lambda op: writes.append(1) or write(op))
+
+        archived = await db.archive_tasks("2026-02-01", batch_size=3)
+
+        assert archived == 7
+        # 3 + 3 + 1 rows; the short batch ends the loop
+        assert len(writes) == 3
+        remaining = {t.id for t in await db.fetch_all_tasks()}
+        assert remaining == {t.id for t in recent} | {pending.id}
+        moved = await db.query_archived_tasks(order_by="id")
+        assert [t.id for t in moved] == [t.id for t in old]
+        assert moved[0].completed_at == db.timestamp("2026-01-01T09:00:00")
+
+    @pytest.mark.anyio
+    async def test_estatisticas_mantem_historico(self, insert_completed):
+        await insert_completed(4, "2026-01-01T09:00:00")
+        await insert_completed(1, "2026-03-01T09:00:00")
+        before = await db.fetch_task_stats()
+
+        await db.archive_tasks("2026-02-01")
+        stats = await db.fetch_task_stats()
+
+        assert stats["by_status"] == {"completed": 1, "archived": 4}
+        assert stats["total"] == 5
+        assert stats["completions_per_day"] == before["completions_per_day"]
+        assert (
+            stats["median_seconds_to_complete"] == before["median_seconds_to_complete"]
+        )
+
+    @pytest.mark.anyio
+    async def test_arquivadas_saem_da_busca(self, insert_completed):
+        await insert_completed(1, "2026-01-01T09:00:00")
+
+        await db.archive_tasks("2026-02-01")
+
+        assert await db.search_tasks("antiga") == []
+
+    @pytest.mark.anyio
+    async def test_limpar_arquivo_zera_contador(self, insert_completed):
+        await insert_completed(2, "2026-01-01T09:00:00")
+        await db.archive_tasks("2026-02-01")
+
+        await db.clear_tasks()
+
+        assert (await db.fetch_task_stats())["by_status"] == {}
+
+    @pytest.mark.anyio
+    async def test_vacuum_devolve_paginas(self, fresh_db):
+        await db.init_db()
+        await db.insert_tasks([("x" * 500, "y" * 500)] * 2000, db.timestamp())
+        await db.clear_tasks()
+
+        first = await db.vacuum()
+        await db.insert_tasks([("x" * 500, "y" * 500)] * 2000, db.timestamp())
+        await db.clear_tasks()
+        second = await db.vacuum(pages=10)
+
+        async with db._connection() as conn:
+            async with conn.execute("PRAGMA auto_vacuum") as cur:
+                assert (await cur.fetchone())[0] == 2
+        assert first > 0
+        assert second == 10
+
+    @pytest.mark.anyio
+    async def test_arquivo_antigo_so_com_vacuum_completo(self, fresh_db):
+        with sqlite3.connect(fresh_db) as conn:
+            conn.execute("CREATE TABLE legado (x)")
+        await db.init_db()
+        await db.insert_tasks([("x" * 500, "y" * 500)] * 2000, db.timestamp())
+        await db.clear_tasks()
+
+        assert await db.vacuum() == 0
+        assert await db.vacuum(full=True) > 0
+
+        async with db._connection() as conn:
+            async with conn.execute("PRAGMA auto_vacuum") as cur:
+                assert (await cur.fetchone())[0] == 2
+
+
+# ---------------------------------------------------------------------------
+# per-project databases
+# ---------------------------------------------------------------------------
+
+
+class TestProjects:
+    @pytest.mark.parametrize("name", ["", "-x", "a/b", "../x", "x" * 65, "a b"])
+    def test_nome_invalido(self, name):
+        with pytest.raises(ValueError):
+            with db.use_project(name):
+                pass
+
+    @pytest.mark.anyio
+    async def test_cada_projeto_em_seu_arquivo(self, projects_dir):
+        await db.insert_task("padrão", "", db.timestamp())
+        with db.use_project("alpha"):
+            await db.insert_task("alpha 1", "", db.timestamp())
+            await db.insert_task("alpha 2", "", db.timestamp())
+            alpha = await db.fetch_all_tasks()
+
+        assert [t.title for t in alpha] == ["alpha 1", "alpha 2"]
+        assert [t.title for t in await db.fetch_all_tasks()] == ["padrão"]
+        assert (projects_dir / "alpha.db").exists()
+        assert db.list_projects() == ["default", "alpha"]
+
+    @pytest.mark.anyio
+    async def test_escrita_em_projeto_nao_avisa_ouvintes(
+        self, projects_dir, monkeypatch
+    ):
+        calls = []
+        monkeypatch.setattr(db, "_write_listeners", [lambda: calls.append(1)])
+
+        with db.use_project("alpha"):
+            await db.insert_task("t", "", db.timestamp())
+
+        assert calls == []
+
+    @pytest.mark.anyio
+    async def test_lru_fecha_projetos_ociosos(self, projects_dir):
+        for name in ("a", "b", "c"):
+            with db.use_project(name):
+                await db.insert_task(name, "", db.timestamp())
+
+        assert len(db._shards) == 2
+        assert "a" not in db._shards
+        assert db._shards.evicted == 1
+        # Reopened on demand, with its data intact
+        with db.use_project("a"):
+            assert [t.title for t in await db.fetch_all_tasks()] == ["a"]
+        assert "b" not in db._shards
+
+    @pytest.mark.anyio
+    async def test_projeto_em_uso_nao_e_fechado(self, projects_dir):
+        with db.use_project("a"):
+            async with db._connection() as conn:
+                for name in ("b", "c"):
+                    with db.use_project(name):
+                        await db.insert_task(name, "", db.timestamp())
+                async with conn.execute("SELECT count(*) FROM tasks") as cur:
+                    assert (await cur.fetchone())[0] == 0
+
+        assert "a" in db._shards
+        # Shrinks back once the busy shard is released
+        with db.use_project("c"):
+            await db.fetch_all_tasks()
+        assert len(db._shards) == 2
+
+    @pytest.mark.anyio
+    async def test_versao_por_projeto(self, projects_dir):
+        await db.open_pool()
+        default = await db.data_version()
+        with db.use_project("a"):
+            before = await db.data_version()
+            await db.insert_task("t", "", db.timestamp())
+            assert await db.data_version() != before
+
+        assert await db.data_version() == default
+
+    @pytest.mark.anyio
+    async def test_writer_em_grupo_por_projeto(self, projects_dir):
+        await db.start_writer()
+        try:
+            with db.use_project("a"):
+                await asyncio.gather(
+                    *(db.insert_task(f"t{i}", "", db.timestamp()) for i in range(10))
+                )
+                assert len(await db.fetch_all_tasks()) == 10
+                async with db._shards.use("a") as shard:
+                    assert shard.writer is not None
+                    assert shard.writer.commits < 10
+        finally:
+            await db.close_shards()
+            await db.stop_writer()
+
+
+class TestQueryProjects:
+    @pytest.mark.anyio
+    async def test_mescla_projetos_na_ordem_pedida(self, projects_dir):
+        await db.insert_task("m", "", db.timestamp("2026-03-02T00:00:00"))
+        for name, title, day in (("a", "z", "01"), ("b", "c", "03"), ("b", "a", "04")):
+            with db.use_project(name):
+                await db.insert_task(title, "", db.timestamp(f"2026-03-{day}T00:00"))
+
+        by_title = await db.query_projects(order_by="title")
+        newest = await db.query_projects(
+            order_by="created_at", descending=True, limit=2
+        )
+
+        assert [(p, t.title) for p, t in by_title] == [
+            ("b", "a"),
+            ("b", "c"),
+            ("default", "m"),
+            ("a", "z"),
+        ]
+        assert [(p, t.title) for p, t in newest] == [("b", "a"), ("b", "c")]
+
+    @pytest.mark.anyio
+    async def test_somente_projetos_pedidos(self, projects_dir):
+        for name in ("a", "b"):
+            with db.use_project(name):
+                await db.insert_task(name, "", db.timestamp())
+
+        rows = await db.query_projects(["b", "b"], status="pending")
+
+        assert [(p, t.title) for p, t in rows] == [("b", "b")]
+
+    @pytest.mark.anyio
+    async def test_consulta_projetos_em_paralelo(self, projects_dir, monkeypatch):
+        running = peak = 0
+        query = db.query_tasks
+
+        async def slow_query(**filters):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            try:
+                return await query(**filters)
+            finally:
+                running -= 1
+
+        monkeypatch.setattr(db, "query_tasks", slow_query)
+
+        await db.query_projects(["a", "b", "c"])
+
+        assert peak == 3
+
+
+# ---------------------------------------------------------------------------
+# export_tasks / import_tasks: NDJSON
+# ---------------------------------------------------------------------------
+
+
+async def export_lines() -> list[str]:
+    chunks = [chunk async for chunk in db.export_tasks(batch_size=2)]
+    return "".join(chunks).splitlines()
+
+
+ROW = '"id": 1, "title": "a", "created_at": "2026-01-01"'
+
+
+class TestExportImport:
+    @pytest.fixture(params=["direct", "group"])
+    async def mode(self, request):
+        await db.open_pool(size=4)
+        if request.param == "group":
+            await db.start_writer()
+        yield request.param
+        await db.stop_writer()
+
+    async def seed(self) -> list[db.Task]:
+        tasks = await db.insert_tasks(
+            [
+                ("Relatório", "trimestral", 3, "2026-02-01T00:00:00.000000"),
+                ("Linha\nquebrada", 'aspas "duplas"', 0, None),
+                ("Terceira", "", 1, None),
+            ],
+            "2026-01-01T08:00:00.000000",
+        )
+        await db.update_task_status(
+            tasks[0].id, "completed", "2026-01-01T09:00:00.000000"
+        )
+        return await db.fetch_all_tasks()
+
+    @pytest.mark.anyio
+    async def test_uma_linha_json_por_task(self, mode):
+        tasks = await self.seed()
+
+        lines = await export_lines()
+
+        assert [db.import_row(line) for line in lines] == [
+            tuple(task.to_dict().values()) for task in tasks
+        ]
+
+    @pytest.mark.anyio
+    async def test_ida_e_volta_mantem_ids_datas_stats_e_busca(self, mode):
+        await db.insert_tasks([("apagada", "")] * 5, db.timestamp())
+        await db.remove_tasks(list(range(1, 6)))
+        tasks = await self.seed()
+        stats = await db.fetch_task_stats(days=400)
+        lines = await export_lines()
+        await db.clear_tasks()
+
+        result = await db.import_tasks(lines, batch_size=2)
+
+        assert result == {"imported": 3, "skipped": 0}
+        assert await db.fetch_all_tasks() == tasks
+        assert await db.fetch_task_stats(days=400) == stats
+        assert [h.task.id for h in await db.search_tasks("trimestral")] == [tasks[0].id]
+
+    @pytest.mark.anyio
+    async def test_novas_tasks_seguem_os_ids_importados(self, mode):
+        await db.import_tasks(
+            ['{"id": 7, "title": "importada", "created_at": "2026-01-01"}']
+        )
+
+        task = await db.insert_task("nova", "", db.timestamp())
+
+        assert task.id == 8
+        assert (await db.fetch_task_stats())["by_status"] == {"pending": 2}
+        assert [h.task.id for h in await db.search_tasks("nova")] == [8]
+
+    @pytest.mark.anyio
+    async def test_reimportar_pula_ids_existentes(self, mode):
+        await self.seed()
+        lines = await export_lines()
+        before = await db.change_version()
+
+        result = await db.import_tasks(lines + lines[:1])
+
+        assert result == {"imported": 0, "skipped": 4}
+        assert len(await db.fetch_all_tasks()) == 3
+        assert await db.change_version() == before
+
+    @pytest.mark.anyio
+    async def test_ids_arquivados_tambem_sao_pulados(self):
+        tasks = await self.seed()
+        lines = await export_lines()
+        await db.archive_tasks("2026-02-01")
+        await db.remove_tasks([t.id for t in tasks])
+
+        result = await db.import_tasks(lines)
+
+        assert result == {"imported": 2, "skipped": 1}
+        archived = await db.query_archived_tasks()
+        assert [t.id for t in archived] == [tasks[0].id]
+
+    @pytest.mark.anyio
+    async def test_linha_invalida_para_depois_dos_lotes_anteriores(self):
+        await db.insert_task("existente", "", db.timestamp())
+        lines = [
+            '{"id": 2, "title": "a", "created_at": "2026-01-01"}',
+            "",
+            '{"id": 3, "title": "b", "created_at": "2026-01-01"}',
+            '{"id": 4, "title": "c", "created_at": "2026-01-01", "priority": 9}',
+        ]
+
+        with pytest.raises(ValueError, match="Line 4: Priority"):
+            await db.import_tasks(lines, batch_size=1)
+
+        assert [t.id for t in await db.fetch_all_tasks()] == [1, 2, 3]
+
+    @pytest.mark.anyio
+    async def test_projeto_vazio_importa_tudo_ou_nada(self, mode):
+        version = await db.change_version()
+        lines = [
+            '{"id": 1, "title": "a", "created_at": "2026-01-01"}',
+            '{"id": 2, "title": "b", "created_at": "2026-01-01", "priority": 9}',
+        ]
+
+        with pytest.raises(ValueError, match="Line 2: Priority"):
+            await db.import_tasks(lines, batch_size=1)
+
+        assert await db.fetch_all_tasks() == []
+        assert await db.change_version() == version
+        # The triggers are back on for the connection the import used
+        await db.insert_task("depois", "", db.timestamp())
+        assert (await db.fetch_task_stats())["by_status"] == {"pending": 1}
+
+    @pytest.mark.anyio
+    async def test_projeto_vazio_recalcula_stats_e_busca(self, mode):
+        tasks = await self.seed()
+        stats = await db.fetch_task_stats(days=400)
+        lines = await export_lines()
+        await db.clear_tasks()
+
+        await db.import_tasks(lines, batch_size=2)
+        await db.insert_task("depois", "", db.timestamp())
+
+        assert (await db.fetch_task_stats(days=400))["by_status"] == {
+            **stats["by_status"],
+            "pending": stats["by_status"]["pending"] + 1,
+        }
+        assert [h.task.id for h in await db.search_tasks("depois")] == [
+            tasks[-1].id + 1
+        ]
+
+    @pytest.mark.parametrize(
+        "line, message",
+        [
+            ("{", "Invalid JSON"),
+            ("[1, 2]", "Expected a JSON object"),
+            ('{"title": "a", "created_at": "x"}', "id must be a positive"),
+            ('{"id": true, "title": "a", "created_at": "x"}', "id must be"),
+            ('{"id": 1, "created_at": "x"}', "title must be a string"),
+            ('{"id": 1, "title": "a"}', "created_at must be a string"),
+            ('{"id": 1, "title": "a", "created_at": 5}', "created_at must be a string"),
+            ('{"id": 1, "title": "a", "created_at": "yesterday"}', "created_at must"),
+            (f'{{{ROW}, "due_at": 5}}', "due_at"),
+            (f'{{{ROW}, "due_at": "logo"}}', "due_at must"),
+            (f'{{{ROW}, "status": "archived"}}', "status"),
+            (
+                f'{{{ROW}, "status": "completed"}}',
+                "completed_at",
+            ),
+            (
+                f'{{{ROW}, "status": "completed", "completed_at": "None"}}',
+                "completed_at must be an ISO",
+            ),
+            (
+                f'{{{ROW}, "completed_at": "2026-01-02"}}',
+                "status",
+            ),
+            (f'{{{ROW}, "priority": "1"}}', "Priority"),
+            (f'{{{ROW}, "priority": true}}', "Priority"),
+            (
+                f'{{{ROW}, "due_at": "2026-02-30T00:00:00.000000"}}',
+                "due_at must be an ISO",
+            ),
+        ],
+    )
+    def test_linha_rejeitada(self, line, message):
+        with pytest.raises(ValueError, match=message):
+            db.import_row(line)
+
+    def test_datas_normalizadas(self):
+        row = db.import_row(
+            '{"id": 1, "title": "a", "status": "completed",'
+            ' "created_at": "2026-01-01", "completed_at": "2026-01-02T10:00",'
+            ' "due_at": "2026-W10-1T00:00:00.500000"}'
+        )
+
+        assert row[4:] == (
+            "2026-01-01T00:00:00.000000",
+            "2026-01-02T10:00:00.000000",
+            1,
+            "2026-03-02T00:00:00.500000",
+        )
+
+    @pytest.mark.anyio
+    async def test_linha_ruim_nao_entra_nos_filtros_nem_nas_stats(self):
+        await db.insert_task("existente", "", "2026-01-01T00:00:00.000000")
+        lines = [
+            '{"id": 2, "title": "a", "created_at": "2026-01-01"}',
+            '{"id": 3, "title": "b", "created_at": "yesterday"}',
+        ]
+
+        with pytest.raises(ValueError, match="Line 2: created_at"):
+            await db.import_tasks(lines, batch_size=1)
+
+        assert await db.query_tasks(created_range=("2026-01-02", None)) == []
+        assert (await db.fetch_task_stats())["by_status"] == {"pending": 2}
+
+    def test_lote_invalido(self):
+        with pytest.raises(ValueError, match="Batch size"):
+            next(db.import_batches([], 0))
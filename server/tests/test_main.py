@@ -1,18 +1,56 @@
 import asyncio
+import contextlib
+import json
+import sqlite3
 
 import db
 import pytest
-from resources.resources import get_all_tasks, get_pending_tasks
-from tools.tools import add_tool, complete_task, delete_task
+import storage
+import transfer
+from resources.resources import (
+    get_all_tasks,
+    get_all_tasks_json,
+    get_all_tasks_since,
+    get_overdue_tasks,
+    get_pending_tasks,
+    get_pending_tasks_json,
+    get_pending_tasks_since,
+    get_project_stats,
+    get_project_tasks,
+    get_task_stats,
+    get_task_stats_since,
+    get_tasks_page,
+)
+from tools.tools import (
+    add_tasks,
+    add_tool,
+    archived_tasks,
+    complete_task,
+    complete_tasks,
+    delete_task,
+    delete_tasks,
+    export_tasks,
+    import_tasks,
+    list_projects,
+    list_tasks,
+    next_tasks,
+    search_tasks,
+)
+
+
+@pytest.fixture(autouse=True, params=list(storage.BACKENDS))
+def reset_state(request):
+    """Runs each test on every storage backend, starting with no tasks."""
+    store = storage.use_backend(request.param)
+    asyncio.run(store.init_db())
+    asyncio.run(store.clear_tasks())
+    yield
+    asyncio.run(store.clear_tasks())
+    storage.use_backend(storage.STORAGE)
 
 
-@pytest.fixture(autouse=True)
-def reset_state():
-    """Initialises the DB and clears all tasks before each test."""
-    asyncio.run(db.init_db())
-    asyncio.run(db.clear_tasks())
-    yield
-    asyncio.run(db.clear_tasks())
+async def version() -> int:
+    return await storage.backend().change_version()
 
 
 # ---------------------------------------------------------------------------
@@ -21,8 +59,9 @@ def reset_state():
 
 
 class TestAddTool:
-    def test_retorna_campos_corretos(self):
-        task = add_tool("Comprar leite")
+    @pytest.mark.anyio
+    async def test_retorna_campos_corretos(self):
+        task = await add_tool("Comprar leite")
 
         assert task["id"] == 1
         assert task["title"] == "Comprar leite"
@@ -30,31 +69,58 @@ class TestAddTool:
         assert task["status"] == "pending"
         assert "created_at" in task
 
-    def test_aceita_descricao(self):
-        task = add_tool("Comprar leite", description="Leite integral 1L")
+    @pytest.mark.anyio
+    async def test_aceita_descricao(self):
+        task = await add_tool("Comprar leite", description="Leite integral 1L")
 
         assert task["description"] == "Leite integral 1L"
 
-    def test_incrementa_id(self):
-        first = add_tool("Primeira tarefa")
-        second = add_tool("Segunda tarefa")
+    @pytest.mark.anyio
+    async def test_incrementa_id(self):
+        first = await add_tool("Primeira tarefa")
+        second = await add_tool("Segunda tarefa")
 
         assert first["id"] == 1
         assert second["id"] == 2
 
-    def test_persiste_na_lista(self):
-        add_tool("Tarefa A")
-        add_tool("Tarefa B")
+    @pytest.mark.anyio
+    async def test_persiste_na_lista(self):
+        await add_tool("Tarefa A")
+        await add_tool("Tarefa B")
 
-        tasks = asyncio.run(db.fetch_all_tasks())
+        tasks = await storage.backend().fetch_all_tasks()
         assert len(tasks) == 2
 
-    def test_titulo_vazio(self):
-        task = add_tool("")
+    @pytest.mark.anyio
+    async def test_titulo_vazio(self):
+        task = await add_tool("")
 
         assert task["title"] == ""
         assert task["status"] == "pending"
 
+    @pytest.mark.anyio
+    async def test_prioridade_e_prazo(self):
+        task = await add_tool("Declarar IR", priority=3, due_at="2026-04-30")
+
+        assert task["priority"] == 3
+        assert task["due_at"] == "2026-04-30T00:00:00.000000"
+
+    @pytest.mark.anyio
+    async def test_prioridade_padrao(self):
+        task = await add_tool("Sem pressa")
+
+        assert (task["priority"], task["due_at"]) == (db.DEFAULT_PRIORITY, None)
+
+    @pytest.mark.anyio
+    @pytest.mark.parametrize(
+        "arguments", [{"priority": 7}, {"due_at": "amanhã"}], ids=["priority", "due"]
+    )
+    async def test_agendamento_invalido(self, arguments):
+        result = await add_tool("X", **arguments)
+
+        assert "error" in result
+        assert await storage.backend().fetch_all_tasks() == []
+
 
 # ---------------------------------------------------------------------------
 # complete_task
@@ -62,42 +128,47 @@ class TestAddTool:
 
 
 class TestCompleteTask:
-    def test_marca_como_completed(self):
-        task = add_tool("Terminar relatório")
+    @pytest.mark.anyio
+    async def test_marca_como_completed(self):
+        task = await add_tool("Terminar relatório")
 
-        result = complete_task(task["id"])
+        result = await complete_task(task["id"])
 
         assert result["status"] == "completed"
 
-    def test_adiciona_completed_at(self):
-        task = add_tool("Terminar relatório")
+    @pytest.mark.anyio
+    async def test_adiciona_completed_at(self):
+        task = await add_tool("Terminar relatório")
 
-        result = complete_task(task["id"])
+        result = await complete_task(task["id"])
 
         assert "completed_at" in result
 
-    def test_retorna_a_propria_task(self):
-        task = add_tool("Terminar relatório")
+    @pytest.mark.anyio
+    async def test_retorna_a_propria_task(self):
+        task = await add_tool("Terminar relatório")
 
-        result = complete_task(task["id"])
+        result = await complete_task(task["id"])
 
         assert result["id"] == task["id"]
         assert result["title"] == task["title"]
 
-    def test_task_inexistente_retorna_erro(self):
-        result = complete_task(999)
+    @pytest.mark.anyio
+    async def test_task_inexistente_retorna_erro(self):
+        result = await complete_task(999)
 
         assert "error" in result
 
-    def test_nao_altera_outras_tasks(self):
-        task1 = add_tool("Tarefa 1")
-        task2 = add_tool("Tarefa 2")
+    @pytest.mark.anyio
+    async def test_nao_altera_outras_tasks(self):
+        task1 = await add_tool("Tarefa 1")
+        task2 = await add_tool("Tarefa 2")
 
-        complete_task(task1["id"])
+        await complete_task(task1["id"])
 
-        tasks = asyncio.run(db.fetch_all_tasks())
-        task2_db = next(t for t in tasks if t["id"] == task2["id"])
-        assert task2_db["status"] == "pending"
+        tasks = await storage.backend().fetch_all_tasks()
+        task2_db = next(t for t in tasks if t.id == task2["id"])
+        assert task2_db.status == "pending"
 
 
 # ---------------------------------------------------------------------------
@@ -106,44 +177,273 @@ class TestCompleteTask:
 
 
 class TestDeleteTask:
-    def test_remove_task_da_lista(self):
-        task = add_tool("Tarefa para apagar")
+    @pytest.mark.anyio
+    async def test_remove_task_da_lista(self):
+        task = await add_tool("Tarefa para apagar")
 
-        delete_task(task["id"])
+        await delete_task(task["id"])
 
-        tasks = asyncio.run(db.fetch_all_tasks())
+        tasks = await storage.backend().fetch_all_tasks()
         assert len(tasks) == 0
 
-    def test_retorna_success_true(self):
-        task = add_tool("Tarefa para apagar")
+    @pytest.mark.anyio
+    async def test_retorna_success_true(self):
+        task = await add_tool("Tarefa para apagar")
 
-        result = delete_task(task["id"])
+        result = await delete_task(task["id"])
 
         assert result["success"] is True
 
-    def test_retorna_task_deletada(self):
-        task = add_tool("Tarefa para apagar")
+    @pytest.mark.anyio
+    async def test_retorna_task_deletada(self):
+        task = await add_tool("Tarefa para apagar")
 
-        result = delete_task(task["id"])
+        result = await delete_task(task["id"])
 
         assert result["deleted"]["id"] == task["id"]
         assert result["deleted"]["title"] == task["title"]
 
-    def test_task_inexistente_retorna_erro(self):
-        result = delete_task(999)
+    @pytest.mark.anyio
+    async def test_task_inexistente_retorna_erro(self):
+        result = await delete_task(999)
 
         assert result["success"] is False
         assert "error" in result
 
-    def test_deleta_apenas_a_task_correta(self):
-        task1 = add_tool("Tarefa 1")
-        task2 = add_tool("Tarefa 2")
+    @pytest.mark.anyio
+    async def test_deleta_apenas_a_task_correta(self):
+        task1 = await add_tool("Tarefa 1")
+        task2 = await add_tool("Tarefa 2")
 
-        delete_task(task1["id"])
+        await delete_task(task1["id"])
 
-        tasks = asyncio.run(db.fetch_all_tasks())
+        tasks = await storage.backend().fetch_all_tasks()
         assert len(tasks) == 1
-        assert tasks[0]["id"] == task2["id"]
+        assert tasks[0].id == task2["id"]
+
+
+class TestCompleteAndDelete:
+    @pytest.mark.anyio
+    async def test_mesma_tarefa_ao_mesmo_tempo(self):
+        for _ in range(20):
+            task = await add_tool("Corrida")
+
+            completed, deleted = await asyncio.gather(
+                complete_task(task["id"]), delete_task(task["id"])
+            )
+
+            assert deleted["success"] is True
+            if "error" not in completed:
+                assert deleted["deleted"]["status"] == "completed"
+
+        assert await storage.backend().fetch_all_tasks() == []
+
+
+# ---------------------------------------------------------------------------
+# add_tasks / complete_tasks / delete_tasks
+# ---------------------------------------------------------------------------
+
+
+class TestAddTasks:
+    @pytest.mark.anyio
+    async def test_cria_todas_as_tasks(self):
+        result = await add_tasks(
+            [{"title": "A"}, {"title": "B", "description": "Detalhe"}]
+        )
+        tasks = result["tasks"]
+
+        assert [t["id"] for t in tasks] == [1, 2]
+        assert [t["title"] for t in tasks] == ["A", "B"]
+        assert tasks[0]["description"] == ""
+        assert tasks[1]["description"] == "Detalhe"
+        assert all(t["status"] == "pending" for t in tasks)
+
+    @pytest.mark.anyio
+    async def test_ids_continuam_a_sequencia(self):
+        await add_tool("Antes")
+
+        tasks = (await add_tasks([{"title": "A"}, {"title": "B"}]))["tasks"]
+
+        assert [t["id"] for t in tasks] == [2, 3]
+
+    @pytest.mark.anyio
+    async def test_persiste_na_lista(self):
+        await add_tasks([{"title": f"Tarefa {i}"} for i in range(20)])
+
+        tasks = await storage.backend().fetch_all_tasks()
+        assert len(tasks) == 20
+
+    @pytest.mark.anyio
+    async def test_lista_vazia(self):
+        assert await add_tasks([]) == {"tasks": []}
+
+    @pytest.mark.anyio
+    async def test_prioridade_e_prazo_por_item(self):
+        tasks = (
+            await add_tasks(
+                [{"title": "A", "priority": 2, "due_at": "2026-05-01"}, {"title": "B"}]
+            )
+        )["tasks"]
+
+        assert [(t["priority"], t["due_at"]) for t in tasks] == [
+            (2, "2026-05-01T00:00:00.000000"),
+            (db.DEFAULT_PRIORITY, None),
+        ]
+
+    @pytest.mark.anyio
+    async def test_item_invalido_nao_grava_nenhum(self):
+        result = await add_tasks([{"title": "A"}, {"title": "B", "priority": -1}])
+
+        assert "error" in result
+        assert await storage.backend().fetch_all_tasks() == []
+
+
+class TestCompleteTasks:
+    @pytest.mark.anyio
+    async def test_marca_todas_como_completed(self):
+        created = (await add_tasks([{"title": "A"}, {"title": "B"}]))["tasks"]
+
+        results = (await complete_tasks([t["id"] for t in created]))["results"]
+
+        assert [r["status"] for r in results] == ["completed", "completed"]
+        assert all(r["completed_at"] for r in results)
+
+    @pytest.mark.anyio
+    async def test_erro_por_item_inexistente(self):
+        task = await add_tool("Existe")
+
+        results = (await complete_tasks([999, task["id"]]))["results"]
+
+        assert results[0] == {"error": "Task 999 not found"}
+        assert results[1]["status"] == "completed"
+
+
+class TestDeleteTasks:
+    @pytest.mark.anyio
+    async def test_remove_todas(self):
+        created = await add_tasks([{"title": "A"}, {"title": "B"}, {"title": "C"}])
+        first, _, last = created["tasks"]
+
+        results = (await delete_tasks([first["id"], last["id"]]))["results"]
+
+        assert all(r["success"] for r in results)
+        assert [r["deleted"]["title"] for r in results] == ["A", "C"]
+        tasks = await storage.backend().fetch_all_tasks()
+        assert [t.title for t in tasks] == ["B"]
+
+    @pytest.mark.anyio
+    async def test_erro_por_item_inexistente(self):
+        task = await add_tool("Existe")
+
+        results = (await delete_tasks([task["id"], 999]))["results"]
+
+        assert results[0]["success"] is True
+        assert results[1] == {"success": False, "error": "Task 999 not found"}
+
+    @pytest.mark.anyio
+    async def test_id_repetido_so_deleta_uma_vez(self):
+        task = await add_tool("Existe")
+
+        results = (await delete_tasks([task["id"], task["id"]]))["results"]
+
+        assert results[0]["success"] is True
+        assert results[1]["success"] is False
+
+
+# ---------------------------------------------------------------------------
+# list_tasks
+# ---------------------------------------------------------------------------
+
+
+async def insert_at(title: str, created_at: str, completed_at: str | None = None):
+    task = await storage.backend().insert_task(title, "", db.timestamp(created_at))
+    if completed_at:
+        await storage.backend().update_task_status(
+            task.id, "completed", db.timestamp(completed_at)
+        )
+    return task
+
+
+class TestListTasks:
+    @pytest.mark.anyio
+    async def test_sem_filtros_lista_tudo_por_id(self):
+        await add_tasks([{"title": "A"}, {"title": "B"}])
+
+        result = await list_tasks()
+
+        assert [t["title"] for t in result["tasks"]] == ["A", "B"]
+
+    @pytest.mark.anyio
+    async def test_filtra_por_status(self):
+        await add_tool("Pendente")
+        done = await add_tool("Concluída")
+        await complete_task(done["id"])
+
+        result = await list_tasks(status="completed")
+
+        assert [t["title"] for t in result["tasks"]] == ["Concluída"]
+
+    @pytest.mark.anyio
+    async def test_filtra_por_janela_de_criacao(self):
+        await insert_at("Dezembro", "2025-12-31T23:59:59")
+        await insert_at("Janeiro", "2026-01-15T08:00:00")
+        await insert_at("Fevereiro", "2026-02-01T00:00:00")
+
+        result = await list_tasks(
+            created_after="2026-01-01", created_before="2026-02-01"
+        )
+
+        assert [t["title"] for t in result["tasks"]] == ["Janeiro"]
+
+    @pytest.mark.anyio
+    async def test_filtra_por_janela_de_conclusao(self):
+        await insert_at("Antiga", "2026-01-01", completed_at="2026-01-02")
+        await insert_at("Recente", "2026-01-01", completed_at="2026-03-02")
+        await insert_at("Aberta", "2026-01-01")
+
+        result = await list_tasks(completed_after="2026-03-01")
+
+        assert [t["title"] for t in result["tasks"]] == ["Recente"]
+
+    @pytest.mark.anyio
+    async def test_filtra_por_prefixo_do_titulo(self):
+        await add_tasks(
+            [{"title": "Estudar Python"}, {"title": "Estudar SQL"}, {"title": "Ler"}]
+        )
+
+        result = await list_tasks(title_prefix="Estudar")
+
+        assert len(result["tasks"]) == 2
+
+    @pytest.mark.anyio
+    async def test_prefixo_com_curinga_e_literal(self):
+        await add_tasks([{"title": "100% pronto"}, {"title": "1000 linhas"}])
+
+        result = await list_tasks(title_prefix="100%")
+
+        assert [t["title"] for t in result["tasks"]] == ["100% pronto"]
+
+    @pytest.mark.anyio
+    async def test_ordenacao_e_limite(self):
+        await insert_at("Primeira", "2026-01-01")
+        await insert_at("Terceira", "2026-01-03")
+        await insert_at("Segunda", "2026-01-02")
+
+        result = await list_tasks(order_by="created_at", descending=True, limit=2)
+
+        assert [t["title"] for t in result["tasks"]] == ["Terceira", "Segunda"]
+
+    @pytest.mark.anyio
+    async def test_ordenacao_invalida_retorna_erro(self):
+        result = await list_tasks(order_by="status")
+
+        assert "error" in result
+
+    @pytest.mark.anyio
+    async def test_data_invalida_retorna_erro(self):
+        result = await list_tasks(created_after="ontem")
+
+        assert "error" in result
 
 
 # ---------------------------------------------------------------------------
@@ -152,28 +452,30 @@ class TestDeleteTask:
 
 
 class TestFluxoCompleto:
-    def test_adicionar_completar_deletar(self):
-        task = add_tool("Workflow completo")
+    @pytest.mark.anyio
+    async def test_adicionar_completar_deletar(self):
+        task = await add_tool("Workflow completo")
         assert task["status"] == "pending"
 
-        completed = complete_task(task["id"])
+        completed = await complete_task(task["id"])
         assert completed["status"] == "completed"
 
-        result = delete_task(task["id"])
+        result = await delete_task(task["id"])
         assert result["success"] is True
 
-        tasks = asyncio.run(db.fetch_all_tasks())
+        tasks = await storage.backend().fetch_all_tasks()
         assert len(tasks) == 0
 
-    def test_ids_sequenciais_apos_delecao(self):
-        t1 = add_tool("T1")
-        t2 = add_tool("T2")
-        add_tool("T3")
+    @pytest.mark.anyio
+    async def test_ids_sequenciais_apos_delecao(self):
+        t1 = await add_tool("T1")
+        t2 = await add_tool("T2")
+        await add_tool("T3")
 
-        delete_task(t1["id"])
-        delete_task(t2["id"])
+        await delete_task(t1["id"])
+        await delete_task(t2["id"])
 
-        t4 = add_tool("T4")
+        t4 = await add_tool("T4")
 
         assert t4["id"] == 4
 
@@ -184,110 +486,820 @@ class TestFluxoCompleto:
 
 
 class TestGetAllTasks:
-    def test_lista_vazia(self):
-        result = get_all_tasks()
+    @pytest.mark.anyio
+    async def test_lista_vazia(self):
+        result = await get_all_tasks()
 
-        assert result == "No task found"
+        assert result == f"Version: {await version()}\nNo task found"
 
-    def test_exibe_task_pendente(self):
-        add_tool("Estudar Python")
+    @pytest.mark.anyio
+    async def test_exibe_task_pendente(self):
+        await add_tool("Estudar Python")
 
-        result = get_all_tasks()
+        result = await get_all_tasks()
 
         assert "Estudar Python" in result
         assert "⏳" in result
         assert "pending" in result
 
-    def test_exibe_task_concluida(self):
-        task = add_tool("Estudar Python")
-        complete_task(task["id"])
+    @pytest.mark.anyio
+    async def test_exibe_task_concluida(self):
+        task = await add_tool("Estudar Python")
+        await complete_task(task["id"])
 
-        result = get_all_tasks()
+        result = await get_all_tasks()
 
         assert "✅" in result
         assert "completed" in result
 
-    def test_exibe_descricao_quando_presente(self):
-        add_tool("Estudar Python", description="Focar em async/await")
+    @pytest.mark.anyio
+    async def test_exibe_descricao_quando_presente(self):
+        await add_tool("Estudar Python", description="Focar em async/await")
 
-        result = get_all_tasks()
+        result = await get_all_tasks()
 
         assert "Focar em async/await" in result
 
-    def test_omite_linha_de_descricao_quando_vazia(self):
-        add_tool("Estudar Python")
+    @pytest.mark.anyio
+    async def test_omite_linha_de_descricao_quando_vazia(self):
+        await add_tool("Estudar Python")
 
-        result = get_all_tasks()
+        result = await get_all_tasks()
 
         assert "Description:" not in result
 
-    def test_exibe_todas_as_tasks(self):
-        add_tool("Tarefa 1")
-        add_tool("Tarefa 2")
-        add_tool("Tarefa 3")
+    @pytest.mark.anyio
+    async def test_exibe_todas_as_tasks(self):
+        await add_tool("Tarefa 1")
+        await add_tool("Tarefa 2")
+        await add_tool("Tarefa 3")
 
-        result = get_all_tasks()
+        result = await get_all_tasks()
 
         assert "Tarefa 1" in result
         assert "Tarefa 2" in result
         assert "Tarefa 3" in result
 
-    def test_exibe_created_at(self):
-        add_tool("Tarefa com data")
+    @pytest.mark.anyio
+    async def test_exibe_created_at(self):
+        await add_tool("Tarefa com data")
 
-        result = get_all_tasks()
+        result = await get_all_tasks()
 
         assert "Created:" in result
 
 
+# ---------------------------------------------------------------------------
+# get_tasks_page
+# ---------------------------------------------------------------------------
+
+
+class TestGetTasksPage:
+    @pytest.mark.anyio
+    async def test_lista_vazia(self):
+        result = await get_tasks_page()
+
+        assert result == f"Version: {await version()}\nNo task found"
+
+    @pytest.mark.anyio
+    async def test_primeira_pagina_com_cursor(self):
+        await add_tasks([{"title": f"Tarefa {i}"} for i in range(1, 6)])
+
+        result = await get_tasks_page(limit=2)
+
+        assert "Tarefa 1" in result
+        assert "Tarefa 2" in result
+        assert "Tarefa 3" not in result
+        assert result.endswith("Next cursor: 2\n")
+
+    @pytest.mark.anyio
+    async def test_segue_o_cursor_ate_o_fim(self):
+        await add_tasks([{"title": f"Tarefa {i}"} for i in range(1, 6)])
+
+        second = await get_tasks_page(cursor=2, limit=2)
+        last = await get_tasks_page(cursor=4, limit=2)
+
+        assert "Tarefa 3" in second and "Tarefa 4" in second
+        assert "Tarefa 2" not in second
+        assert "Tarefa 5" in last
+        assert last.endswith("End of list\n")
+
+    @pytest.mark.anyio
+    async def test_cursor_depois_do_fim(self):
+        await add_tool("Tarefa")
+
+        result = await get_tasks_page(cursor=1)
+
+        assert result == f"Version: {await version()}\nNo more tasks"
+
+    @pytest.mark.anyio
+    async def test_pula_ids_deletados(self):
+        created = await add_tasks([{"title": f"Tarefa {i}"} for i in range(1, 5)])
+        await delete_task(created["tasks"][2]["id"])
+
+        result = await get_tasks_page(cursor=2, limit=1)
+
+        assert "Tarefa 4" in result
+
+    @pytest.mark.anyio
+    async def test_mesmo_formato_de_get_all_tasks(self):
+        await add_tool("Tarefa", description="Detalhe")
+
+        page = await get_tasks_page()
+
+        assert page == await get_all_tasks() + "End of list\n"
+
+
 # ---------------------------------------------------------------------------
 # get_pending_tasks
 # ---------------------------------------------------------------------------
 
 
 class TestGetPendingTasks:
-    def test_lista_vazia(self):
-        result = get_pending_tasks()
+    @pytest.mark.anyio
+    async def test_lista_vazia(self):
+        result = await get_pending_tasks()
 
         assert "No pending tasks" in result
 
-    def test_todas_concluidas(self):
-        task = add_tool("Tarefa concluída")
-        complete_task(task["id"])
+    @pytest.mark.anyio
+    async def test_todas_concluidas(self):
+        task = await add_tool("Tarefa concluída")
+        await complete_task(task["id"])
 
-        result = get_pending_tasks()
+        result = await get_pending_tasks()
 
         assert "No pending tasks" in result
 
-    def test_exibe_apenas_pendentes(self):
-        add_tool("Pendente")
-        done = add_tool("Concluída")
-        complete_task(done["id"])
+    @pytest.mark.anyio
+    async def test_exibe_apenas_pendentes(self):
+        await add_tool("Pendente")
+        done = await add_tool("Concluída")
+        await complete_task(done["id"])
 
-        result = get_pending_tasks()
+        result = await get_pending_tasks()
 
         assert "Pendente" in result
         assert "Concluída" not in result
 
-    def test_exibe_descricao_quando_presente(self):
-        add_tool("Tarefa", description="Detalhe importante")
+    @pytest.mark.anyio
+    async def test_exibe_descricao_quando_presente(self):
+        await add_tool("Tarefa", description="Detalhe importante")
 
-        result = get_pending_tasks()
+        result = await get_pending_tasks()
 
         assert "Detalhe importante" in result
 
-    def test_omite_descricao_quando_vazia(self):
-        add_tool("Tarefa sem descrição")
+    @pytest.mark.anyio
+    async def test_omite_descricao_quando_vazia(self):
+        await add_tool("Tarefa sem descrição")
 
-        result = get_pending_tasks()
+        result = await get_pending_tasks()
 
         assert result.count("\n\n") >= 1
         lines = [line for line in result.splitlines() if line.strip()]
         assert not any("Description" in line for line in lines)
 
-    def test_exibe_emoji_pendente(self):
-        add_tool("Tarefa")
+    @pytest.mark.anyio
+    async def test_exibe_emoji_pendente(self):
+        await add_tool("Tarefa")
 
-        result = get_pending_tasks()
+        result = await get_pending_tasks()
 
         assert "⏳" in result
+
+
+# ---------------------------------------------------------------------------
+# search_tasks
+# ---------------------------------------------------------------------------
+
+
+class TestSearchTasks:
+    @pytest.mark.anyio
+    async def test_encontra_por_titulo_e_descricao(self):
+        await add_tool("Relatório trimestral")
+        await add_tool("Corrigir bug", description="falha ao gerar relatório")
+        await add_tool("Comprar leite")
+
+        result = await search_tasks("relatório")
+
+        assert [t["title"] for t in result["tasks"]] == [
+            "Relatório trimestral",
+            "Corrigir bug",
+        ]
+
+    @pytest.mark.anyio
+    async def test_titulo_tem_mais_peso(self):
+        await add_tool("Outra", description="revisar contrato com cuidado")
+        await add_tool("Revisar contrato")
+
+        result = await search_tasks("contrato")
+
+        assert result["tasks"][0]["title"] == "Revisar contrato"
+
+    @pytest.mark.anyio
+    async def test_destaca_trecho(self):
+        await add_tool("Tarefa", description="ligar para o cliente amanhã cedo")
+
+        result = await search_tasks("cliente")
+
+        assert "**cliente**" in result["tasks"][0]["snippet"]
+
+    @pytest.mark.anyio
+    async def test_ignora_acentos_e_aceita_prefixo(self):
+        await add_tool("Reunião de planejamento")
+
+        assert len((await search_tasks("reuniao"))["tasks"]) == 1
+        assert len((await search_tasks("planej*"))["tasks"]) == 1
+
+    @pytest.mark.anyio
+    async def test_exige_todas_as_palavras(self):
+        await add_tool("Lavar carro")
+        await add_tool("Lavar louça")
+
+        result = await search_tasks("lavar carro")
+
+        assert [t["title"] for t in result["tasks"]] == ["Lavar carro"]
+
+    @pytest.mark.anyio
+    async def test_respeita_limite_e_status(self):
+        tasks = await add_tasks([{"title": f"Estudo {i}"} for i in range(5)])
+        await complete_task(tasks["tasks"][0]["id"])
+
+        assert len((await search_tasks("estudo", limit=2))["tasks"]) == 2
+        completed = await search_tasks("estudo", status="completed")
+        assert [t["title"] for t in completed["tasks"]] == ["Estudo 0"]
+
+    @pytest.mark.anyio
+    async def test_operadores_sao_texto(self):
+        await add_tool("Tarefa")
+
+        result = await search_tasks('tarefa OR "(')
+
+        assert result == {"tasks": []}
+
+    @pytest.mark.anyio
+    async def test_mediana_igual_nos_dois_backends(self):
+        for completed in ("00:00:05", "00:00:37", "02:00:00"):
+            await insert_at("t", "2026-03-01T00:00:00", f"2026-03-01T{completed}")
+
+        stats = await storage.backend().fetch_task_stats()
+
+        # 37s is estimated inside the [30s, 40s) bucket
+        assert stats["median_seconds_to_complete"] == 35.0
+
+    @pytest.mark.anyio
+    async def test_acompanha_exclusao(self):
+        task = await add_tool("Tarefa removida")
+        await delete_task(task["id"])
+
+        assert (await search_tasks("removida"))["tasks"] == []
+
+    @pytest.mark.anyio
+    async def test_consulta_vazia(self):
+        result = await search_tasks("   ")
+
+        assert "error" in result
+
+
+# ---------------------------------------------------------------------------
+# JSON resources
+# ---------------------------------------------------------------------------
+
+
+async def seed_described(count: int) -> None:
+    await storage.backend().insert_tasks(
+        [(f"Tarefa {i}", f"Descrição detalhada da tarefa {i}") for i in range(count)],
+        db.timestamp(),
+    )
+
+
+class TestTasksJson:
+    @pytest.mark.anyio
+    async def test_lista_vazia(self):
+        data = json.loads(await get_all_tasks_json())
+
+        assert data == {
+            "version": await version(),
+            "fields": list(db.TASK_FIELDS),
+            "tasks": [],
+        }
+
+    @pytest.mark.anyio
+    async def test_valores_na_ordem_dos_campos(self):
+        task = await add_tool("Estudar", description="Python")
+        await complete_task(task["id"])
+
+        data = json.loads(await get_all_tasks_json())
+
+        (row,) = data["tasks"]
+        record = dict(zip(data["fields"], row))
+        assert record["title"] == "Estudar"
+        assert record["status"] == "completed"
+        assert record["completed_at"] is not None
+
+    @pytest.mark.anyio
+    async def test_seleciona_campos(self):
+        await add_tool("A", description="longa descrição")
+
+        data = json.loads(await get_all_tasks_json(fields="id, title"))
+
+        assert data == {
+            "version": await version(),
+            "fields": ["id", "title"],
+            "tasks": [[1, "A"]],
+        }
+
+    @pytest.mark.anyio
+    async def test_campo_desconhecido(self):
+        with pytest.raises(ValueError, match="senha"):
+            await get_all_tasks_json(fields="id,senha")
+
+    @pytest.mark.anyio
+    async def test_pendentes(self):
+        tasks = await add_tasks([{"title": "A"}, {"title": "B"}])
+        await complete_task(tasks["tasks"][0]["id"])
+
+        data = json.loads(await get_pending_tasks_json(fields="title"))
+
+        assert data["tasks"] == [["B"]]
+
+    @pytest.mark.anyio
+    async def test_compacto_e_utf8(self):
+        await add_tool('Reunião "geral"')
+
+        text = await get_all_tasks_json(fields="title")
+
+        assert text == (
+            f'{{"version":{await version()},'
+            '"fields":["title"],"tasks":[["Reunião \\"geral\\""]]}'
+        )
+
+    @pytest.mark.anyio
+    async def test_menor_que_o_texto(self):
+        await seed_described(1000)
+
+        text = len((await get_all_tasks()).encode())
+        full = len((await get_all_tasks_json()).encode())
+        titles = len((await get_all_tasks_json(fields="id,title")).encode())
+
+        assert full < text
+        assert titles < text / 4
+
+
+# ---------------------------------------------------------------------------
+# get_task_stats
+# ---------------------------------------------------------------------------
+
+
+class TestGetTaskStats:
+    @pytest.mark.anyio
+    async def test_sem_tarefas(self):
+        result = await get_task_stats()
+
+        assert "Total tasks: 0" in result
+        assert "Median time to complete: n/a" in result
+        assert "Completions per day" not in result
+
+    @pytest.mark.anyio
+    async def test_totais_por_status(self):
+        tasks = await add_tasks([{"title": "A"}, {"title": "B"}, {"title": "C"}])
+        await complete_task(tasks["tasks"][0]["id"])
+
+        result = await get_task_stats()
+
+        assert "Total tasks: 3" in result
+        assert "Pending: 2" in result
+        assert "Completed: 1" in result
+
+    @pytest.mark.anyio
+    async def test_conclusoes_por_dia_e_mediana(self):
+        await insert_at("A", "2026-03-01T09:00:00", "2026-03-01T11:30:00")
+        await insert_at("B", "2026-03-01T09:00:00", "2026-03-02T09:00:00")
+
+        result = await get_task_stats()
+
+        assert "2026-03-01: 1" in result
+        assert "2026-03-02: 1" in result
+        assert "Median time to complete: ~" in result
+
+    @pytest.mark.anyio
+    async def test_acompanha_exclusao(self):
+        task = await add_tool("Tarefa")
+        await delete_task(task["id"])
+
+        assert "Total tasks: 0" in await get_task_stats()
+
+    @pytest.mark.anyio
+    async def test_arquivadas_contam_a_parte(self):
+        await insert_at("A", "2026-01-01T09:00:00", "2026-01-01T10:00:00")
+        await add_tool("B")
+
+        await storage.backend().archive_tasks("2026-02-01")
+        result = await get_task_stats()
+
+        assert "Total tasks: 2" in result
+        assert "Archived: 1" in result
+        assert "2026-01-01: 1" in result
+
+
+# ---------------------------------------------------------------------------
+# Version tokens and conditional reads
+# ---------------------------------------------------------------------------
+
+
+class TestVersionTokens:
+    @pytest.mark.anyio
+    async def test_cada_escrita_avanca_a_versao(self):
+        before = await version()
+        task = await add_tool("A")
+        await add_tasks([{"title": "B"}, {"title": "C"}])
+        await complete_task(task["id"])
+
+        assert await version() > before
+        assert (await get_all_tasks()).startswith(f"Version: {await version()}\n")
+
+    @pytest.mark.anyio
+    async def test_leituras_e_escritas_sem_efeito_nao_avancam(self):
+        await add_tool("A")
+        before = await version()
+
+        await get_all_tasks()
+        await list_tasks()
+        await complete_task(999)
+        await delete_task(999)
+
+        assert await version() == before
+
+    @pytest.mark.anyio
+    async def test_versao_atual_responde_nao_modificado(self):
+        await add_tool("A")
+        current = await version()
+
+        replies = [
+            await get_all_tasks_since(current),
+            await get_pending_tasks_since(current),
+            await get_tasks_page(since=current),
+            await get_task_stats_since(current),
+        ]
+
+        assert replies == [f"Not modified since version {current}\n"] * 4
+        assert json.loads(await get_all_tasks_json(since=current)) == {
+            "version": current,
+            "not_modified": True,
+        }
+
+    @pytest.mark.anyio
+    async def test_versao_antiga_devolve_a_lista(self):
+        old = await version()
+        await add_tool("Nova")
+
+        result = await get_all_tasks_since(old)
+
+        assert result == await get_all_tasks()
+        assert "Nova" in result
+        assert result.startswith(f"Version: {await version()}\n")
+
+    @pytest.mark.anyio
+    async def test_json_comeca_pela_versao(self):
+        await add_tool("A")
+
+        data = json.loads(await get_pending_tasks_json(fields="title"))
+
+        assert data == {
+            "version": await version(),
+            "fields": ["title"],
+            "tasks": [["A"]],
+        }
+
+    @pytest.mark.anyio
+    async def test_versoes_por_projeto(self, projects_dir):
+        await add_tool("A", project="ops")
+        with db.use_project("ops"):
+            ops = await version()
+        default = await version()
+
+        await add_tool("B")
+
+        assert await get_project_tasks("ops", since=ops) == (
+            f"Not modified since version {ops}\n"
+        )
+        assert await get_project_stats("ops", since=ops) == (
+            f"Not modified since version {ops}\n"
+        )
+        assert "B" in await get_all_tasks_since(default)
+
+
+# ---------------------------------------------------------------------------
+# archived_tasks
+# ---------------------------------------------------------------------------
+
+
+# ---------------------------------------------------------------------------
+# next_tasks and tasks://overdue
+# ---------------------------------------------------------------------------
+
+
+async def seed_scheduled() -> None:
+    await add_tasks(
+        [
+            {"title": "Sem prazo", "priority": 3},
+            {"title": "Vence amanhã", "priority": 3, "due_at": "2999-01-02"},
+            {"title": "Atrasada", "priority": 2, "due_at": "2026-01-01"},
+            {"title": "Atrasada urgente", "priority": 3, "due_at": "2026-01-02"},
+            {"title": "Normal"},
+            {"title": "Baixa atrasada", "priority": 0, "due_at": "2025-12-01"},
+        ]
+    )
+
+
+class TestNextTasks:
+    @pytest.mark.anyio
+    async def test_mais_urgentes_primeiro(self):
+        await seed_scheduled()
+
+        result = await next_tasks(k=4)
+
+        assert [t["title"] for t in result["tasks"]] == [
+            "Atrasada urgente",
+            "Vence amanhã",
+            "Sem prazo",
+            "Atrasada",
+        ]
+
+    @pytest.mark.anyio
+    async def test_ignora_concluidas(self):
+        task = await add_tool("Urgente", priority=3)
+        await add_tool("Normal")
+        await complete_task(task["id"])
+
+        result = await next_tasks()
+
+        assert [t["title"] for t in result["tasks"]] == ["Normal"]
+
+    @pytest.mark.anyio
+    async def test_vazio(self):
+        assert await next_tasks() == {"tasks": []}
+
+
+class TestGetOverdueTasks:
+    @pytest.mark.anyio
+    async def test_lista_atrasadas_por_prioridade(self):
+        await seed_scheduled()
+
+        text = await get_overdue_tasks()
+
+        assert text.startswith("Overdue tasks:")
+        titles = ["Atrasada urgente", "Atrasada", "Baixa atrasada"]
+        positions = [text.index(f"] {title} ") for title in titles]
+        assert positions == sorted(positions)
+        assert "Vence amanhã" not in text
+        assert "Priority: urgent\nDue: 2026-01-02T00:00:00.000000\n" in text
+
+    @pytest.mark.anyio
+    async def test_limite(self):
+        await seed_scheduled()
+
+        text = await get_overdue_tasks(limit=1)
+
+        assert text.count("⏳") == 1
+
+    @pytest.mark.anyio
+    async def test_sem_atrasadas(self):
+        await add_tool("Em dia", due_at="2999-01-01")
+
+        assert await get_overdue_tasks() == "No overdue tasks"
+
+
+# ---------------------------------------------------------------------------
+# export_tasks / import_tasks
+# ---------------------------------------------------------------------------
+
+
+def set_journal_mode(mode: str) -> None:
+    with contextlib.closing(sqlite3.connect(db.DB_PATH)) as conn:
+        conn.execute(f"PRAGMA journal_mode={mode}")
+
+
+class TestExportImportTools:
+    @pytest.fixture(autouse=True)
+    def export_dir(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(transfer, "EXPORT_DIR", str(tmp_path))
+        set_journal_mode("WAL")
+        yield tmp_path
+        set_journal_mode("DELETE")
+
+    @pytest.mark.anyio
+    async def test_exportacao_exige_wal(self, export_dir):
+        if storage.backend() is not db:
+            pytest.skip("only SQLite has a journal")
+        set_journal_mode("DELETE")
+
+        result = await export_tasks("backlog.ndjson")
+
+        assert "WAL" in result["error"]
+        assert not (export_dir / "backlog.ndjson").exists()
+
+    @pytest.mark.anyio
+    async def test_ida_e_volta(self, export_dir):
+        await add_tasks(
+            [
+                {"title": "A", "description": "á", "priority": 3},
+                {"title": "B", "due_at": "2026-05-01"},
+            ]
+        )
+        await complete_task(1)
+        before = (await list_tasks())["tasks"]
+
+        exported = await export_tasks("ops/backlog.ndjson")
+        await storage.backend().clear_tasks()
+        imported = await import_tasks("ops/backlog.ndjson", batch_size=1)
+
+        assert exported == {"path": "ops/backlog.ndjson", "exported": 2}
+        assert imported == {"path": "ops/backlog.ndjson", "imported": 2, "skipped": 0}
+        assert (export_dir / "ops" / "backlog.ndjson").exists()
+        assert (await list_tasks())["tasks"] == before
+        assert (await add_tool("C"))["id"] == 3
+
+    @pytest.mark.anyio
+    async def test_ids_fora_de_ordem(self, export_dir):
+        (export_dir / "backlog.ndjson").write_text(
+            '{"id": 9, "title": "nove", "created_at": "2026-01-01"}\n'
+            '{"id": 4, "title": "quatro", "created_at": "2026-01-01"}\n'
+        )
+        await add_tool("um")
+
+        result = await import_tasks("backlog.ndjson")
+
+        assert result["imported"] == 2
+        tasks = await storage.backend().fetch_all_tasks()
+        assert [t.id for t in tasks] == [1, 4, 9]
+        page = await storage.backend().fetch_tasks_page(after_id=1, limit=1)
+        assert [t.id for t in page] == [4]
+
+    @pytest.mark.anyio
+    async def test_linha_invalida(self, export_dir):
+        (export_dir / "backlog.ndjson").write_text(
+            '{"id": 1, "title": "a", "created_at": "2026-01-01"}\nnada\n'
+        )
+
+        result = await import_tasks("backlog.ndjson", batch_size=1)
+
+        assert result["error"].startswith("Line 2: Invalid JSON")
+        # Into an empty project the import is all or nothing
+        assert await storage.backend().fetch_all_tasks() == []
+
+    @pytest.mark.anyio
+    async def test_linha_invalida_mantem_lotes_anteriores(self, export_dir):
+        (export_dir / "backlog.ndjson").write_text(
+            '{"id": 5, "title": "a", "created_at": "2026-01-01"}\nnada\n'
+        )
+        await add_tool("um")
+
+        result = await import_tasks("backlog.ndjson", batch_size=1)
+
+        assert "error" in result
+        assert [t.id for t in await storage.backend().fetch_all_tasks()] == [1, 5]
+
+    @pytest.mark.anyio
+    async def test_arquivo_inexistente(self):
+        result = await import_tasks("nada.ndjson")
+
+        assert "error" in result
+
+    @pytest.mark.anyio
+    async def test_exporta_vazio(self, export_dir):
+        assert (await export_tasks("vazio.ndjson"))["exported"] == 0
+        assert (export_dir / "vazio.ndjson").read_text() == ""
+
+    @pytest.mark.anyio
+    @pytest.mark.parametrize(
+        "path", ["-", "", "/etc/passwd", "../fora.ndjson", "a/../../fora.ndjson"]
+    )
+    async def test_recusa_caminho_fora_do_diretorio(self, export_dir, path):
+        await add_tool("segredo")
+
+        exported = await export_tasks(path)
+        imported = await import_tasks(path)
+
+        assert exported["error"].startswith("Invalid path")
+        assert imported["error"].startswith("Invalid path")
+        assert not (export_dir.parent / "fora.ndjson").exists()
+
+    @pytest.mark.anyio
+    async def test_recusa_link_para_fora(self, export_dir, tmp_path_factory):
+        outside = tmp_path_factory.mktemp("fora")
+        (export_dir / "link").symlink_to(outside, target_is_directory=True)
+
+        result = await export_tasks("link/backlog.ndjson")
+
+        assert result["error"].startswith("Invalid path")
+        assert not (outside / "backlog.ndjson").exists()
+
+
+class TestArchivedTasks:
+    @pytest.mark.anyio
+    async def test_vazio(self):
+        assert await archived_tasks() == {"tasks": []}
+
+    @pytest.mark.anyio
+    async def test_lista_com_filtros(self):
+        await insert_at("Relatório jan", "2026-01-01T09:00:00", "2026-01-05T09:00:00")
+        await insert_at("Relatório fev", "2026-02-01T09:00:00", "2026-02-05T09:00:00")
+        await insert_at("Outra", "2026-01-01T09:00:00", "2026-01-06T09:00:00")
+        await insert_at("Recente", "2026-03-01T09:00:00", "2026-03-05T09:00:00")
+        await storage.backend().archive_tasks("2026-03-01")
+
+        everything = await archived_tasks()
+        reports = await archived_tasks(
+            title_prefix="Relatório", order_by="completed_at", descending=True
+        )
+        january = await archived_tasks(completed_before="2026-02-01", limit=1)
+
+        assert len(everything["tasks"]) == 3
+        assert [t["title"] for t in reports["tasks"]] == [
+            "Relatório fev",
+            "Relatório jan",
+        ]
+        assert all(t["status"] == "completed" for t in reports["tasks"])
+        assert [t["title"] for t in january["tasks"]] == ["Relatório jan"]
+
+    @pytest.mark.anyio
+    async def test_ordenacao_invalida(self):
+        result = await archived_tasks(order_by="archived_at")
+
+        assert "error" in result
+
+
+# ---------------------------------------------------------------------------
+# projects
+# ---------------------------------------------------------------------------
+
+
+class TestProjects:
+    @pytest.mark.anyio
+    async def test_ferramentas_por_projeto(self, projects_dir):
+        task = await add_tool("Deploy", project="ops")
+        await add_tool("Outra")
+
+        completed = await complete_task(task["id"], project="ops")
+        ops = await list_tasks(project="ops")
+        default = await list_tasks()
+
+        assert completed["status"] == "completed"
+        assert [t["title"] for t in ops["tasks"]] == ["Deploy"]
+        assert [t["title"] for t in default["tasks"]] == ["Outra"]
+        assert (await search_tasks("deploy", project="ops"))["tasks"]
+        assert (await search_tasks("deploy"))["tasks"] == []
+        assert await list_projects() == {"projects": ["default", "ops"]}
+
+    @pytest.mark.anyio
+    async def test_mesmo_id_em_projetos_diferentes(self, projects_dir):
+        a = await add_tool("A", project="a")
+        b = await add_tool("B", project="b")
+
+        deleted = await delete_task(a["id"], project="a")
+
+        assert a["id"] == b["id"]
+        assert deleted["deleted"]["title"] == "A"
+        assert (await list_tasks(project="b"))["tasks"][0]["title"] == "B"
+
+    @pytest.mark.anyio
+    async def test_projeto_invalido(self, projects_dir):
+        assert "error" in await add_tool("A", project="../etc")
+        assert "error" in await list_tasks(project="a b")
+        assert (await delete_task(1, project=""))["success"] is False
+
+    @pytest.mark.anyio
+    async def test_listagem_de_todos_os_projetos(self, projects_dir):
+        await add_tasks([{"title": "b1"}, {"title": "b2"}], project="b")
+        await add_tool("a1", project="a")
+        await add_tool("d1")
+
+        result = await list_tasks(project="*", order_by="title", limit=3)
+
+        assert [(t["project"], t["title"]) for t in result["tasks"]] == [
+            ("a", "a1"),
+            ("b", "b1"),
+            ("b", "b2"),
+        ]
+
+    @pytest.mark.anyio
+    async def test_recursos_por_projeto(self, projects_dir):
+        await add_tool("Deploy", project="ops")
+        await add_tool("Outra")
+        # With a pool open, the rendered text is cached per project
+        await storage.backend().startup()
+        try:
+            ops = await get_project_tasks("ops")
+            default = await get_all_tasks()
+            await add_tool("Rollback", project="ops")
+            reread = await get_project_tasks("ops")
+            stats = await get_project_stats("ops")
+        finally:
+            await storage.backend().shutdown()
+
+        assert "Deploy" in ops and "Outra" not in ops
+        assert "Outra" in default and "Deploy" not in default
+        assert "Rollback" in reread
+        assert "Total tasks: 2" in stats
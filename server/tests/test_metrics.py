@@ -0,0 +1,139 @@
+import json
+
+import db
+import metrics
+import pytest
+from resources.resources import get_server_metrics, get_server_metrics_prometheus
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    """Zeroes the metrics before each test."""
+    metrics.registry.reset()
+
+
+# ---------------------------------------------------------------------------
+# CallStats / MetricsRegistry
+# ---------------------------------------------------------------------------
+
+
+class TestCallStats:
+    def test_histograma_por_bucket(self):
+        stats = metrics.CallStats()
+
+        stats.observe(0.00005)
+        stats.observe(0.003)
+        stats.observe(10)
+
+        assert stats.calls == 3
+        assert stats.buckets[0] == 1
+        assert stats.buckets[metrics.LATENCY_BUCKETS.index(0.005)] == 1
+        assert stats.buckets[-1] == 1
+
+    def test_reset_zera_sem_trocar_o_objeto(self):
+        stats = metrics.registry.stats("tool", "x")
+        stats.observe(0.001)
+
+        metrics.registry.reset()
+
+        assert metrics.registry.stats("tool", "x") is stats
+        assert stats.calls == 0
+
+
+class TestPrometheus:
+    def test_formato_de_histograma(self):
+        stats = metrics.registry.stats("tool", "add_task")
+        stats.observe(0.0002)
+        stats.observe(0.002)
+
+        text = metrics.registry.to_prometheus()
+
+        labels = 'kind="tool",name="add_task"'
+        assert f"tasktracker_calls_total{{{labels}}} 2" in text
+        assert f'tasktracker_latency_seconds_bucket{{{labels},le="0.00025"}} 1' in text
+        assert f'tasktracker_latency_seconds_bucket{{{labels},le="+Inf"}} 2' in text
+        assert f"tasktracker_latency_seconds_count{{{labels}}} 2" in text
+
+
+# ---------------------------------------------------------------------------
+# instrument / query
+# ---------------------------------------------------------------------------
+
+
+class TestInstrument:
+    @pytest.mark.anyio
+    async def test_conta_chamadas_e_bytes(self):
+        async def resource() -> str:
+            return "⏳ abc"
+
+        wrapped = metrics.instrument("resource", "test://bytes", resource)
+
+        assert await wrapped() == "⏳ abc"
+        stats = metrics.registry.stats("resource", "test://bytes")
+        assert stats.calls == 1
+        assert stats.bytes == len("⏳ abc".encode())
+
+    @pytest.mark.anyio
+    async def test_conta_erros(self):
+        async def broken():
+            raise RuntimeError("boom")
+
+        wrapped = metrics.instrument("tool", "broken", broken)
+
+        with pytest.raises(RuntimeError):
+            await wrapped()
+        stats = metrics.registry.stats("tool", "broken")
+        assert (stats.calls, stats.errors) == (1, 1)
+
+    def test_funcao_sincrona(self):
+        wrapped = metrics.instrument("prompt", "sync", lambda: "texto")
+
+        assert wrapped() == "texto"
+        assert metrics.registry.stats("prompt", "sync").calls == 1
+
+    def test_preserva_assinatura(self):
+        async def tool(title: str, description: str = "") -> dict:
+            """Doc"""
+
+        wrapped = metrics.instrument("tool", "sig", tool)
+
+        assert wrapped.__doc__ == "Doc"
+        assert list(wrapped.__wrapped__.__annotations__) == [
+            "title",
+            "description",
+            "return",
+        ]
+
+    @pytest.mark.anyio
+    async def test_queries_contam_linhas(self):
+        await db.insert_tasks([("A", ""), ("B", "")], db.timestamp())
+
+        await db.fetch_all_tasks()
+
+        stats = metrics.registry.stats("query", "fetch_all_tasks")
+        assert stats.calls == 1
+        assert stats.rows == 2
+
+
+# ---------------------------------------------------------------------------
+# metrics resources
+# ---------------------------------------------------------------------------
+
+
+class TestMetricsResources:
+    @pytest.mark.anyio
+    async def test_json(self):
+        await db.fetch_all_tasks()
+
+        data = json.loads(await get_server_metrics())
+
+        assert data["query"]["fetch_all_tasks"]["calls"] == 1
+        assert "resource_cache" in data
+
+    @pytest.mark.anyio
+    async def test_prometheus(self):
+        await db.fetch_all_tasks()
+
+        text = await get_server_metrics_prometheus()
+
+        assert 'tasktracker_calls_total{kind="query",name="fetch_all_tasks"} 1' in text
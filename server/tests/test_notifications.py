@@ -0,0 +1,143 @@
+import asyncio
+
+import db
+import pytest
+from notifications import ResourceNotifier
+from tools.tools import add_tool, complete_task
+
+
+class FakeSession:
+    def __init__(self, fail: bool = False):
+        self.updated: list[str] = []
+        self.fail = fail
+
+    async def send_resource_updated(self, uri) -> None:
+        if self.fail:
+            raise ConnectionError("gone")
+        self.updated.append(str(uri))
+
+
+# ---------------------------------------------------------------------------
+# ResourceNotifier
+# ---------------------------------------------------------------------------
+
+
+class TestResourceNotifier:
+    def test_uri_desconhecida(self):
+        with pytest.raises(ValueError):
+            ResourceNotifier().subscribe(FakeSession(), "tasks://nada")
+
+    @pytest.mark.anyio
+    async def test_rajada_vira_uma_notificacao(self):
+        notifier = ResourceNotifier(debounce_ms=20, max_delay_ms=1000)
+        session = FakeSession()
+        notifier.subscribe(session, "tasks://all")
+
+        for _ in range(500):
+            notifier.changed()
+        await asyncio.sleep(0.1)
+
+        assert session.updated == ["tasks://all"]
+
+    @pytest.mark.anyio
+    async def test_escritas_continuas_respeitam_atraso_maximo(self):
+        notifier = ResourceNotifier(debounce_ms=30, max_delay_ms=100)
+        session = FakeSession()
+        notifier.subscribe(session, "task://pending")
+
+        # A write every 10 ms never leaves a 30 ms quiet gap
+        for _ in range(30):
+            notifier.changed()
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.1)
+
+        assert 2 <= len(session.updated) <= 5
+
+    @pytest.mark.anyio
+    async def test_so_notifica_recursos_assinados(self):
+        notifier = ResourceNotifier(debounce_ms=1)
+        subscribed, other = FakeSession(), FakeSession()
+        notifier.subscribe(subscribed, "task://pending")
+
+        notifier.changed()
+        await notifier.close()
+
+        assert subscribed.updated == ["task://pending"]
+        assert other.updated == []
+
+    @pytest.mark.anyio
+    async def test_cancelar_assinatura(self):
+        notifier = ResourceNotifier(debounce_ms=1)
+        session = FakeSession()
+        notifier.subscribe(session, "tasks://all")
+        notifier.unsubscribe(session, "tasks://all")
+
+        notifier.changed()
+        await notifier.close()
+
+        assert session.updated == []
+
+    @pytest.mark.anyio
+    async def test_sessao_encerrada_e_descartada(self):
+        notifier = ResourceNotifier(debounce_ms=1)
+        gone, alive = FakeSession(fail=True), FakeSession()
+        notifier.subscribe(gone, "tasks://all")
+        notifier.subscribe(alive, "tasks://all")
+
+        notifier.changed()
+        await notifier.close()
+        gone.fail = False
+        notifier.changed()
+        await notifier.close()
+
+        assert gone.updated == []
+        assert alive.updated == ["tasks://all", "tasks://all"]
+
+    @pytest.mark.anyio
+    async def test_close_envia_pendentes(self):
+        notifier = ResourceNotifier(debounce_ms=10_000)
+        session = FakeSession()
+        notifier.subscribe(session, "tasks://all")
+
+        notifier.changed()
+        await notifier.close()
+
+        assert session.updated == ["tasks://all"]
+
+
+# ---------------------------------------------------------------------------
+# db write listeners
+# ---------------------------------------------------------------------------
+
+
+class TestWriteListeners:
+    @pytest.fixture
+    def writes(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr(db, "_write_listeners", [lambda: calls.append(1)])
+        return calls
+
+    @pytest.mark.anyio
+    async def test_escrita_que_altera_linhas(self, writes):
+        task = await add_tool("Tarefa")
+        await complete_task(task["id"])
+
+        assert len(writes) == 2
+
+    @pytest.mark.anyio
+    async def test_escrita_sem_efeito_nao_avisa(self, writes):
+        await complete_task(999)
+        await db.remove_task(999)
+
+        assert writes == []
+
+    @pytest.mark.anyio
+    async def test_writer_em_grupo_tambem_avisa(self, writes):
+        await db.start_writer()
+        try:
+            await add_tool("Tarefa")
+            await complete_task(999)
+        finally:
+            await db.stop_writer()
+
+        assert len(writes) == 1
@@ -0,0 +1,166 @@
+import asyncio
+import pstats
+import tracemalloc
+
+import metrics
+import profiling
+import pytest
+
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+    """Turns profiling on for every function, writing into a temp dir."""
+    monkeypatch.setattr(profiling, "PROFILE", "*")
+    monkeypatch.setattr(profiling, "PROFILE_RATE", 1.0)
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    monkeypatch.setattr(profiling, "PROFILE_KEEP", 50)
+    return tmp_path
+
+
+async def build_report() -> str:
+    return "".join(f"[{i}] task\n" for i in range(1000))
+
+
+# ---------------------------------------------------------------------------
+# off by default
+# ---------------------------------------------------------------------------
+
+
+class TestDesligado:
+    def test_sem_configuracao_devolve_a_propria_funcao(self, monkeypatch):
+        monkeypatch.setattr(profiling, "PROFILE", "")
+
+        assert profiling.profiled("tool", "add_task", build_report) is build_report
+
+    def test_so_envolve_os_nomes_selecionados(self, monkeypatch):
+        monkeypatch.setattr(profiling, "PROFILE", "tasks://all, add_task")
+
+        assert profiling.profiled("tool", "delete_task", build_report) is build_report
+        assert profiling.profiled("tool", "add_task", build_report) is not build_report
+
+    def test_taxa_zero_nao_envolve(self, monkeypatch):
+        monkeypatch.setattr(profiling, "PROFILE", "*")
+        monkeypatch.setattr(profiling, "PROFILE_RATE", 0)
+
+        assert profiling.profiled("tool", "add_task", build_report) is build_report
+
+
+# ---------------------------------------------------------------------------
+# profiled calls
+# ---------------------------------------------------------------------------
+
+
+class TestLigado:
+    @pytest.mark.anyio
+    async def test_grava_prof_e_relatorio_de_alocacoes(self, profile_dir):
+        wrapped = profiling.profiled("resource", "tasks://all", build_report)
+
+        assert await wrapped() == await build_report()
+
+        (prof,) = profile_dir.glob("resource-tasks_all-*.prof")
+        stats = pstats.Stats(str(prof))
+        assert any(func[2] == "build_report" for func in stats.stats)
+        report = prof.with_suffix(".alloc.txt").read_text()
+        assert report.startswith("Top 25 allocations for resource tasks://all")
+
+    @pytest.mark.anyio
+    async def test_erro_ainda_grava_o_perfil(self, profile_dir):
+        async def broken():
+            raise RuntimeError("boom")
+
+        wrapped = profiling.profiled("tool", "broken", broken)
+
+        with pytest.raises(RuntimeError):
+            await wrapped()
+        assert len(list(profile_dir.glob("*.prof"))) == 1
+
+    @pytest.mark.anyio
+    async def test_mantem_apenas_os_mais_recentes(self, profile_dir, monkeypatch):
+        monkeypatch.setattr(profiling, "PROFILE_KEEP", 3)
+        wrapped = profiling.profiled("tool", "add_task", build_report)
+
+        for _ in range(6):
+            await wrapped()
+
+        assert len(list(profile_dir.glob("*.prof"))) == 3
+        assert len(list(profile_dir.glob("*.alloc.txt"))) == 3
+
+    @pytest.mark.anyio
+    async def test_chamadas_sobrepostas_nao_quebram(self, profile_dir):
+        async def slow():
+            await asyncio.sleep(0.01)
+            return "ok"
+
+        wrapped = profiling.profiled("tool", "slow", slow)
+
+        results = await asyncio.gather(wrapped(), wrapped(), wrapped())
+
+        assert results == ["ok", "ok", "ok"]
+        assert len(list(profile_dir.glob("*.prof"))) == 1
+
+    @pytest.mark.anyio
+    async def test_nao_perfila_com_outra_chamada_em_andamento(self, profile_dir):
+        release = asyncio.Event()
+
+        async def waiting():
+            await release.wait()
+
+        other = asyncio.ensure_future(metrics.instrument("tool", "wait", waiting)())
+        await asyncio.sleep(0)
+        wrapped = metrics.instrument(
+            "tool", "add_task", profiling.profiled("tool", "add_task", build_report)
+        )
+
+        await wrapped()
+        release.set()
+        await other
+
+        assert list(profile_dir.glob("*.prof")) == []
+
+    @pytest.mark.anyio
+    async def test_relatorio_avisa_chamadas_sobrepostas(self, profile_dir):
+        async def unrelated():
+            return "".join(str(i) for i in range(1000))
+
+        async def slow():
+            await asyncio.sleep(0.01)
+            return "ok"
+
+        wrapped = metrics.instrument(
+            "tool", "slow", profiling.profiled("tool", "slow", slow)
+        )
+        other = metrics.instrument("tool", "unrelated", unrelated)
+
+        async def later():
+            await asyncio.sleep(0.001)
+            return await other()
+
+        await asyncio.gather(wrapped(), later())
+
+        (prof,) = profile_dir.glob("tool-slow-*.prof")
+        report = prof.with_suffix(".alloc.txt").read_text()
+        assert "Warning: 1 other call(s) started during this one" in report
+        stats = pstats.Stats(str(prof))
+        assert any(func[2] == "unrelated" for func in stats.stats)
+
+    @pytest.mark.anyio
+    async def test_alocacoes_anteriores_ficam_de_fora(self, profile_dir):
+        def allocate():
+            return [bytearray(1000) for _ in range(1000)]
+
+        tracemalloc.start()
+        try:
+            kept = allocate()
+            await profiling.profiled("tool", "add_task", build_report)()
+        finally:
+            tracemalloc.stop()
+
+        (prof,) = profile_dir.glob("*.prof")
+        report = prof.with_suffix(".alloc.txt").read_text()
+
+        def line(fn) -> str:
+            return f"test_profiling.py:{fn.__code__.co_firstlineno + 1}:"
+
+        assert len(kept) == 1000
+        assert line(allocate) not in report
+        assert line(build_report) in report
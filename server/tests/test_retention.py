@@ -0,0 +1,126 @@
+import asyncio
+import sqlite3
+
+import db
+import pytest
+import retention
+from retention import RetentionWorker, run_retention
+
+
+class TestRunRetention:
+    @pytest.mark.anyio
+    async def test_arquiva_apenas_alem_do_prazo(self, insert_completed):
+        await insert_completed(1, "2026-01-01T09:00:00")
+        (recent,) = await insert_completed(1, db.timestamp())
+
+        result = await run_retention(days=30, batch_size=10)
+
+        assert result["archived"] == 1
+        assert [t.id for t in await db.fetch_all_tasks()] == [recent.id]
+
+    @pytest.mark.anyio
+    async def test_pendentes_nunca_sao_arquivadas(self):
+        await db.insert_task("pendente", "", db.timestamp("2020-01-01T00:00:00"))
+
+        result = await run_retention(days=1)
+
+        assert result["archived"] == 0
+
+    @pytest.mark.anyio
+    async def test_cobre_todos_os_projetos(
+        self, insert_completed, tmp_path, monkeypatch
+    ):
+        monkeypatch.setattr(db, "PROJECTS_DIR", str(tmp_path))
+        await insert_completed(1, "2026-01-01T09:00:00")
+        with db.use_project("ops"):
+            await insert_completed(1, "2026-01-01T09:00:00")
+
+        try:
+            result = await run_retention(days=30)
+            with db.use_project("ops"):
+                archived = await db.query_archived_tasks()
+        finally:
+            await db.close_shards()
+
+        assert result["archived"] == 2
+        assert len(archived) == 1
+
+    @pytest.mark.anyio
+    async def test_zero_dias_nao_arquiva(self, insert_completed):
+        await insert_completed(1, "2026-01-01T09:00:00")
+
+        result = await run_retention(days=0)
+
+        assert result["archived"] == 0
+        assert await db.query_archived_tasks() == []
+
+
+class TestRetentionWorker:
+    @pytest.mark.anyio
+    async def test_roda_periodicamente_ate_parar(self, insert_completed):
+        worker = RetentionWorker(days=30, interval=0.01)
+        await worker.start()
+        await insert_completed(1, "2026-01-01T09:00:00")
+        await asyncio.sleep(0.2)
+        await worker.stop()
+        runs = worker.runs
+
+        await asyncio.sleep(0.05)
+
+        assert runs >= 2
+        assert worker.runs == runs
+        assert await db.query_archived_tasks() != []
+
+
+class TestRetentionLock:
+    @pytest.mark.anyio
+    async def test_um_processo_por_banco(self, tmp_path):
+        lock = str(tmp_path / "tasks.db.retention.lock")
+        first = RetentionWorker(days=30, interval=0.01, lock_path=lock)
+        second = RetentionWorker(days=30, interval=0.01, lock_path=lock)
+        await first.start()
+        await second.start()
+        await asyncio.sleep(0.1)
+
+        await first.stop()
+        runs = second.runs
+        await asyncio.sleep(0.1)
+        await second.stop()
+
+        assert first.runs >= 2
+        assert runs == 0
+        assert second.runs >= 1
+
+
+class TestMainAsync:
+    @pytest.fixture
+    def legacy_db(self, tmp_path, monkeypatch):
+        """A file created before incremental auto-vacuum, with free pages."""
+        monkeypatch.setattr(db, "DB_PATH", db.DB_PATH)
+        monkeypatch.setattr(db, "PROJECTS_DIR", db.PROJECTS_DIR)
+        path = tmp_path / "legacy.db"
+        with sqlite3.connect(path) as conn:
+            conn.execute("CREATE TABLE filler (x)")
+            conn.executemany("INSERT INTO filler VALUES (?)", [("x" * 500,)] * 2000)
+        with sqlite3.connect(path) as conn:
+            conn.execute("DELETE FROM filler")
+        return path
+
+    def args(self, path, *argv: str):
+        return retention.parse_args(
+            [*argv, "--db", str(path), "--projects-dir", str(path.parent / "p")]
+        )
+
+    @pytest.mark.anyio
+    async def test_vacuum_completo_so_quando_pedido(self, legacy_db):
+        plain = await retention.main_async(self.args(legacy_db, "--days", "0"))
+        full = await retention.main_async(self.args(legacy_db, "--full-vacuum"))
+
+        assert plain == {"archived": 0, "pages_freed": 0}
+        assert full["pages_freed"] > 0
+        with sqlite3.connect(legacy_db) as conn:
+            assert conn.execute("PRAGMA auto_vacuum").fetchone() == (2,)
+
+    def test_lote_invalido(self):
+        with pytest.raises(SystemExit):
+            retention.parse_args(["--batch-size", "0"])
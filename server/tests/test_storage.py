@@ -0,0 +1,87 @@
+import db
+import pytest
+import storage
+from memory_db import MemoryDatabase
+
+
+@pytest.fixture(autouse=True)
+def restore_backend():
+    """Puts the configured backend back after each test."""
+    yield
+    storage.use_backend(storage.STORAGE)
+
+
+# ---------------------------------------------------------------------------
+# Backend selection
+# ---------------------------------------------------------------------------
+
+
+class TestUseBackend:
+    def test_sqlite_e_o_modulo_db(self):
+        assert storage.use_backend("sqlite") is db
+        assert storage.backend() is db
+
+    def test_memoria_comeca_vazia(self):
+        first = storage.use_backend("memory")
+        second = storage.use_backend("memory")
+
+        assert isinstance(second, MemoryDatabase)
+        assert second is not first
+
+    def test_backend_desconhecido(self):
+        with pytest.raises(ValueError, match="Unknown storage backend"):
+            storage.use_backend("redis")
+
+
+# ---------------------------------------------------------------------------
+# In-memory indexes
+# ---------------------------------------------------------------------------
+
+
+class TestMemoryDatabase:
+    @pytest.mark.anyio
+    async def test_indice_por_status_acompanha_as_escritas(self):
+        store = MemoryDatabase()
+        a = await store.insert_task("a", "", db.timestamp())
+        b = await store.insert_task("b", "", db.timestamp())
+
+        await store.update_task_status(a.id, "completed", db.timestamp())
+        await store.remove_task(b.id)
+
+        project = store._project()
+        assert list(project.by_status["completed"]) == [a.id]
+        assert not project.by_status["pending"]
+
+    @pytest.mark.anyio
+    async def test_tarefas_devolvidas_nao_mudam_depois(self):
+        store = MemoryDatabase()
+        task = await store.insert_task("a", "", db.timestamp())
+
+        await store.update_task_status(task.id, "completed", db.timestamp())
+
+        assert task.status == "pending"
+
+    @pytest.mark.anyio
+    async def test_arquivar_mantem_o_historico(self):
+        store = MemoryDatabase()
+        task = await store.insert_task("a", "", "2026-01-01T08:00:00")
+        await store.update_task_status(task.id, "completed", "2026-01-01T09:00:00")
+
+        assert await store.archive_tasks("2026-02-01T00:00:00") == 1
+
+        stats = await store.fetch_task_stats(days=400)
+        assert await store.fetch_all_tasks() == []
+        assert stats["by_status"] == {"archived": 1}
+        # Estimated inside the [3000s, 4000s) bucket, like SQLite does
+        assert stats["median_seconds_to_complete"] == 3500
+        assert [t.id for t in await store.query_archived_tasks()] == [task.id]
+
+    @pytest.mark.anyio
+    async def test_projetos_ficam_separados(self):
+        store = MemoryDatabase()
+        await store.insert_task("a", "", db.timestamp())
+        with db.use_project("ops"):
+            await store.insert_task("b", "", db.timestamp())
+
+        assert store.list_projects() == [db.DEFAULT_PROJECT, "ops"]
+        assert [t.title for t in await store.fetch_all_tasks()] == ["a"]
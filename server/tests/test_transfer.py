@@ -0,0 +1,65 @@
+import json
+
+import db
+import pytest
+import transfer
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Keeps the DB paths the CLI sets from leaking into other tests."""
+    monkeypatch.setattr(db, "DB_PATH", db.DB_PATH)
+    monkeypatch.setattr(db, "PROJECTS_DIR", db.PROJECTS_DIR)
+    return tmp_path
+
+
+def cli(workdir, *argv: str):
+    return transfer.parse_args(
+        [
+            *argv,
+            "--db",
+            str(workdir / "tasks.db"),
+            "--projects-dir",
+            str(workdir / "projects"),
+        ]
+    )
+
+
+class TestParseArgs:
+    def test_lote_padrao_por_comando(self):
+        assert transfer.parse_args(["export", "-"]).batch_size == 1000
+        assert (
+            transfer.parse_args(["import", "x.ndjson"]).batch_size
+            == db.IMPORT_BATCH_SIZE
+        )
+
+    def test_lote_invalido(self):
+        with pytest.raises(SystemExit):
+            transfer.parse_args(["import", "x.ndjson", "--batch-size", "0"])
+
+
+class TestMainAsync:
+    @pytest.mark.anyio
+    async def test_exporta_e_importa_em_outro_projeto(self, workdir):
+        path = str(workdir / "backlog.ndjson")
+        db.DB_PATH = str(workdir / "tasks.db")
+        await db.init_db()
+        await db.insert_tasks([("a", ""), ("b", "")], db.timestamp())
+
+        exported = await transfer.main_async(cli(workdir, "export", path))
+        imported = await transfer.main_async(
+            cli(workdir, "import", path, "--project", "ops", "--batch-size", "1")
+        )
+
+        assert exported == {"exported": 2}
+        assert imported == {"imported": 2, "skipped": 0}
+        lines = (workdir / "backlog.ndjson").read_text().splitlines()
+        assert [json.loads(line)["title"] for line in lines] == ["a", "b"]
+        assert (workdir / "projects" / "ops.db").exists()
+
+    def test_erro_sai_com_mensagem(self, workdir):
+        argv = ["import", str(workdir / "nada.ndjson")]
+        argv += ["--db", str(workdir / "tasks.db")]
+
+        with pytest.raises(SystemExit, match="import failed"):
+            transfer.main(argv)
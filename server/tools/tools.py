@@ -1,32 +1,287 @@
-import asyncio
-from datetime import datetime
+import os
+from typing import NotRequired, TypedDict
 
 import db
+import transfer
+from storage import backend
 
+# list_tasks(project=ALL_PROJECTS) lists the tasks of every project at once
+ALL_PROJECTS = "*"
 
-def add_tool(title: str, description: str = "") -> dict:
+
+class NewTask(TypedDict):
+    title: str
+    description: NotRequired[str]
+    priority: NotRequired[int]
+    due_at: NotRequired[str]
+
+
+def _scheduling(priority: int, due_at: str | None) -> tuple[int, str | None]:
+    db.check_priority(priority)
+    return priority, db.timestamp(due_at) if due_at else None
+
+
+async def add_tool(
+    title: str,
+    description: str = "",
+    priority: int = db.DEFAULT_PRIORITY,
+    due_at: str | None = None,
+    project: str | None = None,
+) -> dict:
     """
-    Adds a new task to the task list
+    Adds a new task to the task list of ``project`` (the default one if
+    omitted). ``priority`` goes from 0 (low) through 1 (normal) and 2 (high)
+    to 3 (urgent); ``due_at`` is an ISO date or date and time.
     """
-    created_at = datetime.now().isoformat()
-    return asyncio.run(db.insert_task(title, description, created_at))
+    created_at = db.timestamp()
+    try:
+        priority, due_at = _scheduling(priority, due_at)
+        with db.use_project(project):
+            task = await backend().insert_task(
+                title, description, created_at, priority, due_at
+            )
+    except ValueError as exc:
+        return {"error": str(exc)}
+    return task.to_dict()
 
 
-def complete_task(task_id: int) -> dict:
+async def complete_task(task_id: int, project: str | None = None) -> dict:
     """
     Marks a task as completed
     """
-    completed_at = datetime.now().isoformat()
-    result = asyncio.run(db.update_task_status(task_id, "completed", completed_at))
+    completed_at = db.timestamp()
+    try:
+        with db.use_project(project):
+            result = await backend().update_task_status(
+                task_id, "completed", completed_at
+            )
+    except ValueError as exc:
+        return {"error": str(exc)}
     if result is None:
         return {"error": f"Task {task_id} not found"}
-    return result
+    return result.to_dict()
+
 
-def delete_task(task_id: int) -> dict:
+async def delete_task(task_id: int, project: str | None = None) -> dict:
     """
     Deletes a task
     """
-    deleted = asyncio.run(db.remove_task(task_id))
+    try:
+        with db.use_project(project):
+            deleted = await backend().remove_task(task_id)
+    except ValueError as exc:
+        return {"success": False, "error": str(exc)}
     if deleted is None:
         return {"success": False, "error": f"Task {task_id} not found"}
-    return {"success": True, "deleted": deleted}
\ No newline at end of file
+    return {"success": True, "deleted": deleted.to_dict()}
+
+
+async def add_tasks(tasks: list[NewTask], project: str | None = None) -> dict:
+    """
+    Adds several tasks at once, in a single transaction
+    """
+    created_at = db.timestamp()
+    try:
+        items = [
+            (
+                task["title"],
+                task.get("description", ""),
+                *_scheduling(
+                    task.get("priority", db.DEFAULT_PRIORITY), task.get("due_at")
+                ),
+            )
+            for task in tasks
+        ]
+        with db.use_project(project):
+            tasks = await backend().insert_tasks(items, created_at)
+    except ValueError as exc:
+        return {"error": str(exc)}
+    return {"tasks": [task.to_dict() for task in tasks]}
+
+
+async def complete_tasks(task_ids: list[int], project: str | None = None) -> dict:
+    """
+    Marks several tasks as completed, in a single transaction
+    """
+    completed_at = db.timestamp()
+    try:
+        with db.use_project(project):
+            results = await backend().update_tasks_status(
+                task_ids, "completed", completed_at
+            )
+    except ValueError as exc:
+        return {"error": str(exc)}
+    return {
+        "results": [
+            {"error": f"Task {task_id} not found"}
+            if result is None
+            else result.to_dict()
+            for task_id, result in zip(task_ids, results)
+        ]
+    }
+
+
+async def delete_tasks(task_ids: list[int], project: str | None = None) -> dict:
+    """
+    Deletes several tasks, in a single transaction
+    """
+    try:
+        with db.use_project(project):
+            deleted = await backend().remove_tasks(task_ids)
+    except ValueError as exc:
+        return {"error": str(exc)}
+    return {
+        "results": [
+            {"success": False, "error": f"Task {task_id} not found"}
+            if task is None
+            else {"success": True, "deleted": task.to_dict()}
+            for task_id, task in zip(task_ids, deleted)
+        ]
+    }
+
+
+async def list_tasks(
+    status: str | None = None,
+    created_after: str | None = None,
+    created_before: str | None = None,
+    completed_after: str | None = None,
+    completed_before: str | None = None,
+    title_prefix: str | None = None,
+    order_by: str = "id",
+    descending: bool = False,
+    limit: int = 100,
+    project: str | None = None,
+) -> dict:
+    """
+    Lists tasks filtered by status, created/completed time range (ISO dates,
+    start inclusive, end exclusive) and title prefix. Pass project "*" to list
+    every project at once; each task then names its project.
+    """
+    filters = dict(
+        status=status,
+        created_range=(created_after, created_before),
+        completed_range=(completed_after, completed_before),
+        title_prefix=title_prefix,
+        order_by=order_by,
+        descending=descending,
+        limit=max(1, min(limit, 1000)),
+    )
+    try:
+        if project == ALL_PROJECTS:
+            rows = await backend().query_projects(**filters)
+            return {"tasks": [{"project": name, **t.to_dict()} for name, t in rows]}
+        with db.use_project(project):
+            tasks = await backend().query_tasks(**filters)
+    except ValueError as exc:
+        return {"error": str(exc)}
+    return {"tasks": [task.to_dict() for task in tasks]}
+
+
+async def next_tasks(k: int = 10, project: str | None = None) -> dict:
+    """
+    The ``k`` pending tasks to work on next: highest priority first, then the
+    soonest due, with tasks that have no due date last
+    """
+    try:
+        with db.use_project(project):
+            tasks = await backend().fetch_next_tasks(max(1, min(k, 1000)))
+    except ValueError as exc:
+        return {"error": str(exc)}
+    return {"tasks": [task.to_dict() for task in tasks]}
+
+
+async def export_tasks(path: str, project: str | None = None) -> dict:
+    """
+    Writes every task of ``project`` to the NDJSON file ``path``, relative to
+    the server's export directory, one JSON object per line ordered by id, for
+    import_tasks to read back. The database must be in WAL mode
+    """
+    try:
+        target = transfer.export_path(path)
+        with db.use_project(project):
+            # Outside WAL, the export's single read would hold every writer
+            # back until it ends, which is longer than they wait for a lock
+            if backend() is db and not await db.wal_enabled():
+                raise ValueError(
+                    "Exporting needs the database in WAL mode (HTTP or group"
+                    " write mode, or a named project); otherwise use"
+                    " server/transfer.py export while the server is stopped"
+                )
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            exported = await transfer.export_file(target)
+    except (ValueError, OSError) as exc:
+        return {"error": str(exc)}
+    return {"path": path, "exported": exported}
+
+
+async def import_tasks(
+    path: str, batch_size: int = db.IMPORT_BATCH_SIZE, project: str | None = None
+) -> dict:
+    """
+    Adds the tasks of the NDJSON file ``path`` in the server's export
+    directory, as written by export_tasks, to ``project`` with their original
+    ids and timestamps, committing every ``batch_size`` tasks (all at once
+    into an empty project). Tasks whose id is already taken are skipped, so an
+    interrupted import can be run again.
+    """
+    try:
+        with db.use_project(project):
+            result = await transfer.import_file(transfer.export_path(path), batch_size)
+    except (ValueError, OSError) as exc:
+        return {"error": str(exc)}
+    return {"path": path, **result}
+
+
+async def list_projects() -> dict:
+    """
+    Lists the projects that have a database, starting with the default one
+    """
+    return {"projects": backend().list_projects()}
+
+
+async def archived_tasks(
+    completed_after: str | None = None,
+    completed_before: str | None = None,
+    title_prefix: str | None = None,
+    order_by: str = "id",
+    descending: bool = False,
+    limit: int = 100,
+    project: str | None = None,
+) -> dict:
+    """
+    Lists completed tasks the retention job moved to the archive, filtered by
+    completion time range (ISO dates, start inclusive, end exclusive) and title
+    prefix
+    """
+    try:
+        with db.use_project(project):
+            tasks = await backend().query_archived_tasks(
+                completed_range=(completed_after, completed_before),
+                title_prefix=title_prefix,
+                order_by=order_by,
+                descending=descending,
+                limit=max(1, min(limit, 1000)),
+            )
+    except ValueError as exc:
+        return {"error": str(exc)}
+    return {"tasks": [task.to_dict() for task in tasks]}
+
+
+async def search_tasks(
+    query: str, status: str | None = None, limit: int = 20, project: str | None = None
+) -> dict:
+    """
+    Full-text search over task titles and descriptions, best match first.
+    Every word must match; end a word with * to match it as a prefix.
+    Each result has a snippet with the matched words in **bold**.
+    """
+    if not query.split():
+        return {"error": "Search query is empty"}
+    try:
+        with db.use_project(project):
+            hits = await backend().search_tasks(
+                query, limit=max(1, min(limit, 1000)), status=status
+            )
+    except ValueError as exc:
+        return {"error": str(exc)}
+    return {"tasks": [hit.to_dict() for hit in hits]}
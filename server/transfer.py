@@ -0,0 +1,131 @@
+"""
+NDJSON export and import of a project's tasks, one JSON object per line with
+every task field. Tasks keep their ids and timestamps, so a backlog moves
+between environments as it is. The export_tasks and import_tasks tools call
+the same functions on files under TASKS_EXPORT_DIR; from the command line:
+
+    uv run python server/transfer.py export backlog.ndjson
+    uv run python server/transfer.py import backlog.ndjson --project ops
+    uv run python server/transfer.py export - --db /srv/tasks/tasks.db | gzip > b.gz
+
+"-" reads stdin or writes stdout (command line only).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from contextlib import aclosing, nullcontext
+
+import db
+from storage import backend
+
+# The only directory the export_tasks and import_tasks tools read and write
+EXPORT_DIR = os.environ.get("TASKS_EXPORT_DIR", "exports")
+
+
+def export_path(name: str) -> str:
+    """
+    The file ``name`` under EXPORT_DIR. Tools take their paths from clients,
+    so anything that could reach outside it (or stdin/stdout, which carry the
+    protocol under stdio) is refused.
+    """
+    if (
+        name in ("", "-")
+        or os.path.isabs(name)
+        or ".." in name.replace("\\", "/").split("/")
+    ):
+        raise ValueError(
+            f"Invalid path {name!r}: use a relative path inside the export"
+            " directory, without '..'"
+        )
+    root = os.path.realpath(EXPORT_DIR)
+    path = os.path.realpath(os.path.join(root, name))
+    # A symlink inside the directory could still point outside it
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError(f"Invalid path {name!r}: outside the export directory")
+    return path
+
+
+def _open(path: str, mode: str):
+    if path == "-":
+        return nullcontext(sys.stdout if mode == "w" else sys.stdin)
+    return open(path, mode, encoding="utf-8")
+
+
+async def export_file(path: str, batch_size: int = 1000) -> int:
+    """
+    Writes every task of the current project to ``path``, ordered by id, and
+    returns how many were written
+    """
+    exported = 0
+    with _open(path, "w") as out:
+        async with aclosing(backend().export_tasks(batch_size)) as chunks:
+            async for chunk in chunks:
+                # A chunk is about 180 KB; writing it must not stall the loop
+                await asyncio.to_thread(out.write, chunk)
+                # JSON strings escape their newlines: one per task
+                exported += chunk.count("\n")
+    return exported
+
+
+async def import_file(
+    path: str, batch_size: int = db.IMPORT_BATCH_SIZE
+) -> dict[str, int]:
+    """
+    Reads the tasks in ``path`` into the current project, one transaction per
+    ``batch_size`` tasks (a single one into an empty project), skipping ids
+    already taken
+    """
+    with _open(path, "r") as lines:
+        return await backend().import_tasks(lines, batch_size)
+
+
+async def main_async(args: argparse.Namespace) -> dict:
+    db.DB_PATH = args.db
+    db.PROJECTS_DIR = args.projects_dir
+    await db.startup()
+    try:
+        with db.use_project(args.project):
+            if args.command == "export":
+                return {"exported": await export_file(args.path, args.batch_size)}
+            return await import_file(args.path, args.batch_size)
+    finally:
+        await db.shutdown()
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("command", choices=("export", "import"))
+    parser.add_argument("path", help='NDJSON file, or "-" for stdout/stdin')
+    parser.add_argument("--project", help="project to export or import into")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        help=f"tasks per transaction (import, default {db.IMPORT_BATCH_SIZE})"
+        " or per read (export, default 1000)",
+    )
+    parser.add_argument("--db", default=db.DB_PATH, help="default project database")
+    parser.add_argument("--projects-dir", default=db.PROJECTS_DIR)
+    args = parser.parse_args(argv)
+
+    if args.batch_size is None:
+        args.batch_size = 1000 if args.command == "export" else db.IMPORT_BATCH_SIZE
+    if args.batch_size < 1:
+        parser.error("--batch-size must be at least 1")
+    return args
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    try:
+        result = asyncio.run(main_async(args))
+    except (ValueError, OSError) as exc:
+        sys.exit(f"{args.command} failed: {exc}")
+    # The summary goes to stderr, out of the way of an export to stdout
+    print(json.dumps(result), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()